@@ -2,7 +2,11 @@
 import discord
 import os
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, Servers, BALANCE_PROJECTION
+from Cogs.utils.cache import get_user_cache
+from Cogs.utils.render_service import get_render_service
+from Cogs.utils.frame_cache import get_frame_cache
+from Cogs.utils.reactions import get_reaction_dispatcher
 from Cogs.utils.emojis import emoji
 
 class AdminCommands(commands.Cog):
@@ -63,20 +67,14 @@ class AdminCommands(commands.Cog):
         
         # Add the amount to the user's balance
         db = Users()
-        user_data = db.fetch_user(user.id)
         
         # If user doesn't exist, register them
-        if not user_data:
-            dump = {"discord_id": user.id, "tokens": 0, "credits": 0, "history": [], 
-                   "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, 
-                   "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost': 0}
-            db.register_new_user(dump)
-            user_data = db.fetch_user(user.id)
+        await db.ensure_user(user.id)
+        user_data = await db.fetch_user(user.id, BALANCE_PROJECTION)
         
         # Update user balance
-        current_amount = user_data[db_field]
-        new_amount = current_amount + amount
-        db.update_balance(user.id, new_amount, db_field)
+        new_amount = user_data[db_field] + amount
+        await db.update_balance(user.id, amount, db_field, "$inc")
         
         # Add to history
         history_entry = {
@@ -87,7 +85,7 @@ class AdminCommands(commands.Cog):
             "admin_id": ctx.author.id
         }
         
-        db.collection.update_one(
+        await db.collection.update_one(
             {"discord_id": user.id},
             {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}  # Keep last 100 entries
         )
@@ -139,7 +137,7 @@ class AdminCommands(commands.Cog):
         
         # Get server data from database
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
         
         if not server_data:
             embed = discord.Embed(
@@ -163,7 +161,7 @@ class AdminCommands(commands.Cog):
         server_admins.append(user.id)
         
         # Update database
-        db.collection.update_one(
+        await db.collection.update_one(
             {"server_id": ctx.guild.id},
             {"$set": {"server_admins": server_admins}}
         )
@@ -196,7 +194,7 @@ class AdminCommands(commands.Cog):
         # If server_id is provided, get that server's admins
         if server_id:
             db = Servers()
-            server_data = db.fetch_server(server_id)
+            server_data = await db.fetch_server(server_id)
             
             if not server_data:
                 embed = discord.Embed(
@@ -271,7 +269,7 @@ class AdminCommands(commands.Cog):
         
         # Get server data from database
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
         
         if not server_data:
             embed = discord.Embed(
@@ -295,7 +293,7 @@ class AdminCommands(commands.Cog):
         server_admins.remove(user.id)
         
         # Update database
-        db.collection.update_one(
+        await db.collection.update_one(
             {"server_id": ctx.guild.id},
             {"$set": {"server_admins": server_admins}}
         )
@@ -327,7 +325,7 @@ class AdminCommands(commands.Cog):
         
         # Get server data from database
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
         
         if not server_data:
             embed = discord.Embed(
@@ -372,5 +370,109 @@ class AdminCommands(commands.Cog):
         
         await ctx.reply(embed=embed)
 
+    @commands.command(name="cachestats")
+    async def cachestats(self, ctx):
+        """Show user cache hit/miss metrics (Bot Admin only)
+        
+        Usage: !cachestats
+        """
+        # Check if command user is in admins.txt
+        if not self.is_admin(ctx.author.id):
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Access Denied",
+                description="This command is restricted to administrators only.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
+        
+        stats = get_user_cache().stats()
+        embed = discord.Embed(
+            title="User Cache",
+            description=(
+                f"**Entries:** {stats['size']:,}\n"
+                f"**Hits:** {stats['hits']:,}\n"
+                f"**Misses:** {stats['misses']:,}\n"
+                f"**Hit Rate:** {stats['hit_rate'] * 100:.1f}%\n"
+                f"**Evictions:** {stats['evictions']:,}\n"
+                f"**Invalidations:** {stats['invalidations']:,}\n"
+                f"**Stale Reads Dropped:** {stats['stale_reads']:,}"
+            ),
+            color=0x00FFAE
+        )
+        embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+        await ctx.reply(embed=embed)
+
+    @commands.command(name="renderstats")
+    async def renderstats(self, ctx):
+        """Show render service queue and timing metrics (Bot Admin only)
+        
+        Usage: !renderstats
+        """
+        # Check if command user is in admins.txt
+        if not self.is_admin(ctx.author.id):
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Access Denied",
+                description="This command is restricted to administrators only.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
+        
+        embed = discord.Embed(title="Render Service", color=0x00FFAE)
+        for job, stats in get_render_service().stats().items():
+            embed.add_field(
+                name=job,
+                value=(
+                    f"**Jobs:** {stats['jobs']:,}\n"
+                    f"**Queue Wait:** {stats['avg_wait_ms']:.1f}ms\n"
+                    f"**Render:** {stats['avg_render_ms']:.1f}ms (max {stats['max_render_ms']:.1f}ms)\n"
+                    f"**Fallbacks:** {stats['fallbacks']:,}\n"
+                    f"**Rejected:** {stats['rejected']:,}\n"
+                    f"**Timeouts:** {stats['timeouts']:,}\n"
+                    f"**Errors:** {stats['errors']:,}"
+                ),
+                inline=True
+            )
+        frames = get_frame_cache().stats()
+        embed.add_field(
+            name="crash frame cache",
+            value=(
+                f"**Frames:** {frames['frames']:,} ({frames['size_mb']:.1f}MB)\n"
+                f"**Hit Rate:** {frames['hit_rate']:.1%}\n"
+                f"**Hits:** {frames['hits']:,} (disk {frames['disk_hits']:,})\n"
+                f"**Misses:** {frames['misses']:,}\n"
+                f"**Evictions:** {frames['evictions']:,}"
+            ),
+            inline=True
+        )
+        embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+        await ctx.reply(embed=embed)
+
+    @commands.command(name="reactionstats")
+    async def reactionstats(self, ctx):
+        """Show the game messages listening for reactions (Bot Admin only)
+        
+        Usage: !reactionstats
+        """
+        # Check if command user is in admins.txt
+        if not self.is_admin(ctx.author.id):
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Access Denied",
+                description="This command is restricted to administrators only.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
+        
+        stats = get_reaction_dispatcher().stats()
+        by_kind = "\n".join(f"**{kind}:** {count:,}" for kind, count in stats["by_kind"].items()) or "None"
+        embed = discord.Embed(title="Reaction Dispatcher", color=0x00FFAE)
+        embed.add_field(name="Active Messages", value=f"**Total:** {stats['active']:,}\n{by_kind}", inline=True)
+        embed.add_field(
+            name="Events",
+            value=f"**Dispatched:** {stats['dispatched']:,}\n**Ignored:** {stats['ignored']:,}",
+            inline=True
+        )
+        embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+        await ctx.reply(embed=embed)
+
 def setup(bot):
     bot.add_cog(AdminCommands(bot))
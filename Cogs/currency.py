@@ -1,15 +1,14 @@
 import discord
-import requests
-import qrcode
 import io
-import asyncio
 
 import datetime
 
 import time
-from PIL import Image, ImageFont, ImageDraw
 from discord.ext import commands
 from Cogs.utils.mongo import Users
+from Cogs.utils.deposits import DepositWatcher
+from Cogs.utils.http import get_http, get_range_cache, get_coingecko_prices, SIMPLESWAP_API
+from Cogs.utils.render_service import get_render_service
 from Cogs.utils.emojis import emoji
 from colorama import Fore
 import re
@@ -38,7 +37,7 @@ class DepositCancelView(discord.ui.View):
             )
         # Get context and remove pending deposit if it exists
         if self.user_id in self.cog.pending_deposits:
-            del self.cog.pending_deposits[self.user_id]
+            await self.cog.watcher.cancel(self.user_id)
             # Reset the cooldown by getting the command and all its cooldowns
             cmd = self.cog.bot.get_command('dep')
             if cmd:
@@ -73,10 +72,6 @@ class DepositCancelView(discord.ui.View):
                 child.disabled = True
             await interaction.message.edit(view=self)
 
-            # Reset pending deposit
-            if self.user_id in self.cog.pending_deposits:
-                del self.cog.pending_deposits[self.user_id]
-
             cancel_embed = discord.Embed(
                 title="<:no:1344252518305234987> | DEPOSIT CANCELLED",
                 description="Your deposit has been cancelled.\nYou can now use `!dep` to create a new deposit.",
@@ -140,29 +135,30 @@ class Deposit(commands.Cog):
             "ETH": "eth",
             "USDT": "usdt"
         }
-        self.pending_deposits = {}
         self.deposit_timeout = 600  # 10 minutes
+        # One poller for every pending deposit, resumed from Mongo after a restart
+        self.watcher = DepositWatcher(
+            self.check_payment,
+            on_complete=self.deposit_completed,
+            on_partial=self.deposit_partial,
+            on_expire=self.deposit_expired
+        )
+        self.pending_deposits = self.watcher.by_user
+        self.watch_task = self.bot.loop.create_task(self.watcher.run())
 
-    def get_crypto_prices(self):
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            "ids": "bitcoin,ethereum,litecoin,solana",
-            "vs_currencies": "usd"
-        }
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"{Fore.RED}[-] {Fore.WHITE}Failed to fetch crypto prices. Status Code: {Fore.RED}{response.status_code}{Fore.WHITE}")
-            return None
+    def cog_unload(self):
+        self.watch_task.cancel()
+
+    async def get_crypto_prices(self):
+        return await get_coingecko_prices("bitcoin,ethereum,litecoin,solana")
 
-    def get_conversion_rate(self, currency, amount):
+    async def get_conversion_rate(self, currency, amount):
         url = (
-            f"https://api.simpleswap.io/v1/get_estimated?"
+            f"{SIMPLESWAP_API}/get_estimated?"
             f"api_key={self.api_key}&currency_from={self.target_currency}"
             f"&currency_to={currency}&amount={amount}&fixed=false"
         )
-        response = requests.get(url)
+        response = await get_http().get(url)
         try:
             data = response.json()
             if isinstance(data, (float, int, str)):
@@ -180,23 +176,17 @@ class Deposit(commands.Cog):
             else:
                 print(f"[ERROR] Unexpected conversion response: {data}")
                 return None
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:
             print(f"[ERROR] Non-JSON response: {response.text}")
             return None
 
-    def get_usdcalgo_to_usd(self, amount):
+    async def get_usdcalgo_to_usd(self, amount):
         """
         Converts a given amount of USDC (Algo) to USD using CoinGecko.
         Since USDC is pegged to USD, this should normally return a 1:1 conversion.
         """
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            "ids": "usd-coin",
-            "vs_currencies": "usd"
-        }
-        response = requests.get(url, params=params)
         try:
-            data = response.json()
+            data = await get_coingecko_prices("usd-coin") or {}
             rate = data.get("usd-coin", {}).get("usd")
             if rate is None:
                 print("[ERROR] Could not fetch USD conversion rate for USDC from CoinGecko.")
@@ -206,31 +196,36 @@ class Deposit(commands.Cog):
             print(f"[ERROR] Exception in get_usdcalgo_to_usd: {e}")
             return None
 
-    def get_minimum_deposit(self, currency):
+    async def get_minimum_deposit(self, currency):
         """
         Fetch the minimum deposit amount (in USD) for the given currency.
         """
         url = (
-            f"https://api.simpleswap.io/v1/get_ranges?"
+            f"{SIMPLESWAP_API}/get_ranges?"
             f"api_key={self.api_key}&currency_from={currency}&currency_to={self.target_currency}&fixed=false"
         )
-        response = requests.get(url)
-        try:
+
+        async def fetch():
+            response = await get_http().get(url)
             data = response.json()
             min_amount = data.get("min")
             if min_amount is not None:
                 return float(min_amount)
             return None
+
+        try:
+            # Ranges barely move, so concurrent and repeated lookups share one call
+            return await get_range_cache().get(("simpleswap_min", currency, self.target_currency), fetch)
         except Exception as e:
             print(f"[ERROR] Unable to fetch minimum deposit: {e}")
             return None
 
-    def get_deposit_data(self, currency, amount):
+    async def get_deposit_data(self, currency, amount):
         """
         Create a SimpleSwap exchange transaction and return the full JSON response.
         """
         personal_address = "GRTDJ7BFUWZYL5344ZD4KUWVALVKSBR4LNY62PRCL5E4664QHM4C4YLNFQ"
-        url = f"https://api.simpleswap.io/v1/create_exchange?api_key={self.api_key}"
+        url = f"{SIMPLESWAP_API}/create_exchange?api_key={self.api_key}"
         payload = {
             "currency_from": currency,
             "currency_to": self.target_currency,
@@ -239,7 +234,7 @@ class Deposit(commands.Cog):
             "fixed": False
         }
         headers = {"Content-Type": "application/json"}
-        response = requests.post(url, json=payload, headers=headers)
+        response = await get_http().post(url, json=payload, headers=headers)
         try:
             data = response.json()
             print(f"[DEBUG] create_exchange response: {data}")
@@ -248,7 +243,7 @@ class Deposit(commands.Cog):
             else:
                 print(f"[ERROR] Missing 'address_from': {data}")
                 return None
-        except requests.exceptions.JSONDecodeError:
+        except ValueError:
             print(f"[ERROR] Non-JSON response: {response.text}")
             return None
 
@@ -328,14 +323,14 @@ class Deposit(commands.Cog):
 
 
         # Get conversion rate from USD -> Crypto for the user's deposit amount
-        converted_amount = self.get_conversion_rate(self.supported_currencies[currency], amount)
+        converted_amount = await self.get_conversion_rate(self.supported_currencies[currency], amount)
 
         # Check if the API returned an error dict indicating the amount is too low
         if isinstance(converted_amount, dict) and converted_amount.get("error") == "amount_too_low":
             # The API error returns the minimum deposit in usdcalgo
             min_deposit_usdcalgo = converted_amount["min"]
             # Convert 1 usdcalgo to USD. This gives you the live USD value of one usdcalgo.
-            usd_value = self.get_usdcalgo_to_usd(1)
+            usd_value = await self.get_usdcalgo_to_usd(1)
             if usd_value:
                 min_deposit_usd = min_deposit_usdcalgo * usd_value
             else:
@@ -353,7 +348,7 @@ class Deposit(commands.Cog):
             ))
 
         # Create exchange and get deposit info
-        deposit_data = self.get_deposit_data(self.supported_currencies[currency], amount)
+        deposit_data = await self.get_deposit_data(self.supported_currencies[currency], amount)
         if not deposit_data:
             await loading_message.delete()
             return await ctx.reply(
@@ -375,61 +370,9 @@ class Deposit(commands.Cog):
                 )
             )
 
-        # Generate QR Code with optimized settings
-        qr_data = f"Amount: {converted_amount:.6f} {currency}\nAddress: {deposit_address}"
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=8,
-            border=1
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-
-        # Create a new background with gradient
-        background = Image.new('RGBA', (500, 600), 'white')  # Reduced height
-        gradient = Image.new('RGBA', background.size, (0,0,0,0))
-        draw_gradient = ImageDraw.Draw(gradient)
-        for y in range(background.height):
-            alpha = int(255 * (1 - y/background.height))
-            draw_gradient.line([(0,y), (background.width,y)], fill=(240,240,255,alpha))
-        background = Image.alpha_composite(background.convert('RGBA'), gradient)
-
-        # Resize and optimize QR code
-        qr_img = qr_img.resize((280, 280), Image.Resampling.LANCZOS)  # Slightly smaller QR
-
-        # Calculate position to center QR code
-        qr_x = (background.width - qr_img.width) // 2
-        qr_y = 120  # Moved up
-        background.paste(qr_img, (qr_x, qr_y))
-
-        # Add text with better fonts
-        draw = ImageDraw.Draw(background)
-        title_font = ImageFont.truetype("roboto.ttf", 36)
-        detail_font = ImageFont.truetype("roboto.ttf", 24)
-
-        # Add text elements with adjusted spacing
-        draw.text((250, 50), f"{ctx.author.name}'s Deposit QR", font=title_font, anchor="mm", fill="black")
-        draw.text((250, qr_y + qr_img.height + 20), f"Amount: {converted_amount:.6f} {currency}", font=detail_font, anchor="mm", fill="black")
-        draw.text((250, qr_y + qr_img.height + 50), "Scan to get address", font=detail_font, anchor="mm", fill="black")
-
-        # Add semi-transparent watermark
-        watermark = "BETSYNC"
-        watermark_font = ImageFont.truetype("roboto.ttf", 60)  # Smaller font
-        watermark_bbox = draw.textbbox((0, 0), watermark, font=watermark_font)
-        watermark_width = watermark_bbox[2] - watermark_bbox[0]
-        watermark_x = (background.width - watermark_width) // 2
-        watermark_y = 520  # Adjusted position
-
-        # Draw watermark with transparency
-        draw.text((watermark_x, watermark_y), watermark, font=watermark_font, fill=(0, 0, 0, 64))
-
-        # Save to bytes
-        img_buf = io.BytesIO()
-        background.save(img_buf, format='PNG')
-        img_buf.seek(0)
-        file = discord.File(img_buf, filename="qrcode.png")
+        # Render the QR card in the render workers
+        card, filename = await get_render_service().render("deposit_card", ctx.author.name, converted_amount, currency, deposit_address)
+        file = discord.File(io.BytesIO(card), filename=filename)
 
         # Calculate tokens to be received based on the deposit USD amount
         # (1 token = 0.0212 USD)
@@ -499,11 +442,6 @@ class Deposit(commands.Cog):
                 color=discord.Color.green()
             )
             await ctx.reply(embed=success_embed, delete_after=10)
-
-            # Start tracking the payment
-            self.bot.loop.create_task(
-                self.track_payment(ctx, order_id, converted_amount, currency, amount)
-            )
         except discord.Forbidden:
             await loading_message.delete()
             return await ctx.reply(
@@ -514,44 +452,37 @@ class Deposit(commands.Cog):
                 )
             )
 
-        # Mark the deposit as pending (store order_id and original USD amount)
-        self.pending_deposits[ctx.author.id] = {
-            "address": deposit_address,
-            "amount": converted_amount,
-            "currency": currency,
-            "order_id": order_id,
-            "usd_amount": amount,           # Original deposit amount in USD
-            "tokens": tokens_to_be_received  # Tokens to be credited
-        }
-
-        # Launch the background task for live payment tracking
-        # Pass the original USD amount for token calculation
-        self.bot.loop.create_task(
-            self.track_payment(ctx, order_id, converted_amount, currency, amount)
+        # Mark the deposit as pending, the watcher polls it until it completes or expires
+        await self.watcher.add(
+            order_id,
+            ctx.author.id,
+            self.deposit_timeout,
+            address=deposit_address,
+            expected_amount=converted_amount,
+            currency=currency,
+            usd_amount=amount,               # Original deposit amount in USD
+            tokens=tokens_to_be_received     # Tokens to be credited
         )
 
-    def process_deposit(self, user_id, tokens_amount):
-        """Updates the user's balance when a deposit is successful."""
+    async def process_deposit(self, user_id, tokens_amount, order_id):
+        """Updates the user's balance when a deposit is successful.
+
+        Credits each order once, returns False if it was already credited.
+        """
         db = Users()
-        # Update balance
-        resp = db.update_balance(user_id, tokens_amount, "tokens", "$inc")
-        
-        # Add to history
         history_entry = {
             "type": "deposit",
             "amount": tokens_amount,
+            "order_id": order_id,
             "timestamp": int(datetime.datetime.now().timestamp())
         }
-        db.collection.update_one(
-            {"discord_id": user_id},
-            {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}  # Keep last 100 entries
-        )
-        
-        # Update total deposit amount
-        db.collection.update_one(
-            {"discord_id": user_id},
-            {"$inc": {"total_deposit_amount": tokens_amount}}
-        )
+        # Balance, deposit total and history in one update
+        credited = await db.credit_deposit(user_id, order_id, {
+            "$inc": {"tokens": tokens_amount, "total_deposit_amount": tokens_amount},
+            "$push": {"history": {"$each": [history_entry], "$slice": -100}}  # Keep last 100 entries
+        })
+        if not credited:
+            return False
         
         user = self.bot.get_user(user_id)
         if user:
@@ -560,69 +491,71 @@ class Deposit(commands.Cog):
                 description=f"You have received **{tokens_amount:.2f} tokens** in your balance.",
                 color=0x00FF00
             )
-            return user.send(embed=embed)
+            try:
+                await user.send(embed=embed)
+            except discord.HTTPException:
+                pass
+        return True
 
-    async def track_payment(self, ctx, order_id, expected_amount, currency, usd_amount):
-        """
-        Monitors the deposit payment.
-        - expected_amount: The crypto amount expected.
-        - usd_amount: The original deposit amount in USD.
-        """
-        start_time = time.time()
-        poll_interval = 15  # seconds between each check
-
-        while time.time() - start_time < self.deposit_timeout:
-            payment_status = self.check_payment(order_id)
-            if payment_status["received"]:
-                received_amount = payment_status["amount"]
-                if received_amount >= expected_amount:
-                    try:
-                        # Calculate tokens based on the original deposit USD amount
-                        tokens_to_be_received = usd_amount / 0.0212
-                        await ctx.author.send(
-                            f"<:checkmark:1344252974188335206> | Full payment of **{received_amount:.6f} {currency}** received! "
-                            f"Processing your deposit... You will receive **{tokens_to_be_received:.2f} tokens**."
-                        )
-                        self.process_deposit(ctx.author.id, tokens_to_be_received)
-                        self.pending_deposits.pop(ctx.author.id, None)
-                        return
-                    except Exception as e:
-                        print(f"[ERROR] Processing deposit: {e}")
-                        await ctx.author.send("There was an error processing your deposit. Please contact support.")
-                        return
-                else:
-                    # Optionally re-fetch the current minimum deposit for this currency
-                    current_minimum = self.get_minimum_deposit(currency)
-                    message = f":warning: Partial payment detected. You sent **{received_amount:.6f} {currency}** but **{expected_amount:.6f} {currency}** is required."
-                    if current_minimum and current_minimum > expected_amount:
-                        message += f" The minimum has increased to **{current_minimum:.6f} {currency}** during your payment."
-                    message += " Please send the remaining amount to complete your deposit or contact support for a refund."
-                    await ctx.author.send(message)
-            await asyncio.sleep(poll_interval)
+    async def _get_user(self, user_id):
+        return self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
 
-        if ctx.author.id in self.pending_deposits:
-            cancel_embed = discord.Embed(
-                title="<:no:1344252518305234987> | DEPOSIT CANCELLED",
-                description=(
-                    "The deposit timer has expired and no full transaction was detected.\n"
-                    "If you'd like to try again, use `!dep <currency> <amount>`."
-                ),
-                color=discord.Color.red()
+    async def deposit_completed(self, order, received_amount):
+        """Credit a fully paid deposit, raising if it couldn't be so the order is kept"""
+        try:
+            credited = await self.process_deposit(order["user_id"], order["tokens"], order["_id"])
+        except Exception as e:
+            print(f"[ERROR] Processing deposit: {e}")
+            user = await self._get_user(order["user_id"])
+            await user.send("There was an error processing your deposit. Please contact support.")
+            raise
+        if not credited:
+            return  # Already credited before a restart, only the order was left
+        try:
+            user = await self._get_user(order["user_id"])
+            await user.send(
+                f"<:checkmark:1344252974188335206> | Full payment of **{received_amount:.6f} {order['currency']}** received! "
+                f"You received **{order['tokens']:.2f} tokens**."
             )
-            try:
-                await ctx.author.send(embed=cancel_embed)
-            except discord.Forbidden:
-                pass
-            self.pending_deposits.pop(ctx.author.id, None)
+        except discord.HTTPException:
+            pass
+
+    async def deposit_partial(self, order, received_amount):
+        """Tell the user they sent less than required"""
+        currency, expected_amount = order["currency"], order["expected_amount"]
+        # Optionally re-fetch the current minimum deposit for this currency
+        current_minimum = await self.get_minimum_deposit(self.supported_currencies.get(currency, currency))
+        message = f":warning: Partial payment detected. You sent **{received_amount:.6f} {currency}** but **{expected_amount:.6f} {currency}** is required."
+        if current_minimum and current_minimum > expected_amount:
+            message += f" The minimum has increased to **{current_minimum:.6f} {currency}** during your payment."
+        message += " Please send the remaining amount to complete your deposit or contact support for a refund."
+        user = await self._get_user(order["user_id"])
+        await user.send(message)
+
+    async def deposit_expired(self, order):
+        """Let the user know their deposit timed out"""
+        cancel_embed = discord.Embed(
+            title="<:no:1344252518305234987> | DEPOSIT CANCELLED",
+            description=(
+                "The deposit timer has expired and no full transaction was detected.\n"
+                "If you'd like to try again, use `!dep <currency> <amount>`."
+            ),
+            color=discord.Color.red()
+        )
+        try:
+            user = await self._get_user(order["user_id"])
+            await user.send(embed=cancel_embed)
+        except discord.HTTPException:
+            pass
 
-    def check_payment(self, order_id):
+    async def check_payment(self, order_id):
         """
         Check the payment status for the given SimpleSwap order ID.
         Returns a dict: {"received": bool, "amount": float}
         """
-        url = f"https://api.simpleswap.io/v1/get_status?api_key={self.api_key}&id={order_id}"
+        url = f"{SIMPLESWAP_API}/get_status?api_key={self.api_key}&id={order_id}"
         try:
-            response = requests.get(url)
+            response = await get_http().get(url)
             data = response.json()
             # Example: SimpleSwap might return a status like "completed" or "partial"
             if data.get("status") in ["completed", "partial"]:
@@ -638,12 +571,8 @@ class Deposit(commands.Cog):
     async def before(self, ctx):
         loading_emoji = emoji()["loading"]
         db = Users()
-        if db.fetch_user(ctx.author.id) != False:
-            pass
-        else:
+        if await db.ensure_user(ctx.author.id):
             print(f"{Fore.YELLOW}[~] {Fore.WHITE}New User Detected... {Fore.BLACK}{ctx.author.id}{Fore.WHITE} {Fore.YELLOW}")
-            dump = {"discord_id": ctx.author.id, "tokens": 0, "credits": 0, "history": [], "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost':0}
-            db.register_new_user(dump)
 
 def setup(bot):
     bot.add_cog(Deposit(bot))
\ No newline at end of file
@@ -1,27 +1,16 @@
 import os
-import requests
 import discord
 from discord.ext import commands
 from Cogs.utils.emojis import emoji
-from Cogs.utils.mongo import Users, Servers
-from colorama import Fore
+from Cogs.utils.mongo import Users, Servers, BALANCE_PROJECTION, STATS_PROJECTION
+from Cogs.utils.http import get_coingecko_prices
 
 class Fetches(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def get_crypto_prices(self):
-        url = "https://api.coingecko.com/api/v3/simple/price"
-        params = {
-            "ids": "bitcoin,ethereum,litecoin,solana",
-            "vs_currencies": "usd"
-        }
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"{Fore.RED}[-] {Fore.WHITE}Failed to fetch crypto prices. Status Code: {Fore.RED}{response.status_code}{Fore.WHITE}")
-            return None
+    async def get_crypto_prices(self):
+        return await get_coingecko_prices("bitcoin,ethereum,litecoin,solana")
 
     @commands.command(name="rate")
     async def rate(self, ctx, amount: float = None, currency: str = None):
@@ -42,7 +31,7 @@ class Fetches(commands.Cog):
             return await ctx.message.reply(embed=embed)
 
         currency = currency.upper()
-        prices = self.get_crypto_prices()
+        prices = await self.get_crypto_prices()
 
         if not prices:
             embed = discord.Embed(
@@ -105,8 +94,8 @@ class Fetches(commands.Cog):
         user = ctx.author
         user_id = user.id
         db = Users()
-        info = db.fetch_user(user_id)
-        if info == False:
+        info = await db.fetch_user(user_id, STATS_PROJECTION)
+        if info is None:
             embed = discord.Embed(
                 title="<:no:1344252518305234987> | User Not Registered", description="wait for autoregister to take place then use this command again", color=0xFF0000)
             embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar)
@@ -151,18 +140,13 @@ class Fetches(commands.Cog):
     async def balance(self, ctx, user:discord.Member = None):
         if user is None:
             user = ctx.author
-        else:
-            db = Users()
-            if db.fetch_user(user.id) == False: 
-                await ctx.reply("**User Does Not Have An Account.**")
-                return
-            else:
-                pass
-            pass
 
         token_value = 0.0212
         db = Users()
-        info = db.fetch_user(user.id)
+        info = await db.fetch_user(user.id, BALANCE_PROJECTION)
+        if info is None:
+            await ctx.reply("**User Does Not Have An Account.**")
+            return
         tokens = info["tokens"]
         credits = info["credits"]
         money = emoji()["money"]
@@ -432,7 +416,7 @@ class Fetches(commands.Cog):
 
         # Get all users sorted by the specified stat
         field_name = "total_won" if stat_type == "wins" else "total_lost"
-        users = list(db.collection.find().sort([(field_name, -1)]))
+        users = await db.collection.find({}, {"_id": 0, "discord_id": 1, field_name: 1}).sort([(field_name, -1)]).to_list(None)
 
         if not users:
             return await ctx.reply("No users found in the leaderboard.")
@@ -475,7 +459,7 @@ class Fetches(commands.Cog):
         server_users = []
 
         # First get all users in the database
-        all_users = list(db.collection.find())
+        all_users = await db.collection.find({}, {"_id": 0, "discord_id": 1, "total_won": 1, "total_lost": 1}).to_list(None)
 
         # Get all members in the server
         server_members = ctx.guild.members
@@ -529,7 +513,7 @@ class Fetches(commands.Cog):
         """Show global leaderboard for amount wagered with pagination"""
         db = Users()
         # Get all users, we'll sort by total_spent
-        users = list(db.collection.find().sort([("total_spent", -1)]))
+        users = await db.collection.find({}, {"_id": 0, "discord_id": 1, "total_spent": 1}).sort([("total_spent", -1)]).to_list(None)
 
         if not users:
             return await ctx.reply("No users found in the leaderboard.")
@@ -571,7 +555,7 @@ class Fetches(commands.Cog):
         server_users = []
 
         # First get all users in the database
-        all_users = list(db.collection.find())
+        all_users = await db.collection.find({}, {"_id": 0, "discord_id": 1, "total_spent": 1}).to_list(None)
 
         # Get all members in the server
         server_members = ctx.guild.members
@@ -2,9 +2,9 @@
 import discord
 import asyncio
 import random
-import time
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 from Cogs.utils.emojis import emoji
 
 
@@ -28,7 +28,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the same bet
         db = Users()
-        user_data = db.fetch_user(interaction.user.id)
+        user_data = await db.fetch_user(interaction.user.id, BALANCE_PROJECTION)
         if not user_data:
             return await interaction.followup.send("Your account couldn't be found. Please try again later.", ephemeral=True)
 
@@ -144,18 +144,7 @@ class CoinflipCog(commands.Cog):
         )
         loading_message = await ctx.reply(embed=loading_embed)
 
-        # Process bet amount
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
-
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
 
         # Format currency type if provided    
         if currency_type:
@@ -186,6 +175,15 @@ class CoinflipCog(commands.Cog):
         try:
             # Handle 'all' or 'max' bet
             if bet_amount.lower() in ['all', 'max']:
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
                 bet_amount_value = user_data['tokens'] + user_data['credits']
             else:
                 # Check if bet has 'k' or 'm' suffix
@@ -216,77 +214,44 @@ class CoinflipCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Get user balances
-        tokens_balance = user_data['tokens']
-        credits_balance = user_data['credits']
+        # Take the bet and record game stats in one atomic update
+        bet_split = await db.debit_bet(ctx.author.id, bet_amount_value, currency_type)
 
-        # Determine which currency to use based on the logic:
-        # 1. If specific currency requested, try to use that
-        # 2. If has enough tokens, use tokens
-        # 3. If not enough tokens but enough credits, use credits
-        # 4. If neither is enough alone but combined they work, use both
-        tokens_used = 0
-        credits_used = 0
-
-        if currency_type == 'tokens':
-            # User specifically wants to use tokens
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            else:
-                await loading_message.delete()
+        if bet_split is None:
+            await loading_message.delete()
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if user_data is None:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | User Not Found",
+                    description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                    color=0xFF0000
+                )
+            elif currency_type == 'tokens':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Tokens",
-                    description=f"You don't have enough tokens. Your balance: **{tokens_balance:.2f} tokens**",
+                    description=f"You don't have enough tokens. Your balance: **{user_data['tokens']:.2f} tokens**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        elif currency_type == 'credits':
-            # User specifically wants to use credits
-            if bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            else:
-                await loading_message.delete()
+            elif currency_type == 'credits':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Credits",
-                    description=f"You don't have enough credits. Your balance: **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough credits. Your balance: **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        else:
-            # Auto determine what to use
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            elif bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            elif bet_amount_value <= tokens_balance + credits_balance:
-                # Use all tokens and some credits
-                tokens_used = tokens_balance
-                credits_used = bet_amount_value - tokens_balance
             else:
-                await loading_message.delete()
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Funds",
-                    description=f"You don't have enough funds. Your balance: **{tokens_balance:.2f} tokens** and **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough funds. Your balance: **{user_data['tokens']:.2f} tokens** and **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-
-        # Deduct from user balances
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, tokens_balance - tokens_used, "tokens")
+            return await ctx.reply(embed=embed)
 
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, credits_balance - credits_used, "credits")
+        tokens_used = bet_split["tokens_used"]
+        credits_used = bet_split["credits_used"]
 
         # Get total amount bet
         total_bet = tokens_used + credits_used
 
-        # Record game stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_played": 1, "total_spent": total_bet}}
-        )
-
         # Format bet description
         if tokens_used > 0 and credits_used > 0:
             bet_description = f"**Bet Amount:** {tokens_used:.2f} tokens + {credits_used:.2f} credits"
@@ -306,6 +271,7 @@ class CoinflipCog(commands.Cog):
         # Delete loading message
         await loading_message.delete()
 
+        settled = False
         try:
             # Create initial embed with rolling animation
             coin_flip_animated = "<a:coinflipAnimated:1344971284513030235>"
@@ -343,91 +309,17 @@ class CoinflipCog(commands.Cog):
             if user_won:
                 winnings = total_bet * multiplier
                 
-                # Update user balance - use increment operator to add to existing balance
-                db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-                
-                # Add to win history
-                win_entry = {
-                    "type": "win",
-                    "game": "coinflip",
-                    "bet": total_bet,
-                    "amount": winnings,
-                    "multiplier": multiplier,
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$push": {"history": {"$each": [win_entry], "$slice": -100}}}
-                )
-                
-                # Update server history
-                server_db = Servers()
-                server_data = server_db.fetch_server(ctx.guild.id)
-                
-                if server_data:
-                    server_win_entry = {
-                        "type": "win",
-                        "game": "coinflip",
-                        "user_id": ctx.author.id,
-                        "user_name": ctx.author.name,
-                        "bet": total_bet,
-                        "amount": winnings,
-                        "multiplier": multiplier,
-                        "timestamp": int(time.time())
-                    }
-                    server_db.collection.update_one(
-                        {"server_id": ctx.guild.id},
-                        {"$push": {"server_bet_history": {"$each": [server_win_entry], "$slice": -100}}}
-                    )
-                
-                # Update user stats
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$inc": {"total_won": 1, "total_earned": winnings}}
-                )
+                # Pay out winnings and log the win
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "coinflip", "win", total_bet,
+                    payout=winnings, multiplier=multiplier
+                ))
             else:
-                # Add to loss history
-                loss_entry = {
-                    "type": "loss",
-                    "game": "coinflip",
-                    "bet": total_bet,
-                    "amount": total_bet,
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$push": {"history": {"$each": [loss_entry], "$slice": -100}}}
-                )
-                
-                # Update server history
-                server_db = Servers()
-                server_data = server_db.fetch_server(ctx.guild.id)
-                
-                if server_data:
-                    server_loss_entry = {
-                        "type": "loss",
-                        "game": "coinflip",
-                        "user_id": ctx.author.id,
-                        "user_name": ctx.author.name,
-                        "bet": total_bet,
-                        "timestamp": int(time.time())
-                    }
-                    server_db.collection.update_one(
-                        {"server_id": ctx.guild.id},
-                        {"$push": {"server_bet_history": {"$each": [server_loss_entry], "$slice": -100}}}
-                    )
-                    
-                    # Update server profit
-                    server_db.collection.update_one(
-                        {"server_id": ctx.guild.id},
-                        {"$inc": {"total_profit": total_bet}}
-                    )
-                
-                # Update user stats
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$inc": {"total_lost": 1}}
-                )
+                # Log the loss
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "coinflip", "loss", total_bet, multiplier=0
+                ))
+            settled = True
 
             # Create result embed
             if user_won:
@@ -477,6 +369,10 @@ class CoinflipCog(commands.Cog):
                 description="An error occurred while playing coinflip. Please try again later.",
                 color=0xFF0000
             )
+            # Nothing was paid out yet, so the bet goes back
+            if not settled:
+                await db.refund_bet(ctx.author.id, tokens_used, credits_used)
+                error_embed.description = "An error occurred while playing coinflip. Your bet has been refunded."
             await ctx.send(embed=error_embed)
             
             # Make sure to clean up
@@ -2,15 +2,74 @@
 import discord
 import random
 import asyncio
-import matplotlib.pyplot as plt
 import io
-import numpy as np
-import time
 import math
+import os
+import time
 from discord.ext import commands
-from Cogs.utils.mongo import Users
+from Cogs.utils.mongo import Users, Servers, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome, SettlementError
 from Cogs.utils.emojis import emoji
+from Cogs.utils.frame_cache import get_frame_cache
+from Cogs.utils.edits import MessageEditor
 from PIL import Image, ImageDraw
+from dotenv import load_dotenv
+load_dotenv()
+
+# "channel" or "guild" runs one shared round per channel or guild, "off" keeps every game private
+CRASH_ROUNDS = os.environ.get("CRASH_ROUNDS", "channel")
+CRASH_BETTING_WINDOW = int(os.environ.get("CRASH_BETTING_WINDOW", 15))
+# Ticks between graph uploads, ticks in between only update the embed text (per guild with !crashkeyframes)
+CRASH_KEYFRAME_INTERVAL = int(os.environ.get("CRASH_KEYFRAME_INTERVAL", 10))
+# Cash outs listed on the round message before the rest are summarised
+CRASH_ROUND_LIST_LIMIT = int(os.environ.get("CRASH_ROUND_LIST_LIMIT", 10))
+
+# Growth curve. The multiplier used to climb GROWTH_RATE per tick with ticks
+# 1 / (1 + m / 2) seconds apart and never closer than MIN_TICK; in continuous
+# time that's m(t) = 3e^(GROWTH_RATE * t / 2) - 2 up to CAP_MULTIPLIER, then a
+# straight line. Cash outs are priced on this curve at the time of the click.
+GROWTH_RATE = 0.05
+MIN_TICK = 0.3
+CAP_MULTIPLIER = 2 / MIN_TICK - 2
+CAP_TIME = 2 / GROWTH_RATE * math.log((CAP_MULTIPLIER + 2) / 3)
+
+
+def multiplier_at(elapsed):
+    """Multiplier `elapsed` seconds into a game"""
+    if elapsed <= CAP_TIME:
+        return 3 * math.exp(GROWTH_RATE * max(elapsed, 0) / 2) - 2
+    return CAP_MULTIPLIER + (elapsed - CAP_TIME) * GROWTH_RATE / MIN_TICK
+
+
+def time_to_reach(multiplier):
+    """Seconds until a game reaches `multiplier`"""
+    if multiplier <= CAP_MULTIPLIER:
+        return 2 / GROWTH_RATE * math.log((multiplier + 2) / 3)
+    return CAP_TIME + (multiplier - CAP_MULTIPLIER) * MIN_TICK / GROWTH_RATE
+
+
+def tick_delay(multiplier):
+    """Seconds between animation ticks, faster at the start"""
+    return max(MIN_TICK, min(1.0 / (1 + multiplier * 0.5), 0.8))
+
+
+def clicked_at(interaction):
+    """When a button was clicked, from the interaction's id, never later than when it got here"""
+    return min(discord.utils.snowflake_time(interaction.id).timestamp(), time.time())
+
+
+class CashOutView(discord.ui.View):
+    """Cash Out button on a running crash game or round"""
+
+    def __init__(self, on_cash_out):
+        # Stays up as long as the game runs, it's stopped when the game ends
+        super().__init__(timeout=None)
+        self.on_cash_out = on_cash_out
+
+    @discord.ui.button(label="Cash Out", style=discord.ButtonStyle.success, emoji="💰")
+    async def cash_out(self, button, interaction: discord.Interaction):
+        await self.on_cash_out(interaction)
+
 
 class CrashGame:
     def __init__(self, cog, ctx, bet_amount, user_id):
@@ -25,6 +84,36 @@ class CrashGame:
         self.tokens_used = 0
         self.credits_used = 0
         self.message = None
+        self.started_at = None
+        self.crash_at = None
+        self.cash_out_event = asyncio.Event()
+        self.view = CashOutView(self.on_cash_out)
+
+    async def on_cash_out(self, interaction):
+        """Cash out at the multiplier the button was clicked at"""
+        if interaction.user.id != self.user_id:
+            return await interaction.response.send_message("This is not your game!", ephemeral=True)
+        if self.started_at is None:
+            return await interaction.response.send_message("The game is still starting!", ephemeral=True)
+        if self.cashed_out:
+            return await interaction.response.send_message("You already cashed out!", ephemeral=True)
+        clicked = clicked_at(interaction)
+        if self.crashed or clicked >= self.crash_at:
+            return await interaction.response.send_message("Too late, you can't cash out anymore!", ephemeral=True)
+
+        # Set cash out values and notify the main loop
+        self.cashed_out = True
+        self.cash_out_multiplier = multiplier_at(clicked - self.started_at)
+        self.cash_out_event.set()
+
+        # Acknowledge straight away with the result
+        winnings = round(self.bet_amount * self.cash_out_multiplier, 2)  # Round to 2 decimal places
+        feedback_embed = discord.Embed(
+            title="✅ Cash Out Successful!",
+            description=f"You cashed out at **{self.cash_out_multiplier:.2f}x**\nWinnings: **{winnings} credits**",
+            color=0x00FF00
+        )
+        await interaction.response.send_message(embed=feedback_embed, ephemeral=True)
 
 class PlayAgainView(discord.ui.View):
     def __init__(self, cog, ctx, bet_amount, timeout=60):
@@ -45,7 +134,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the same bet
         db = Users()
-        user_data = db.fetch_user(interaction.user.id)
+        user_data = await db.fetch_user(interaction.user.id, BALANCE_PROJECTION)
         if not user_data:
             return await interaction.followup.send("Your account couldn't be found. Please try again later.", ephemeral=True)
 
@@ -96,25 +185,292 @@ class PlayAgainView(discord.ui.View):
             await interaction.followup.send("Starting a new game with the same bet...", ephemeral=True)
             await self.cog.crash(self.ctx, str(self.bet_amount))
 
+def bet_summary(tokens_used, credits_used):
+    """Bet amount line for a game embed"""
+    if tokens_used > 0 and credits_used > 0:
+        return f"**Bet Amount:** {tokens_used} tokens + {credits_used} credits"
+    elif tokens_used > 0:
+        return f"**Bet Amount:** {tokens_used} tokens"
+    return f"**Bet Amount:** {credits_used} credits"
+
+
+class Keyframes:
+    """Decides which crash ticks upload a new graph
+
+    Ticks in between only change the embed text and keep showing the last
+    graph, which is still attached to the message. An interval of 0 uploads
+    only on state changes.
+    """
+
+    def __init__(self, interval, embed=None):
+        self.interval = interval
+        self.embed = embed  # Embed of the last uploaded graph
+        self.ticks = 0
+        self.forced = False
+
+    def force(self):
+        """Upload on the next tick, e.g. after a cash out"""
+        self.forced = True
+
+    def due(self):
+        return self.embed is None or self.forced or (self.interval > 0 and self.ticks >= self.interval)
+
+    def uploaded(self, embed):
+        self.embed = embed
+        self.ticks = 0
+        self.forced = False
+
+    def text_embed(self, title, description):
+        """The last graph's embed with new text"""
+        self.ticks += 1
+        embed = self.embed.copy()
+        embed.title = title
+        embed.description = description
+        return embed
+
+
+class CrashRound:
+    """One crash round shared by everyone betting in a channel or guild
+
+    Bets are taken during a betting window, then a single crash point and a
+    single animated message serve every bettor. Cash outs come from the
+    message's Cash Out button, priced at the moment of the click, and show up
+    in its next frame; all bettors are settled together in one bulk write
+    when the round crashes.
+    """
+
+    def __init__(self, cog, key, channel):
+        self.cog = cog
+        self.key = key
+        self.channel = channel
+        self.bettors = {}  # user_id -> CrashGame
+        self.cashouts = []  # CrashGames in the order they cashed out
+        self.starts_at = time.time() + CRASH_BETTING_WINDOW
+        self.started = False
+        self.crashed = False
+        self.settled = False
+        self.multiplier = 1.0
+        self.crash_point = None
+        self.started_at = None
+        self.crash_at = None
+        self.message = None
+        self.view = CashOutView(self.on_cash_out)
+        self.editor = None
+        self.keyframes = None
+        self.task = None
+
+    def add(self, crash_game):
+        """Add a bettor, returns False if they already have a bet in this round"""
+        if crash_game.user_id in self.bettors:
+            return False
+        self.bettors[crash_game.user_id] = crash_game
+        return True
+
+    def cash_out(self, user_id, clicked):
+        """Cash a bettor out at the multiplier they clicked at, returns False if they can't"""
+        crash_game = self.bettors.get(user_id)
+        if crash_game is None or not self.started or self.crashed or crash_game.cashed_out:
+            return False
+        if clicked >= self.crash_at:
+            return False
+        crash_game.cashed_out = True
+        crash_game.cash_out_multiplier = multiplier_at(clicked - self.started_at)
+        self.cashouts.append(crash_game)
+        self.keyframes.force()
+        return True
+
+    async def on_cash_out(self, interaction):
+        if interaction.user.id not in self.bettors:
+            return await interaction.response.send_message("You don't have a bet in this round!", ephemeral=True)
+        if self.bettors[interaction.user.id].cashed_out:
+            return await interaction.response.send_message("You already cashed out!", ephemeral=True)
+        if not self.cash_out(interaction.user.id, clicked_at(interaction)):
+            return await interaction.response.send_message("Too late, you can't cash out anymore!", ephemeral=True)
+
+        crash_game = self.bettors[interaction.user.id]
+        winnings = round(crash_game.bet_amount * crash_game.cash_out_multiplier, 2)
+        feedback_embed = discord.Embed(
+            title="✅ Cash Out Successful!",
+            description=f"You cashed out at **{crash_game.cash_out_multiplier:.2f}x**\nWinnings: **{winnings} credits**",
+            color=0x00FF00
+        )
+        await interaction.response.send_message(embed=feedback_embed, ephemeral=True)
+
+    @property
+    def pot(self):
+        return sum(crash_game.bet_amount for crash_game in self.bettors.values())
+
+    def _footer(self, embed):
+        embed.set_footer(text="BetSync Casino", icon_url=self.cog.bot.user.avatar.url)
+        return embed
+
+    def _cashout_lines(self):
+        lines = [
+            f"{crash_game.ctx.author.name} — **{crash_game.cash_out_multiplier:.2f}x** "
+            f"(+{round(crash_game.bet_amount * crash_game.cash_out_multiplier, 2)} credits)"
+            for crash_game in self.cashouts[:CRASH_ROUND_LIST_LIMIT]
+        ]
+        if len(self.cashouts) > CRASH_ROUND_LIST_LIMIT:
+            lines.append(f"...and {len(self.cashouts) - CRASH_ROUND_LIST_LIMIT} more")
+        return "\n".join(lines)
+
+    def betting_embed(self):
+        embed = discord.Embed(
+            title="🚀 | Crash Round Starting",
+            description=(
+                f"Bets are open! Join with `!crash <amount>`, the round starts <t:{int(self.starts_at)}:R>.\n\n"
+                "Press **Cash Out** once it's running to cash out before it crashes!"
+            ),
+            color=0x00FFAE
+        )
+        return self._footer(embed)
+
+    def _running_description(self):
+        description = (
+            f"**Bettors:** {len(self.bettors)} | **Pot:** {round(self.pot, 2)}\n"
+            f"**Current Multiplier:** {self.multiplier:.2f}x\n\n"
+            "Press **Cash Out** before it crashes!"
+        )
+        if self.cashouts:
+            description += f"\n\n**Cashed Out:**\n{self._cashout_lines()}"
+        return description
+
+    def _crashed_description(self):
+        lost = len(self.bettors) - len(self.cashouts)
+        description = (
+            f"**Crashed At:** {self.crash_point:.2f}x\n"
+            f"**Bettors:** {len(self.bettors)} | **Pot:** {round(self.pot, 2)}\n\n"
+        )
+        if self.cashouts:
+            description += f"**Cashed Out:**\n{self._cashout_lines()}\n\n"
+        description += f"**Lost:** {lost} bettor{'s' if lost != 1 else ''}"
+        return description
+
+    async def _show(self, title, description, multiplier, crashed=False, final=False, **fields):
+        """Render a frame for the round's message, skipping it while the last one is still waiting"""
+        if not final and not self.editor.wants_frame():
+            return
+        if not final and not self.keyframes.due():
+            self.editor.frame(embed=self.keyframes.text_embed(title, description), **fields)
+            return
+        embed, file = await self.cog.generate_crash_graph(multiplier, crashed, fallback=final)
+        embed.title = title
+        embed.description = description
+        if crashed:
+            embed.color = 0xFF0000
+        self._footer(embed)
+        self.keyframes.uploaded(embed)
+        fields["embed"] = embed
+        if file:
+            fields["files"] = [file]
+        if final:
+            await self.editor.final(**fields)
+        else:
+            self.editor.frame(**fields)
+
+    def outcomes(self):
+        """Settlement for every bettor once the round has crashed"""
+        outcomes = []
+        for crash_game in self.bettors.values():
+            author = crash_game.ctx.author
+            guild = crash_game.ctx.guild
+            if crash_game.cashed_out:
+                winnings = round(crash_game.bet_amount * crash_game.cash_out_multiplier, 2)
+                outcomes.append(GameOutcome(
+                    author, guild, "crash", "win", crash_game.bet_amount,
+                    payout=winnings, multiplier=round(crash_game.cash_out_multiplier, 2), winnings=winnings
+                ))
+            else:
+                outcomes.append(GameOutcome(
+                    author, guild, "crash", "loss", crash_game.bet_amount, multiplier=round(self.crash_point, 2)
+                ))
+        return outcomes
+
+    async def refund(self, crash_games):
+        """Hand back the bets of bettors the round couldn't pay out and tell them"""
+        db = Users()
+        for crash_game in crash_games:
+            try:
+                await db.refund_bet(crash_game.user_id, crash_game.tokens_used, crash_game.credits_used)
+            except Exception as refund_error:
+                print(f"Error refunding bet: {refund_error}")
+        try:
+            if len(crash_games) == len(self.bettors):
+                description = "An error occurred during the crash round. All bets have been refunded."
+            else:
+                description = "An error occurred while paying out the crash round. Your bets have been refunded."
+            error_embed = discord.Embed(title="❌ | Round Error", description=description, color=0xFF0000)
+            mentions = " ".join(f"<@{crash_game.user_id}>" for crash_game in crash_games)
+            await self.channel.send(content=mentions or None, embed=error_embed)
+        except Exception:
+            pass
+
+    async def run(self):
+        """Wait out the betting window, play the round and settle everyone"""
+        try:
+            await asyncio.sleep(max(0, self.starts_at - time.time()))
+            self.crash_point = self.cog.generate_crash_point()
+            self.editor = MessageEditor(self.message)
+            self.keyframes = Keyframes(await self.cog.keyframe_interval(self.channel.guild))
+            self.started_at = time.time()
+            self.crash_at = self.started_at + time_to_reach(self.crash_point)
+            self.started = True
+
+            await self._show("🚀 | Crash Round Started", self._running_description(), 1.0, view=self.view)
+
+            # Nothing left to play for once everyone has cashed out
+            while len(self.cashouts) < len(self.bettors):
+                now = time.time()
+                await asyncio.sleep(min(tick_delay(self.multiplier), max(0, self.crash_at - now)))
+
+                now = time.time()
+                if now >= self.crash_at:
+                    break
+                self.multiplier = multiplier = multiplier_at(now - self.started_at)
+
+                try:
+                    await self._show("🚀 | Crash Round In Progress", self._running_description(), multiplier)
+                except Exception as e:
+                    print(f"Error updating crash round: {e}")
+
+            self.crashed = True
+            self.view.stop()
+            for crash_game in self.bettors.values():
+                crash_game.crashed = True
+
+            # Pay everyone out before touching the message so a render error can't skip it
+            try:
+                await Settlement().settle_many(self.outcomes())
+            except SettlementError as e:
+                # Everyone else was paid, only these bets go back
+                print(f"Error settling crash round: {e}")
+                await self.refund([self.bettors[outcome.user_id] for outcome in e.failed])
+            self.settled = True
+
+            await self._show(
+                "💥 | CRASHED!", self._crashed_description(), self.crash_point, crashed=True, final=True, view=None
+            )
+
+        except Exception as e:
+            print(f"Error in crash round: {e}")
+            if not self.settled:
+                # Hand every bet back if the round couldn't be settled
+                await self.refund(list(self.bettors.values()))
+        finally:
+            self.view.stop()
+            for user_id in self.bettors:
+                if self.cog.ongoing_games.get(user_id, {}).get("round") is self:
+                    del self.cog.ongoing_games[user_id]
+            if self.cog.rounds.get(self.key) is self:
+                del self.cog.rounds[self.key]
+
+
 class CrashCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.ongoing_games = {}
-
-    @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
-        # Check if this is a cash out reaction for a crash game
-        if str(reaction.emoji) == "💰" and user.id in self.ongoing_games:
-            game_data = self.ongoing_games.get(user.id)
-            if game_data and "crash_game" in game_data:
-                crash_game = game_data["crash_game"]
-                # Only process if it's the game owner and the game is still active
-                if (user.id == crash_game.user_id and 
-                    reaction.message.id == crash_game.message.id and
-                    not crash_game.crashed and not crash_game.cashed_out):
-                    # Set cash out values
-                    crash_game.cashed_out = True
-                    crash_game.cash_out_multiplier = crash_game.current_multiplier
+        self.rounds = {}  # channel or guild id -> CrashRound
+        self.keyframe_intervals = {}  # guild id -> ticks between graph uploads
 
     @commands.command(aliases=["cr"])
     async def crash(self, ctx, bet_amount: str = None, currency_type: str = None):
@@ -127,9 +483,10 @@ class CrashCog(commands.Cog):
                     "**Usage:** `!crash <amount> [currency_type]`\n"
                     "**Example:** `!crash 100` or `!crash 100 tokens`\n\n"
                     "- Watch as the multiplier increases in real-time\n"
-                    "- React with 💰 before it crashes to cash out and win\n"
+                    "- Press **Cash Out** before it crashes to win\n"
                     "- If it crashes before you cash out, you lose your bet\n"
-                    "- The longer you wait, the higher the potential reward!\n\n"
+                    "- The longer you wait, the higher the potential reward!\n"
+                    f"- In servers everyone rides the same round; bets are open for {CRASH_BETTING_WINDOW} seconds before it starts\n\n"
                     "You can bet using tokens (T) or credits (C):\n"
                     "- If you have enough tokens, they will be used first\n"
                     "- If you don't have enough tokens, credits will be used\n"
@@ -149,154 +506,333 @@ class CrashCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Send loading message
-        loading_emoji = emoji()["loading"]
-        loading_embed = discord.Embed(
-            title=f"{loading_emoji} | Preparing Crash Game...",
-            description="Please wait while we set up your game.",
-            color=0x00FFAE
-        )
-        loading_message = await ctx.reply(embed=loading_embed)
-
-        # Process bet amount
-        db = Users()
-        user_data = db.fetch_user(ctx.author.id)
+        # Bets only open between shared rounds
+        round_key = self.round_key(ctx)
+        crash_round = self.rounds.get(round_key)
+        if crash_round is not None and crash_round.started:
+            return await ctx.reply(embed=self.round_in_progress_embed())
 
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
+        # Claim the game before the first await so a second command can't place a second bet
+        claim = {}
+        self.ongoing_games[ctx.author.id] = claim
+        try:
+            # Send loading message
+            loading_emoji = emoji()["loading"]
+            loading_embed = discord.Embed(
+                title=f"{loading_emoji} | Preparing Crash Game...",
+                description="Please wait while we set up your game.",
+                color=0x00FFAE
             )
-            return await ctx.reply(embed=embed)
+            loading_message = await ctx.reply(embed=loading_embed)
 
-        # Format currency type if provided    
-        if currency_type:
-            currency_type = currency_type.lower()
-            # Allow shorthand T for tokens and C for credits
-            if currency_type == 't':
-                currency_type = 'tokens'
-            elif currency_type == 'c':
-                currency_type = 'credits'
+            db = Users()
 
-        # Validate bet amount
-        try:
-            # Handle 'all' or 'max' bet
-            if bet_amount.lower() in ['all', 'max']:
-                bet_amount_value = user_data['tokens'] + user_data['credits']
-            else:
-                # Check if bet has 'k' or 'm' suffix
-                if bet_amount.lower().endswith('k'):
-                    bet_amount_value = float(bet_amount[:-1]) * 1000
-                elif bet_amount.lower().endswith('m'):
-                    bet_amount_value = float(bet_amount[:-1]) * 1000000
+            # Format currency type if provided    
+            if currency_type:
+                currency_type = currency_type.lower()
+                # Allow shorthand T for tokens and C for credits
+                if currency_type == 't':
+                    currency_type = 'tokens'
+                elif currency_type == 'c':
+                    currency_type = 'credits'
+
+            # Validate bet amount
+            try:
+                # Handle 'all' or 'max' bet
+                if bet_amount.lower() in ['all', 'max']:
+                    user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                    if user_data is None:
+                        await loading_message.delete()
+                        embed = discord.Embed(
+                            title="<:no:1344252518305234987> | User Not Found",
+                            description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                            color=0xFF0000
+                        )
+                        return await ctx.reply(embed=embed)
+                    bet_amount_value = user_data['tokens'] + user_data['credits']
                 else:
-                    bet_amount_value = float(bet_amount)
+                    # Check if bet has 'k' or 'm' suffix
+                    if bet_amount.lower().endswith('k'):
+                        bet_amount_value = float(bet_amount[:-1]) * 1000
+                    elif bet_amount.lower().endswith('m'):
+                        bet_amount_value = float(bet_amount[:-1]) * 1000000
+                    else:
+                        bet_amount_value = float(bet_amount)
+
+                bet_amount_value = float(bet_amount_value)  # Keep as float to support decimals
 
-            bet_amount_value = float(bet_amount_value)  # Keep as float to support decimals
+                if bet_amount_value <= 0:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | Invalid Amount",
+                        description="Bet amount must be greater than 0.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
 
-            if bet_amount_value <= 0:
+            except ValueError:
                 await loading_message.delete()
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Invalid Amount",
-                    description="Bet amount must be greater than 0.",
+                    description="Please enter a valid number or 'all'.",
                     color=0xFF0000
                 )
                 return await ctx.reply(embed=embed)
 
-            # Get user balances
-            tokens_balance = user_data['tokens']
-            credits_balance = user_data['credits']
-
-            # Determine which currency to use based on the logic:
-            # 1. If specific currency requested, try to use that
-            # 2. If has enough tokens, use tokens
-            # 3. If not enough tokens but enough credits, use credits
-            # 4. If neither is enough alone but combined they work, use both
-            tokens_used = 0
-            credits_used = 0
-
-            if currency_type == 'tokens':
-                # User specifically wants to use tokens
-                if bet_amount_value <= tokens_balance:
-                    tokens_used = bet_amount_value
-                else:
-                    await loading_message.delete()
+            # Take the bet and record game stats in one atomic update
+            bet_split = await db.debit_bet(ctx.author.id, bet_amount_value, currency_type)
+
+            if bet_split is None:
+                await loading_message.delete()
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                elif currency_type == 'tokens':
                     embed = discord.Embed(
                         title="<:no:1344252518305234987> | Insufficient Tokens",
-                        description=f"You don't have enough tokens. Your balance: **{tokens_balance} tokens**",
+                        description=f"You don't have enough tokens. Your balance: **{user_data['tokens']} tokens**",
                         color=0xFF0000
                     )
-                    return await ctx.reply(embed=embed)
-
-            elif currency_type == 'credits':
-                # User specifically wants to use credits
-                if bet_amount_value <= credits_balance:
-                    credits_used = bet_amount_value
-                else:
-                    await loading_message.delete()
+                elif currency_type == 'credits':
                     embed = discord.Embed(
                         title="<:no:1344252518305234987> | Insufficient Credits",
-                        description=f"You don't have enough credits. Your balance: **{credits_balance} credits**",
+                        description=f"You don't have enough credits. Your balance: **{user_data['credits']} credits**",
                         color=0xFF0000
                     )
-                    return await ctx.reply(embed=embed)
-
-            else:
-                # Auto-determine what to use
-                if tokens_balance >= bet_amount_value:
-                    # Use tokens first if available
-                    tokens_used = bet_amount_value
-                elif credits_balance >= bet_amount_value:
-                    # Use credits if not enough tokens
-                    credits_used = bet_amount_value
-                elif tokens_balance + credits_balance >= bet_amount_value:
-                    # Use a combination of both
-                    tokens_used = tokens_balance
-                    credits_used = bet_amount_value - tokens_balance
                 else:
-                    # Not enough funds
-                    await loading_message.delete()
                     embed = discord.Embed(
                         title="<:no:1344252518305234987> | Insufficient Funds",
                         description=(
                             f"You don't have enough funds for this bet.\n"
-                            f"Your balance: **{tokens_balance} tokens** and **{credits_balance} credits**\n"
+                            f"Your balance: **{user_data['tokens']} tokens** and **{user_data['credits']} credits**\n"
                             f"Required: **{bet_amount_value}**"
                         ),
                         color=0xFF0000
                     )
-                    return await ctx.reply(embed=embed)
+                return await ctx.reply(embed=embed)
+
+            tokens_used = bet_split["tokens_used"]
+            credits_used = bet_split["credits_used"]
+
+            # Get total amount bet
+            total_bet = tokens_used + credits_used
+
+            # In a server the bet rides the shared round instead of a private one
+            if round_key is not None:
+                return await self.join_round(ctx, round_key, loading_message, tokens_used, credits_used)
+
+            # Create CrashGame object instead of a view
+            crash_game = CrashGame(self, ctx, total_bet, ctx.author.id)
 
-        except ValueError:
+            crash_point = self.generate_crash_point()
+
+            # Format bet amount description
+            bet_description = ""
+            if tokens_used > 0 and credits_used > 0:
+                bet_description = f"**Bet Amount:** {tokens_used} tokens + {credits_used} credits"
+            elif tokens_used > 0:
+                bet_description = f"**Bet Amount:** {tokens_used} tokens"
+            else:
+                bet_description = f"**Bet Amount:** {credits_used} credits"
+
+            # Create initial graph
+            try:
+                initial_embed, initial_file = await self.generate_crash_graph(1.0, False)
+                initial_embed.title = "🚀 | Crash Game Started"
+                initial_embed.description = (
+                    f"{bet_description}\n"
+                    f"**Current Multiplier:** 1.00x\n\n"
+                    "Press **Cash Out** before it crashes!"
+                )
+            except Exception as e:
+                print(f"Error generating crash graph: {e}")
+                # Create a simple embed if graph fails
+                initial_embed = discord.Embed(
+                    title="🚀 | Crash Game Started", 
+                    description=(
+                        f"{bet_description}\n"
+                        f"**Current Multiplier:** 1.00x\n\n"
+                        "Click **Cash Out** before it crashes to win!"
+                    ),
+                    color=0x00FFAE
+                )
+                initial_file = None
+
+            # Delete loading message and send initial game message
             await loading_message.delete()
+
+            # Send message with file attachment if available
+            if initial_file:
+                message = await ctx.reply(embed=initial_embed, file=initial_file, view=crash_game.view)
+            else:
+                message = await ctx.reply(embed=initial_embed, view=crash_game.view)
+
+            # Store message in the crash game object
+            crash_game.message = message
+
+            # Mark the game as ongoing
+            self.ongoing_games[ctx.author.id] = {
+                "message": message,
+                "crash_game": crash_game,
+                "tokens_used": tokens_used,
+                "credits_used": credits_used
+            }
+
+            # Track the currency used for winning calculation
+            crash_game.tokens_used = tokens_used
+            crash_game.credits_used = credits_used
+
+            # Start the game
+            await self.run_crash_game(ctx, message, crash_game, crash_point, total_bet)
+        finally:
+            # Only the claim is dropped, a placed bet keeps the entry its game set
+            if self.ongoing_games.get(ctx.author.id) is claim:
+                del self.ongoing_games[ctx.author.id]
+
+    async def keyframe_interval(self, guild):
+        """Ticks between crash graph uploads in a guild"""
+        if guild is None:
+            return CRASH_KEYFRAME_INTERVAL
+        if guild.id not in self.keyframe_intervals:
+            server_data = await Servers().fetch_server(guild.id, {"crash_keyframe_interval": 1})
+            interval = server_data.get("crash_keyframe_interval") if server_data else None
+            self.keyframe_intervals[guild.id] = CRASH_KEYFRAME_INTERVAL if interval is None else interval
+        return self.keyframe_intervals[guild.id]
+
+    @commands.command(aliases=["crashkf"])
+    async def crashkeyframes(self, ctx, interval: int = None):
+        """Set how many crash ticks pass between graph uploads in this server"""
+        if ctx.guild is None:
+            return await ctx.reply("This command can only be used in a server.")
+
+        if interval is None:
+            current = await self.keyframe_interval(ctx.guild)
+            if current:
+                uploads = f"The crash graph is uploaded every **{current}** ticks in this server."
+            else:
+                uploads = "The crash graph is only uploaded on start, cash out and crash in this server."
+            embed = discord.Embed(
+                title="🚀 | Crash Keyframes",
+                description=(
+                    f"{uploads}\n"
+                    "Ticks in between only update the multiplier text.\n\n"
+                    "**Usage:** `!crashkeyframes <ticks>` (0 for state changes only, 1 for every tick)"
+                ),
+                color=0x00FFAE
+            )
+            embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+            return await ctx.reply(embed=embed)
+
+        db = Servers()
+        server_data = await db.fetch_server(ctx.guild.id, {"server_admins": 1})
+        if server_data is None:
             embed = discord.Embed(
-                title="<:no:1344252518305234987> | Invalid Amount",
-                description="Please enter a valid number or 'all'.",
+                title="<:no:1344252518305234987> | Server Not Found",
+                description="This server isn't registered in our database. Please contact the developer.",
                 color=0xFF0000
             )
             return await ctx.reply(embed=embed)
 
-        # Deduct from user balances
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, tokens_balance - tokens_used, "tokens")
+        if not ctx.author.guild_permissions.manage_guild and ctx.author.id not in server_data.get("server_admins", []):
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Access Denied",
+                description="Only server admins can change this setting.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
 
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, credits_balance - credits_used, "credits")
+        if not 0 <= interval <= 100:
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Invalid Interval",
+                description="The interval must be between 0 and 100 ticks.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
 
-        # Get total amount bet
-        total_bet = tokens_used + credits_used
+        await db.collection.update_one(
+            {"server_id": ctx.guild.id},
+            {"$set": {"crash_keyframe_interval": interval}}
+        )
+        self.keyframe_intervals[ctx.guild.id] = interval
 
-        # Record game stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_played": 1, "total_spent": total_bet}}
+        embed = discord.Embed(
+            title="<:checkmark:1344252974188335206> | Crash Keyframes Updated",
+            description=f"The crash graph will now be uploaded every **{interval}** ticks in this server.",
+            color=0x00FFAE
+        )
+        embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+        await ctx.reply(embed=embed)
+
+    def round_key(self, ctx):
+        """Id of the shared round a command joins, None for a private round"""
+        if ctx.guild is None or CRASH_ROUNDS not in ("channel", "guild"):
+            return None
+        return ctx.guild.id if CRASH_ROUNDS == "guild" else ctx.channel.id
+
+    def round_in_progress_embed(self):
+        return discord.Embed(
+            title="<:no:1344252518305234987> | Round In Progress",
+            description="A crash round is already running here. Bets open again as soon as it ends.",
+            color=0xFF0000
         )
 
-        # Create CrashGame object instead of a view
-        crash_game = CrashGame(self, ctx, total_bet, ctx.author.id)
+    async def join_round(self, ctx, key, loading_message, tokens_used, credits_used):
+        """Add a placed bet to the shared round, opening a new round if there isn't one"""
+        crash_round = self.rounds.get(key)
+        if crash_round is not None and crash_round.started:
+            # The round started while the bet was being placed
+            await Users().refund_bet(ctx.author.id, tokens_used, credits_used)
+            await loading_message.delete()
+            return await ctx.reply(embed=self.round_in_progress_embed())
 
+        crash_game = CrashGame(self, ctx, tokens_used + credits_used, ctx.author.id)
+        crash_game.tokens_used = tokens_used
+        crash_game.credits_used = credits_used
+
+        if crash_round is None:
+            crash_round = CrashRound(self, key, ctx.channel)
+            self.rounds[key] = crash_round
+        if not crash_round.add(crash_game):
+            # Already betting in this round, this bet goes back instead of replacing it
+            await Users().refund_bet(ctx.author.id, tokens_used, credits_used)
+            await loading_message.delete()
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Game In Progress",
+                description="You already have a bet in this round.",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
+        self.ongoing_games[ctx.author.id] = {
+            "round": crash_round,
+            "crash_game": crash_game,
+            "tokens_used": tokens_used,
+            "credits_used": credits_used
+        }
+
+        if crash_round.message is None and crash_round.task is None:
+            # First bet opens the betting window
+            crash_round.task = self.bot.loop.create_task(crash_round.run())
+            await loading_message.delete()
+            crash_round.message = await ctx.reply(embed=crash_round.betting_embed())
+            return
+
+        embed = discord.Embed(
+            title="✅ | Bet Placed",
+            description=(
+                f"{bet_summary(tokens_used, credits_used)}\n"
+                f"You're in the next crash round in {crash_round.channel.mention}, it starts <t:{int(crash_round.starts_at)}:R>."
+            ),
+            color=0x00FFAE
+        )
+        embed.set_footer(text="BetSync Casino", icon_url=self.bot.user.avatar.url)
+        await loading_message.edit(embed=embed)
+
+    def generate_crash_point(self):
+        """Pick where a round crashes"""
         # Generate crash point with a more balanced distribution
         # House edge is around 4-5% with this implementation
         try:
@@ -334,73 +870,12 @@ class CrashCog(commands.Cog):
             print(f"Error generating crash point: {e}")
             crash_point = random.uniform(1.0, 3.0)  # Fallback
 
-        # Format bet amount description
-        bet_description = ""
-        if tokens_used > 0 and credits_used > 0:
-            bet_description = f"**Bet Amount:** {tokens_used} tokens + {credits_used} credits"
-        elif tokens_used > 0:
-            bet_description = f"**Bet Amount:** {tokens_used} tokens"
-        else:
-            bet_description = f"**Bet Amount:** {credits_used} credits"
-
-        # Create initial graph
-        try:
-            initial_embed, initial_file = self.generate_crash_graph(1.0, False)
-            initial_embed.title = "🚀 | Crash Game Started"
-            initial_embed.description = (
-                f"{bet_description}\n"
-                f"**Current Multiplier:** 1.00x\n\n"
-                "React with 💰 to cash out before it crashes!"
-            )
-        except Exception as e:
-            print(f"Error generating crash graph: {e}")
-            # Create a simple embed if graph fails
-            initial_embed = discord.Embed(
-                title="🚀 | Crash Game Started", 
-                description=(
-                    f"{bet_description}\n"
-                    f"**Current Multiplier:** 1.00x\n\n"
-                    "Click **Cash Out** before it crashes to win!"
-                ),
-                color=0x00FFAE
-            )
-            initial_file = None
-
-        # Delete loading message and send initial game message
-        await loading_message.delete()
-
-        # Send message with file attachment if available
-        if initial_file:
-            message = await ctx.reply(embed=initial_embed, file=initial_file)
-        else:
-            message = await ctx.reply(embed=initial_embed)
-
-        # Add cash out reaction
-        await message.add_reaction("💰")
-
-        # Store message in the crash game object
-        crash_game.message = message
-
-        # Mark the game as ongoing
-        self.ongoing_games[ctx.author.id] = {
-            "message": message,
-            "crash_game": crash_game,
-            "tokens_used": tokens_used,
-            "credits_used": credits_used
-        }
-
-        # Track the currency used for winning calculation
-        crash_game.tokens_used = tokens_used
-        crash_game.credits_used = credits_used
-
-        # Start the game
-        await self.run_crash_game(ctx, message, crash_game, crash_point, total_bet)
+        return crash_point
 
     async def run_crash_game(self, ctx, message, crash_game, crash_point, bet_amount):
         """Run the crash game animation and handle the result"""
         try:
             multiplier = 1.0
-            growth_rate = 0.05  # Controls how fast the multiplier increases
 
             # Format bet amount description based on tokens and credits used
             if hasattr(crash_game, 'tokens_used') and hasattr(crash_game, 'credits_used'):
@@ -416,75 +891,62 @@ class CrashCog(commands.Cog):
             else:
                 bet_description = f"**Bet Amount:** {bet_amount}"
 
-            # Create an event to track reaction cash out
-            cash_out_event = asyncio.Event()
-
-            # Set up reaction check
-            def reaction_check(reaction, user):
-                # Only check reactions from the game owner on the game message with 💰 emoji
-                return (user.id == ctx.author.id and 
-                        reaction.message.id == message.id and 
-                        str(reaction.emoji) == "💰" and
-                        not crash_game.crashed)
-
-            # Start reaction listener task
-            async def reaction_listener():
-                try:
-                    # Wait for the cash out reaction
-                    reaction, user = await self.bot.wait_for('reaction_add', check=reaction_check)
-                    if not crash_game.crashed and not crash_game.cashed_out:
-                        # Set cash out values
-                        crash_game.cashed_out = True
-                        crash_game.cash_out_multiplier = crash_game.current_multiplier
-                        # Set the event to notify the main loop
-                        cash_out_event.set()
-
-                        # Send immediate feedback to player
-                        winnings = round(bet_amount * crash_game.cash_out_multiplier, 2)  # Round to 2 decimal places
-                        feedback_embed = discord.Embed(
-                            title="✅ Cash Out Successful!",
-                            description=f"You cashed out at **{crash_game.cash_out_multiplier:.2f}x**\nWinnings: **{round(winnings, 2)} credits**",
-                            color=0x00FF00
-                        )
-                        await ctx.send(embed=feedback_embed, delete_after=5)
-                except Exception as e:
-                    print(f"Error in reaction listener: {e}")
-
-            # Start the reaction listener in the background
-            reaction_task = asyncio.create_task(reaction_listener())
+            # Paces the animation and sends only the newest frame
+            editor = MessageEditor(message)
+            # The opening graph is already attached, later ticks mostly just change the text
+            keyframes = Keyframes(await self.keyframe_interval(ctx.guild), message.embeds[0] if message.embeds else None)
 
-            # Continue incrementing the multiplier until crash or cash out
-            while multiplier < crash_point and not crash_game.cashed_out:
-                # Wait a bit between updates (faster at the start, slower as multiplier increases)
-                delay = 1.0 / (1 + multiplier * 0.5)
-                delay = max(0.3, min(delay, 0.8))  # Keep delay between 0.3 and 0.8 seconds
+            # The multiplier follows the growth curve from here, so the crash is at a known time
+            crash_game.started_at = time.time()
+            crash_game.crash_at = crash_game.started_at + time_to_reach(crash_point)
 
-                # Wait for either the delay to pass or cash out event to be triggered
+            # Tick until crash or cash out
+            while not crash_game.cashed_out:
+                # Wait for either the next tick, the crash or a cash out
+                now = time.time()
                 try:
-                    await asyncio.wait_for(cash_out_event.wait(), timeout=delay)
+                    await asyncio.wait_for(
+                        crash_game.cash_out_event.wait(),
+                        timeout=min(tick_delay(multiplier), max(0, crash_game.crash_at - now))
+                    )
                     # If we get here, the cash out event was triggered
                     break
                 except asyncio.TimeoutError:
                     # Timeout means the delay passed normally, continue with game
                     pass
 
-                # Increase multiplier with a bit of randomness
-                multiplier += growth_rate * (1 + random.uniform(-0.2, 0.2))
+                now = time.time()
+                if now >= crash_game.crash_at:
+                    break
+                multiplier = multiplier_at(now - crash_game.started_at)
                 crash_game.current_multiplier = multiplier
 
+                # No point rendering while the last frame is still waiting to go out
+                if not editor.wants_frame():
+                    continue
+
+                if not keyframes.due():
+                    editor.frame(embed=keyframes.text_embed(
+                        "🚀 | Crash Game In Progress",
+                        f"{bet_description}\n"
+                        f"**Current Multiplier:** {multiplier:.2f}x\n\n"
+                        "Press **Cash Out** before it crashes!"
+                    ))
+                    continue
+
                 try:
                     # Generate updated graph and embed
-                    embed, file = self.generate_crash_graph(multiplier, False)
+                    embed, file = await self.generate_crash_graph(multiplier, False, fallback=False)
                     embed.title = "🚀 | Crash Game In Progress"
                     embed.description = (
                         f"{bet_description}\n"
                         f"**Current Multiplier:** {multiplier:.2f}x\n\n"
-                        "React with 💰 to cash out before it crashes!"
+                        "Press **Cash Out** before it crashes!"
                     )
 
                     # Update the message with new graph
-                    view = discord.ui.View() # Added view creation here.
-                    await message.edit(embed=embed, files=[file], view=view)
+                    editor.frame(embed=embed, files=[file])
+                    keyframes.uploaded(embed)
                 except Exception as graph_error:
                     print(f"Error updating graph: {graph_error}")
                     # Simple fallback in case graph generation fails
@@ -494,36 +956,30 @@ class CrashCog(commands.Cog):
                             description=(
                                 f"{bet_description}\n"
                                 f"**Current Multiplier:** {multiplier:.2f}x\n\n"
-                                "React with 💰 to cash out before it crashes!"
+                                "Press **Cash Out** before it crashes!"
                             ),
                             color=0x00FFAE
                         )
-                        view = discord.ui.View() # Added view creation here.
-                        await message.edit(embed=embed, view=view)
+                        editor.frame(embed=embed)
                     except Exception as fallback_error:
                         print(f"Error updating fallback message: {fallback_error}")
 
-            # Cancel the reaction task if it's still running
-            if not reaction_task.done():
-                reaction_task.cancel()
-
             # Game ended - either crashed or cashed out
             crash_game.crashed = True
-
-            # Try to clear reactions
-            try:
-                await message.clear_reactions()
-            except:
-                pass
-
-            # Get database connection
-            db = Users()
+            crash_game.view.stop()
+            if not crash_game.cashed_out:
+                multiplier = crash_point
 
             # Handle crash
             if not crash_game.cashed_out:
+                # Log the loss before touching the message so a render error can't skip it
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "crash", "loss", bet_amount, multiplier=round(multiplier, 2)
+                ))
+
                 try:
                     # Generate crash graph
-                    embed, file = self.generate_crash_graph(multiplier, True)
+                    embed, file = await self.generate_crash_graph(multiplier, True)
                     embed.title = "💥 | CRASHED!"
                     embed.description = (
                         f"{bet_description}\n"
@@ -532,34 +988,6 @@ class CrashCog(commands.Cog):
                     )
                     embed.color = 0xFF0000
 
-                    # Add to history
-                    from Cogs.utils.mongo import Servers
-                    dbb = Servers()
-                    dbb.update_server_profit(ctx.guild.id, bet_amount)
-                    history_entry = {
-                        "type": "loss",
-                        "game": "crash",
-                        "bet": bet_amount,
-                        "amount": bet_amount,
-                        "multiplier": round(multiplier, 2),
-                        "timestamp": int(time.time())
-                    }
-                    db.collection.update_one(
-                        {"discord_id": ctx.author.id},
-                        {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
-                    )
-                    #from Cogs.utils.mongo import Servers
-                    #dbb = Servers()
-                    history_entry["user_id"] = ctx.author.id
-                    history_entry["user_name"] = ctx.author.name
-                    dbb.update_history(ctx.guild.id, history_entry)
-
-                    # Update stats
-                    db.collection.update_one(
-                        {"discord_id": ctx.author.id},
-                        {"$inc": {"total_lost": 1}}
-                    )
-
                     # Create Play Again view with button
                     play_again_view = discord.ui.View()
                     play_again_button = discord.ui.Button(
@@ -578,7 +1006,7 @@ class CrashCog(commands.Cog):
                     play_again_view.add_item(play_again_button)
 
                     # Update message with crash result and Play Again button
-                    await message.edit(embed=embed, files=[file], view=play_again_view)
+                    await editor.final(embed=embed, files=[file], view=play_again_view)
 
                 except Exception as crash_error:
                     print(f"Error handling crash: {crash_error}")
@@ -610,20 +1038,26 @@ class CrashCog(commands.Cog):
                         play_again_button.callback = play_again_callback
                         play_again_view.add_item(play_again_button)
 
-                        await message.edit(embed=embed, view=play_again_view)
+                        await editor.final(embed=embed, view=play_again_view)
 
                     except Exception as fallback_error:
                         print(f"Error updating fallback crash message: {fallback_error}")
 
             else:
-                try:
-                    # User cashed out successfully
-                    cash_out_multiplier = crash_game.cash_out_multiplier
-                    winnings = round(bet_amount * cash_out_multiplier, 2)  # Round to 2 decimal places
-                    profit = winnings - bet_amount
+                # User cashed out successfully
+                cash_out_multiplier = crash_game.cash_out_multiplier
+                winnings = round(bet_amount * cash_out_multiplier, 2)  # Round to 2 decimal places
+                profit = winnings - bet_amount
 
+                # Pay out winnings before touching the message so a render error can't skip it
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "crash", "win", bet_amount,
+                    payout=winnings, multiplier=round(cash_out_multiplier, 2), winnings=winnings
+                ))
+
+                try:
                     # Generate success graph
-                    embed, file = self.generate_crash_graph(cash_out_multiplier, False, cash_out=True)
+                    embed, file = await self.generate_crash_graph(cash_out_multiplier, False, cash_out=True)
                     embed.title = "💰 | CASHED OUT!"
                     embed.description = (
                         f"{bet_description}\n"
@@ -633,48 +1067,6 @@ class CrashCog(commands.Cog):
                     )
                     embed.color = 0x00FF00
 
-                    # Update server profit (negative value because server loses when player wins)
-                    from Cogs.utils.mongo import Servers
-                    servers_db = Servers()
-                    server_profit = -profit  # Server loses money when player wins
-                    servers_db.update_server_profit(ctx.guild.id, server_profit)
-                    
-                    # Add credits to user balance
-                    db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-                    # Add to history
-                    history_entry = {
-                        "type": "win",
-                        "game": "crash",
-                        "bet": bet_amount,
-                        "amount": winnings,
-                        "multiplier": round(cash_out_multiplier, 2),
-                        "winnings": winnings,
-                        "timestamp": int(time.time())
-                    }
-                    db.collection.update_one(
-                        {"discord_id": ctx.author.id},
-                        {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
-                    )
-                    
-                    from Cogs.utils.mongo import Servers
-                    dbb = Servers()
-                    history_entry["user_id"] = ctx.author.id
-                    history_entry["user_name"] = ctx.author.name
-                    dbb.update_history(ctx.guild.id, history_entry)
-                    
-                    # Update stats
-                    db.collection.update_one(
-                        {"discord_id": ctx.author.id},
-                        {"$inc": {"total_won": 1, "total_earned": winnings}}
-                    )
-                    
-                    # Update server profit (negative value because server loses when player wins)
-                    from Cogs.utils.mongo import Servers
-                    servers_db = Servers()
-                    server_profit = -profit  # Server loses money when player wins
-                    servers_db.update_server_profit(ctx.guild.id, server_profit)
-
                     # Create Play Again view with button
                     play_again_view = discord.ui.View()
                     play_again_button = discord.ui.Button(
@@ -693,7 +1085,7 @@ class CrashCog(commands.Cog):
                     play_again_view.add_item(play_again_button)
 
                     # Update message with win result and Play Again button
-                    await message.edit(embed=embed, files=[file], view=play_again_view)
+                    await editor.final(embed=embed, files=[file], view=play_again_view)
 
                 except Exception as win_error:
                     print(f"Error handling win: {win_error}")
@@ -726,10 +1118,7 @@ class CrashCog(commands.Cog):
                         play_again_button.callback = play_again_callback
                         play_again_view.add_item(play_again_button)
 
-                        # Make sure winnings are credited even if graph fails
-                        db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-                        await message.edit(embed=embed, view=play_again_view)
+                        await editor.final(embed=embed, view=play_again_view)
 
                     except Exception as fallback_error:
                         print(f"Error updating fallback win message: {fallback_error}")
@@ -747,222 +1136,30 @@ class CrashCog(commands.Cog):
 
                 # Refund the bet if there was an error
                 db = Users()
-                if hasattr(crash_game, 'tokens_used') and crash_game.tokens_used > 0:
-                    current_tokens = db.fetch_user(ctx.author.id)['tokens']
-                    db.update_balance(ctx.author.id, current_tokens + crash_game.tokens_used, "tokens")
-
-                if hasattr(crash_game, 'credits_used') and crash_game.credits_used > 0:
-                    current_credits = db.fetch_user(ctx.author.id)['credits']
-                    db.update_balance(ctx.author.id, current_credits + crash_game.credits_used, "credits")
+                await db.refund_bet(ctx.author.id, crash_game.tokens_used, crash_game.credits_used)
             except Exception as refund_error:
                 print(f"Error refunding bet: {refund_error}")
         finally:
+            crash_game.view.stop()
             # Remove the game from ongoing games
             if ctx.author.id in self.ongoing_games:
                 del self.ongoing_games[ctx.author.id]
 
-    def generate_crash_graph(self, current_multiplier, crashed=False, cash_out=False):
-        """Generate a crash game graph with improved visuals"""
+    async def generate_crash_graph(self, current_multiplier, crashed=False, cash_out=False, fallback=True):
+        """Generate a crash game graph with improved visuals
+
+        Ticks pass fallback=False, so when the render pool is saturated they get
+        the simple fallback frame instead of rendering the full one here.
+        """
         try:
-            # Clear and close previous plots to prevent memory issues
-            plt.close('all')
-            fig = plt.figure(figsize=(10, 6), dpi=100)
-
-            # Set background color with a darker theme
-            bg_color = '#1E1F22'
-            plt.gca().set_facecolor(bg_color)
-            plt.gcf().set_facecolor(bg_color)
-
-            # Generate x and y coordinates with more points for smoother curve
-            x = np.linspace(0, current_multiplier, 300)  # Increased for smoother curve
-
-            # Create a more dynamic curve that starts slower and grows faster
-            if current_multiplier <= 1.5:
-                # For small multipliers, use simple exponential
-                y = np.exp(x) - 1
-            else:
-                # For larger multipliers, use a combination for more dramatic curve
-                y = np.power(1.5, x) - 0.5
-
-            # Scale y values to match the current multiplier
-            y = y * (current_multiplier / y[-1])
-
-            # Use the existing figure and set its properties
-            fig.set_facecolor(bg_color)
-            ax = plt.gca()
-            ax.set_facecolor(bg_color)
-
-            # Create a custom gradient that changes based on multiplier and state
-            if crashed:
-                gradient_colors = plt.cm.hot(np.linspace(0, 1, 100))
-                gradient_alpha = 0.15
-            elif cash_out:
-                gradient_colors = plt.cm.viridis(np.linspace(0, 1, 100))
-                gradient_alpha = 0.15
-            else:
-                if current_multiplier < 2:
-                    gradient_colors = plt.cm.viridis(np.linspace(0, 1, 100))
-                elif current_multiplier < 5:
-                    gradient_colors = plt.cm.plasma(np.linspace(0, 1, 100))
-                else:
-                    gradient_colors = plt.cm.inferno(np.linspace(0, 1, 100))
-                gradient_alpha = 0.12 + min(0.03, current_multiplier * 0.005)  # Increases with multiplier
-
-            # Apply gradient background
-            gradient = np.linspace(0, 1, 100).reshape(-1, 1)
-            plt.imshow(gradient, extent=[0, max(2, current_multiplier * 1.1), 0, max(2, current_multiplier * 1.1)], 
-                      aspect='auto', cmap='viridis', alpha=gradient_alpha)
-
-            # Add subtle glowing effect
-            for i, alpha in zip(range(3), [0.05, 0.03, 0.01]):
-                plt.plot(x, y, color='white', linewidth=6+i*2, alpha=alpha, zorder=1)
-
-            # Determine line color and style based on game state
-            if crashed:
-                line_color = '#FF5555'  # Bright red for crash
-                line_style = '-'
-                line_width = 4
-                glow_color = '#FF0000'
-            elif cash_out:
-                line_color = '#55FF55'  # Bright green for cashout
-                line_style = '-'
-                line_width = 4
-                glow_color = '#00FF00'
-            else:
-                # Create a gradient line color based on multiplier
-                if current_multiplier < 1.5:
-                    line_color = '#00FFAE'  # Teal/cyan color
-                    glow_color = '#00FFAE'
-                elif current_multiplier < 3:
-                    line_color = '#FFDD00'  # Yellow
-                    glow_color = '#FFDD00'
-                elif current_multiplier < 7:
-                    line_color = '#FF8800'  # Orange
-                    glow_color = '#FF8800'
-                else:
-                    line_color = '#FF4400'  # Deep orange/red
-                    glow_color = '#FF4400'
-                line_style = '-'
-                line_width = 3.5
-
-            # Add subtle line glow effect
-            for i, alpha in zip(range(3), [0.2, 0.1, 0.05]):
-                plt.plot(x, y, color=glow_color, linewidth=line_width+i, alpha=alpha, zorder=3)
-
-            # Plot the main line
-            plt.plot(x, y, color=line_color, linewidth=line_width, linestyle=line_style, zorder=4)
-
-            # Add points along the curve for visual effect
-            if not crashed and not cash_out and current_multiplier > 1.2:
-                # More points for higher multipliers
-                n_points = min(int(current_multiplier * 4), 40)
-                point_indices = np.linspace(0, len(x)-1, n_points, dtype=int)
-
-                # Add glow to points
-                for i, alpha in zip(range(3), [0.1, 0.05, 0.02]):
-                    plt.scatter(x[point_indices], y[point_indices], color='white', s=20+i*10, alpha=alpha, zorder=4)
-
-                # Main points with pulsating sizes based on index
-                sizes = 15 + 10 * np.sin(np.linspace(0, 2*np.pi, len(point_indices)))
-                plt.scatter(x[point_indices], y[point_indices], color='white', s=sizes, alpha=0.7, zorder=5)
-
-            # Add special markers and text for crash or cash out points
-            if crashed:
-                # Create explosion effect for crash
-                for i, alpha in zip(range(5), [0.05, 0.1, 0.15, 0.2, 0.3]):
-                    plt.scatter([current_multiplier], [current_multiplier], color='darkred', 
-                               s=400-i*50, marker='*', alpha=alpha, zorder=5+i)
-
-                # Main explosion
-                plt.scatter([current_multiplier], [current_multiplier], color='red', s=150, marker='*', zorder=10)
-
-                # Add "boom" lines radiating from crash point
-                n_lines = 12
-                for i in range(n_lines):
-                    angle = 2 * np.pi * i / n_lines
-                    length = 0.3 + 0.1 * np.random.random()
-                    dx, dy = length * np.cos(angle), length * np.sin(angle)
-                    plt.plot([current_multiplier, current_multiplier+dx], 
-                            [current_multiplier, current_multiplier+dy],
-                            color='red', alpha=0.6, linewidth=1.5, zorder=9)
-
-                # Add crash text without shadow effect
-                plt.text(current_multiplier, current_multiplier + 0.3, f"CRASHED AT {current_multiplier:.2f}x", 
-                         color='white', fontweight='bold', fontsize=14, ha='right', va='bottom',
-                         bbox=dict(boxstyle="round,pad=0.3", facecolor='red', alpha=0.8, edgecolor='darkred'))
-
-            elif cash_out:
-                # Add diamond symbol for cash out with glowing effect
-                for i, alpha in zip(range(5), [0.05, 0.1, 0.15, 0.2, 0.3]):
-                    plt.scatter([current_multiplier], [current_multiplier], color='darkgreen', 
-                               s=300-i*30, marker='D', alpha=alpha, zorder=5+i)
-
-                # Main diamond
-                plt.scatter([current_multiplier], [current_multiplier], color='lime', s=130, marker='D', zorder=10)
-
-                # Add shine effect on diamond
-                plt.plot([current_multiplier-0.1, current_multiplier+0.1], 
-                        [current_multiplier+0.1, current_multiplier-0.1],
-                        color='white', alpha=0.8, linewidth=1.5, zorder=11)
-
-                # Add cash out text without shadow effect
-                plt.text(current_multiplier, current_multiplier + 0.3, f"CASHED OUT AT {current_multiplier:.2f}x", 
-                         color='white', fontweight='bold', fontsize=14, ha='right', va='bottom',
-                         bbox=dict(boxstyle="round,pad=0.3", facecolor='green', alpha=0.8, edgecolor='darkgreen'))
-
-            # Add current multiplier display
-            # Create a more prominent display in top-right corner
-            if not crashed and not cash_out:
-                # Add glowing effect around the multiplier text
-                for i, alpha in zip(range(3), [0.1, 0.07, 0.04]):
-                    plt.text(0.95, 0.95, f"{current_multiplier:.2f}x", 
-                             transform=plt.gca().transAxes, color='white', fontsize=22+i, fontweight='bold', 
-                             ha='right', va='top', alpha=alpha)
-
-                # Main multiplier text
-                plt.text(0.95, 0.95, f"{current_multiplier:.2f}x", 
-                         transform=plt.gca().transAxes, color='white', fontsize=22, fontweight='bold', 
-                         ha='right', va='top',
-                         bbox=dict(boxstyle="round,pad=0.3", facecolor=line_color, alpha=0.8, edgecolor='white', linewidth=1))
-
-            # Set axes properties with improved grid
-            plt.grid(True, linestyle='--', alpha=0.15, color='white')
-
-            # Add grid highlights at important multiplier levels
-            highlight_multipliers = [2, 5, 10, 15]
-            for m in highlight_multipliers:
-                if m <= current_multiplier * 1.1:
-                    plt.axhline(y=m, color='white', alpha=0.2, linestyle='-', linewidth=0.8)
-                    plt.text(0.05, m, f"{m}x", color='white', alpha=0.5, fontsize=8, va='bottom')
-
-            # Set limits with more headroom for visual effect
-            plt.xlim(0, max(2, current_multiplier * 1.15))
-            plt.ylim(0, max(2, current_multiplier * 1.15))
-
-            # Remove axis numbers, keep only the graph
-            plt.xticks([])
-            plt.yticks([])
-
-            # Remove spines (borders)
-            for spine in plt.gca().spines.values():
-                spine.set_visible(False)
-
-            # Add subtle BetSync watermark/branding
-            # Add BetSync watermark
-            plt.text(0.5, 0.03, "BetSync Casino", transform=plt.gca().transAxes,
-                    color='white', alpha=0.3, fontsize=14, fontweight='bold', ha='center')
-
-            # Save plot to bytes buffer with higher quality
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png', dpi=120, bbox_inches='tight', transparent=False)
-            buf.seek(0)
+            graph, filename = await get_frame_cache().frame(current_multiplier, crashed, cash_out, fallback=fallback)
 
             # Create discord File object
-            file = discord.File(buf, filename="crash_graph.png")
+            file = discord.File(io.BytesIO(graph), filename=filename)
 
             # Create embed with the graph
             embed = discord.Embed(color=0x2B2D31)
-            embed.set_image(url="attachment://crash_graph.png")
+            embed.set_image(url=f"attachment://{filename}")
 
             return embed, file
         except Exception as e:
@@ -980,7 +1177,7 @@ class CrashCog(commands.Cog):
             try:
                 # Create a simple colored rectangle
                 color = 'red' if crashed else 'green' if cash_out else 'blue'
-                img = Image.new('RGB', (800, 400), color=bg_color)
+                img = Image.new('RGB', (800, 400), color='#1E1F22')
                 draw = ImageDraw.Draw(img)
 
                 # Draw a simple line representing the curve
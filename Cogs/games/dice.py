@@ -1,10 +1,10 @@
 
 import discord
 import random
-import time
 import asyncio
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 from Cogs.utils.emojis import emoji
 
 class PlayAgainView(discord.ui.View):
@@ -82,18 +82,7 @@ class DiceCog(commands.Cog):
         )
         loading_message = await ctx.reply(embed=loading_embed)
 
-        # Process bet amount
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
-
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
 
         # Format currency type if provided    
         if currency_type:
@@ -108,6 +97,15 @@ class DiceCog(commands.Cog):
         try:
             # Handle 'all' or 'max' bet
             if bet_amount.lower() in ['all', 'max']:
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
                 bet_amount_value = user_data['tokens'] + user_data['credits']
             else:
                 # Check if bet has 'k' or 'm' suffix
@@ -129,70 +127,6 @@ class DiceCog(commands.Cog):
                 )
                 return await ctx.reply(embed=embed)
 
-            # Get user balances
-            tokens_balance = user_data['tokens']
-            credits_balance = user_data['credits']
-
-            # Determine which currency to use based on the logic:
-            # 1. If specific currency requested, try to use that
-            # 2. If has enough tokens, use tokens
-            # 3. If not enough tokens but enough credits, use credits
-            # 4. If neither is enough alone but combined they work, use both
-            tokens_used = 0
-            credits_used = 0
-
-            if currency_type == 'tokens':
-                # User specifically wants to use tokens
-                if bet_amount_value <= tokens_balance:
-                    tokens_used = bet_amount_value
-                else:
-                    await loading_message.delete()
-                    embed = discord.Embed(
-                        title="<:no:1344252518305234987> | Insufficient Tokens",
-                        description=f"You don't have enough tokens. Your balance: **{tokens_balance} tokens**",
-                        color=0xFF0000
-                    )
-                    return await ctx.reply(embed=embed)
-
-            elif currency_type == 'credits':
-                # User specifically wants to use credits
-                if bet_amount_value <= credits_balance:
-                    credits_used = bet_amount_value
-                else:
-                    await loading_message.delete()
-                    embed = discord.Embed(
-                        title="<:no:1344252518305234987> | Insufficient Credits",
-                        description=f"You don't have enough credits. Your balance: **{credits_balance} credits**",
-                        color=0xFF0000
-                    )
-                    return await ctx.reply(embed=embed)
-
-            else:
-                # Auto-determine what to use
-                if tokens_balance >= bet_amount_value:
-                    # Use tokens first if available
-                    tokens_used = bet_amount_value
-                elif credits_balance >= bet_amount_value:
-                    # Use credits if not enough tokens
-                    credits_used = bet_amount_value
-                elif tokens_balance + credits_balance >= bet_amount_value:
-                    # Use a combination of both
-                    tokens_used = tokens_balance
-                    credits_used = bet_amount_value - tokens_balance
-                else:
-                    # Not enough funds
-                    await loading_message.delete()
-                    embed = discord.Embed(
-                        title="<:no:1344252518305234987> | Insufficient Funds",
-                        description=(
-                            f"You don't have enough funds for this bet.\n"
-                            f"Your balance: **{tokens_balance} tokens** and **{credits_balance} credits**\n"
-                            f"Required: **{bet_amount_value}**"
-                        ),
-                        color=0xFF0000
-                    )
-                    return await ctx.reply(embed=embed)
-
         except ValueError:
             await loading_message.delete()
             embed = discord.Embed(
@@ -202,22 +136,48 @@ class DiceCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Deduct from user balances
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, tokens_balance - tokens_used, "tokens")
+        # Take the bet and record game stats in one atomic update
+        bet_split = await db.debit_bet(ctx.author.id, bet_amount_value, currency_type)
 
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, credits_balance - credits_used, "credits")
+        if bet_split is None:
+            await loading_message.delete()
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if user_data is None:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | User Not Found",
+                    description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                    color=0xFF0000
+                )
+            elif currency_type == 'tokens':
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | Insufficient Tokens",
+                    description=f"You don't have enough tokens. Your balance: **{user_data['tokens']} tokens**",
+                    color=0xFF0000
+                )
+            elif currency_type == 'credits':
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | Insufficient Credits",
+                    description=f"You don't have enough credits. Your balance: **{user_data['credits']} credits**",
+                    color=0xFF0000
+                )
+            else:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | Insufficient Funds",
+                    description=(
+                        f"You don't have enough funds for this bet.\n"
+                        f"Your balance: **{user_data['tokens']} tokens** and **{user_data['credits']} credits**\n"
+                        f"Required: **{bet_amount_value}**"
+                    ),
+                    color=0xFF0000
+                )
+            return await ctx.reply(embed=embed)
+
+        tokens_used = bet_split["tokens_used"]
+        credits_used = bet_split["credits_used"]
 
         # Get total amount bet
         total_bet = tokens_used + credits_used
 
-        # Record game stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_played": 1, "total_spent": total_bet}}
-        )
-
         # Format bet description
         if tokens_used > 0 and credits_used > 0:
             bet_description = f"**Bet Amount:** {tokens_used} tokens + {credits_used} credits"
@@ -291,32 +251,11 @@ class DiceCog(commands.Cog):
                     color=0xFFD700  # Gold color for draws
                 )
                 
-                # Return the bet to the user
-                db = Users()
-                if tokens_used > 0:
-                    db.update_balance(ctx.author.id, tokens_used, "tokens", "$inc")
-                if credits_used > 0:
-                    db.update_balance(ctx.author.id, credits_used, "credits", "$inc")
-                
-                # Add to history as a draw
-                servers_db = Servers()
-                history_entry = {
-                    "type": "draw",
-                    "game": "dice",
-                    "bet": total_bet,
-                    "amount": 0,  # No profit/loss on a draw
-                    "multiplier": 0,  # No multiplier applies on a draw
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
-                )
-                
-                # Update server history
-                history_entry["user_id"] = ctx.author.id
-                history_entry["user_name"] = ctx.author.name
-                servers_db.update_history(ctx.guild.id, history_entry)
+                # Return the bet to the user and log the draw
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "dice", "draw", total_bet,
+                    multiplier=0, refund_tokens=tokens_used, refund_credits=credits_used
+                ))
                 
             elif user_won:
                 # Calculate winnings
@@ -336,39 +275,11 @@ class DiceCog(commands.Cog):
                     color=0x00FF00
                 )
 
-                # Update user balance
-                db = Users()
-                db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-                # Update server profit (negative value because server loses when player wins)
-                servers_db = Servers()
-                server_profit = -profit  # Server loses money when player wins
-                servers_db.update_server_profit(ctx.guild.id, server_profit)
-
-                # Add to history
-                history_entry = {
-                    "type": "win",
-                    "game": "dice",
-                    "bet": total_bet,
-                    "amount": winnings,
-                    "multiplier": multiplier,
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
-                )
-
-                # Update server history
-                history_entry["user_id"] = ctx.author.id
-                history_entry["user_name"] = ctx.author.name
-                servers_db.update_history(ctx.guild.id, history_entry)
-
-                # Update stats
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$inc": {"total_won": 1, "total_earned": winnings}}
-                )
+                # Pay out winnings and log the win
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "dice", "win", total_bet,
+                    payout=winnings, multiplier=multiplier
+                ))
 
             else:
                 result_embed = discord.Embed(
@@ -382,36 +293,10 @@ class DiceCog(commands.Cog):
                     color=0xFF0000
                 )
 
-                # Update history for loss
-                db = Users()
-                servers_db = Servers()
-
-                history_entry = {
-                    "type": "loss",
-                    "game": "dice",
-                    "bet": total_bet,
-                    "amount": total_bet,
-                    "multiplier": multiplier,
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
-                )
-
-                # Update server history
-                history_entry["user_id"] = ctx.author.id
-                history_entry["user_name"] = ctx.author.name
-                servers_db.update_history(ctx.guild.id, history_entry)
-
-                # Update stats
-                db.collection.update_one(
-                    {"discord_id": ctx.author.id},
-                    {"$inc": {"total_lost": 1}}
-                )
-
-                # Update server profit
-                servers_db.update_server_profit(ctx.guild.id, total_bet)
+                # Log the loss
+                await Settlement().settle(GameOutcome(
+                    ctx.author, ctx.guild, "dice", "loss", total_bet, multiplier=multiplier
+                ))
 
             # Add play again button that expires after 15 seconds
             play_again_view = PlayAgainView(self, ctx, total_bet)
@@ -436,13 +321,7 @@ class DiceCog(commands.Cog):
 
                 # Refund the bet
                 db = Users()
-                if tokens_used > 0:
-                    current_tokens = db.fetch_user(ctx.author.id)['tokens']
-                    db.update_balance(ctx.author.id, current_tokens + tokens_used, "tokens")
-
-                if credits_used > 0:
-                    current_credits = db.fetch_user(ctx.author.id)['credits']
-                    db.update_balance(ctx.author.id, current_credits + credits_used, "credits")
+                await db.refund_bet(ctx.author.id, tokens_used, credits_used)
             except Exception as refund_error:
                 print(f"Error refunding bet: {refund_error}")
         finally:
@@ -1,10 +1,11 @@
 import discord
 import asyncio
 import random
-import time
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 from Cogs.utils.emojis import emoji
+from Cogs.utils.reactions import get_reaction_dispatcher
 
 
 class MineButton(discord.ui.Button):
@@ -88,6 +89,7 @@ class MineButton(discord.ui.Button):
             await self.parent_view.message.edit(view=play_again_view)
 
             # Clear from ongoing games
+            get_reaction_dispatcher().unregister(self.parent_view.message.id)
             if self.parent_view.ctx.author.id in self.parent_view.cog.ongoing_games:
                 del self.parent_view.cog.ongoing_games[self.parent_view.ctx.author.id]
 
@@ -133,6 +135,7 @@ class MineButton(discord.ui.Button):
                     await self.parent_view.message.edit(embed=embed, view=play_again_view)
 
                     # Clear from ongoing games
+                    get_reaction_dispatcher().unregister(self.parent_view.message.id)
                     if self.parent_view.ctx.author.id in self.parent_view.cog.ongoing_games:
                         del self.parent_view.cog.ongoing_games[self.parent_view.ctx.author.id]
             else:
@@ -160,7 +163,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the same bet
         db = Users()
-        user_data = db.fetch_user(interaction.user.id)
+        user_data = await db.fetch_user(interaction.user.id, BALANCE_PROJECTION)
         if not user_data:
             return await interaction.followup.send("Your account couldn't be found. Please try again later.", ephemeral=True)
 
@@ -365,116 +368,35 @@ class MinesTileView(discord.ui.View):
         embed.set_footer(text="BetSync Casino", icon_url=self.ctx.bot.user.avatar.url)
         return embed
 
+    async def settle(self, ctx, outcome):
+        """Settle the game, refunding the bet and telling the player if that fails"""
+        if not await Settlement().settle_or_refund(outcome, self.cog.ongoing_games.get(ctx.author.id)):
+            error_embed = discord.Embed(
+                title="❌ | Game Error",
+                description="An error occurred during the game. Your bet has been refunded.",
+                color=0xFF0000
+            )
+            await ctx.reply(embed=error_embed)
+
     async def process_win(self, ctx):
         """Process win for the player"""
         # Calculate winnings
         winnings = self.bet_amount * self.current_multiplier
 
-        # Get database connection
-        db = Users()
-
-        # Add credits to user (always give credits for winnings)
-        db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-        # Add to win history
-        win_entry = {
-            "type": "win",
-            "game": "mines",
-            "bet": self.bet_amount,
-            "amount": winnings,
-            "multiplier": self.current_multiplier,
-            "mines": self.mines_count,
-            "tiles_revealed": len(self.revealed_tiles),
-            "timestamp": int(time.time())
-        }
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [win_entry], "$slice": -100}}}
-        )
-
-        # Update server history
-        server_db = Servers()
-        server_data = server_db.fetch_server(ctx.guild.id)
-
-        if server_data:
-            server_win_entry = {
-                "type": "win",
-                "game": "mines",
-                "user_id": ctx.author.id,
-                "user_name": ctx.author.name,
-                "bet": self.bet_amount,
-                "amount": winnings,
-                "multiplier": self.current_multiplier,
-                "mines": self.mines_count,
-                "tiles_revealed": len(self.revealed_tiles),
-                "timestamp": int(time.time())
-            }
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$push": {"server_bet_history": {"$each": [server_win_entry], "$slice": -100}}}
-            )
-
-            # Update server profit (negative value because server loses when player wins)
-            profit = winnings - self.bet_amount
-            server_db.update_server_profit(ctx.guild.id, -profit)
-
-        # Update user stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_won": 1, "total_earned": winnings}}
-        )
+        # Pay out winnings (always in credits) and log the win
+        await self.settle(ctx, GameOutcome(
+            ctx.author, ctx.guild, "mines", "win", self.bet_amount,
+            payout=winnings, multiplier=self.current_multiplier,
+            mines=self.mines_count, tiles_revealed=len(self.revealed_tiles)
+        ))
 
     async def process_loss(self, ctx):
         """Process loss for the player"""
-        # Get database connection
-        db = Users()
-
-        # Add to loss history
-        loss_entry = {
-            "type": "loss",
-            "game": "mines",
-            "bet": self.bet_amount,
-            "amount": self.bet_amount,
-            "mines": self.mines_count,
-            "tiles_revealed": len(self.revealed_tiles),
-            "timestamp": int(time.time())
-        }
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [loss_entry], "$slice": -100}}}
-        )
-
-        # Update server history
-        server_db = Servers()
-        server_data = server_db.fetch_server(ctx.guild.id)
-
-        if server_data:
-            server_loss_entry = {
-                "type": "loss",
-                "game": "mines",
-                "user_id": ctx.author.id,
-                "user_name": ctx.author.name,
-                "bet": self.bet_amount,
-                "mines": self.mines_count,
-                "tiles_revealed": len(self.revealed_tiles),
-                "timestamp": int(time.time())
-            }
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$push": {"server_bet_history": {"$each": [server_loss_entry], "$slice": -100}}}
-            )
-
-            # Update server profit
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$inc": {"total_profit": self.bet_amount}}
-            )
-
-        # Update user stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_lost": 1}}
-        )
+        # Log the loss
+        await self.settle(ctx, GameOutcome(
+            ctx.author, ctx.guild, "mines", "loss", self.bet_amount, multiplier=0,
+            mines=self.mines_count, tiles_revealed=len(self.revealed_tiles)
+        ))
 
     async def on_timeout(self):
         """Handle timeout - auto cash out if player has revealed tiles"""
@@ -507,6 +429,7 @@ class MinesTileView(discord.ui.View):
                     print(f"Error updating message: {e}")
 
                 # Clear from ongoing games
+                get_reaction_dispatcher().unregister(self.message.id)
                 if self.ctx.author.id in self.cog.ongoing_games:
                     del self.cog.ongoing_games[self.ctx.author.id]
             else:
@@ -537,6 +460,7 @@ class MinesTileView(discord.ui.View):
                     print(f"Error updating message: {e}")
 
                 # Clear from ongoing games
+                get_reaction_dispatcher().unregister(self.message.id)
                 if self.ctx.author.id in self.cog.ongoing_games:
                     del self.cog.ongoing_games[self.ctx.author.id]
 
@@ -546,47 +470,46 @@ class MinesCog(commands.Cog):
         self.bot = bot
         self.ongoing_games = {}
 
-    @commands.Cog.listener()
-    async def on_reaction_add(self, reaction, user):
-        # Check if this is a cash out reaction for a mines game
-        if str(reaction.emoji) == "💰" and user.id in self.ongoing_games:
-            game_data = self.ongoing_games.get(user.id)
-            if game_data and "view" in game_data:
-                game_view = game_data["view"]
-                # Only process if it's the game owner and the game is still active
-                if (user.id == game_view.ctx.author.id and 
-                    reaction.message.id == game_view.message.id and
-                    not game_view.game_over and not game_view.cashed_out and
-                    len(game_view.revealed_tiles) > 0):
-
-                    # Set cash out
-                    game_view.cashed_out = True
+    async def on_cash_out(self, payload):
+        """Cash out a mines game when its player reacts with 💰"""
+        game_data = self.ongoing_games.get(payload.user_id)
+        if game_data and "view" in game_data:
+            game_view = game_data["view"]
+            # Only process if it's the game owner and the game is still active
+            if (payload.user_id == game_view.ctx.author.id and
+                payload.message_id == game_view.message.id and
+                not game_view.game_over and not game_view.cashed_out and
+                len(game_view.revealed_tiles) > 0):
 
-                    # Process win
-                    await game_view.process_win(game_view.ctx)
+                # Set cash out
+                game_view.cashed_out = True
 
-                    # Update message with win state
-                    embed = game_view.create_embed(status="win")
+                # Process win
+                await game_view.process_win(game_view.ctx)
 
-                    # Create play again view
-                    play_again_view = PlayAgainView(
-                        self, 
-                        game_view.ctx, 
-                        game_view.bet_amount, 
-                        game_view.mines_count,
-                        timeout=15
-                    )
-                    # Update message with view properly attached
-                    try:
-                        # Make sure to pass the view directly
-                        await game_view.message.edit(embed=embed, view=play_again_view)
-                        play_again_view.message = game_view.message
-                    except Exception as e:
-                        print(f"Error updating message: {e}")
+                # Update message with win state
+                embed = game_view.create_embed(status="win")
 
-                    # Clear from ongoing games
-                    if user.id in self.ongoing_games:
-                        del self.ongoing_games[user.id]
+                # Create play again view
+                play_again_view = PlayAgainView(
+                    self, 
+                    game_view.ctx, 
+                    game_view.bet_amount, 
+                    game_view.mines_count,
+                    timeout=15
+                )
+                # Update message with view properly attached
+                try:
+                    # Make sure to pass the view directly
+                    await game_view.message.edit(embed=embed, view=play_again_view)
+                    play_again_view.message = game_view.message
+                except Exception as e:
+                    print(f"Error updating message: {e}")
+
+                # Clear from ongoing games
+                get_reaction_dispatcher().unregister(game_view.message.id)
+                if payload.user_id in self.ongoing_games:
+                    del self.ongoing_games[payload.user_id]
 
     def calculate_max_mines(self):
         """Calculate maximum allowed mines"""
@@ -635,18 +558,7 @@ class MinesCog(commands.Cog):
         )
         loading_message = await ctx.reply(embed=loading_embed)
 
-        # Process bet amount
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
-
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
 
         # Format currency type if provided    
         if currency_type:
@@ -682,6 +594,15 @@ class MinesCog(commands.Cog):
         try:
             # Handle 'all' or 'max' bet
             if bet_amount.lower() in ['all', 'max']:
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
                 bet_amount_value = user_data['tokens'] + user_data['credits']
             else:
                 # Check if bet has 'k' or 'm' suffix
@@ -712,73 +633,44 @@ class MinesCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Get user balances
-        tokens_balance = user_data['tokens']
-        credits_balance = user_data['credits']
-
-        # Determine which currency to use
-        tokens_used = 0
-        credits_used = 0
+        # Take the bet and record game stats in one atomic update
+        bet_split = await db.debit_bet(ctx.author.id, bet_amount_value, currency_type)
 
-        if currency_type == 'tokens':
-            # User specifically wants to use tokens
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            else:
-                await loading_message.delete()
+        if bet_split is None:
+            await loading_message.delete()
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if user_data is None:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | User Not Found",
+                    description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                    color=0xFF0000
+                )
+            elif currency_type == 'tokens':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Tokens",
-                    description=f"You don't have enough tokens. Your balance: **{tokens_balance:.2f} tokens**",
+                    description=f"You don't have enough tokens. Your balance: **{user_data['tokens']:.2f} tokens**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        elif currency_type == 'credits':
-            # User specifically wants to use credits
-            if bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            else:
-                await loading_message.delete()
+            elif currency_type == 'credits':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Credits",
-                    description=f"You don't have enough credits. Your balance: **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough credits. Your balance: **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        else:
-            # Auto determine what to use
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            elif bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            elif bet_amount_value <= tokens_balance + credits_balance:
-                # Use all tokens and some credits
-                tokens_used = tokens_balance
-                credits_used = bet_amount_value - tokens_balance
             else:
-                await loading_message.delete()
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Funds",
-                    description=f"You don't have enough funds. Your balance: **{tokens_balance:.2f} tokens** and **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough funds. Your balance: **{user_data['tokens']:.2f} tokens** and **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-
-        # Deduct from user balances
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, tokens_balance - tokens_used, "tokens")
+            return await ctx.reply(embed=embed)
 
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, credits_balance - credits_used, "credits")
+        tokens_used = bet_split["tokens_used"]
+        credits_used = bet_split["credits_used"]
 
         # Get total amount bet
         total_bet = tokens_used + credits_used
 
-        # Record game stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_played": 1, "total_spent": total_bet}}
-        )
-
         # Create game view
         game_view = MinesTileView(self, ctx, total_bet, mines_count)
 
@@ -802,6 +694,7 @@ class MinesCog(commands.Cog):
         game_view.message = game_message
 
         # Add cash out reaction
+        get_reaction_dispatcher().register(game_message.id, self.on_cash_out, "mines")
         await game_message.add_reaction("💰")
 
         # Inform user about timeout
@@ -3,7 +3,8 @@ import discord
 import random
 from discord.ext import commands
 from datetime import datetime
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 
 class RoleSelectionView(discord.ui.View):
     def __init__(self, cog, ctx, bet_amount, currency_type, timeout=30):
@@ -172,7 +173,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the same bet
         db = Users()
-        user_data = db.fetch_user(interaction.user.id)
+        user_data = await db.fetch_user(interaction.user.id, BALANCE_PROJECTION)
         if not user_data:
             return await interaction.followup.send("Your account couldn't be found. Please try again later.", ephemeral=True)
 
@@ -228,7 +229,7 @@ class PenaltyCog(commands.Cog):
         try:
             if bet_amount.lower() == "all":
                 db = Users()
-                user_data = db.fetch_user(ctx.author.id)
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
                 if not user_data:
                     return await ctx.reply("Your account couldn't be found. Please try again later.")
                 
@@ -244,42 +245,27 @@ class PenaltyCog(commands.Cog):
         if bet_amount <= 0:
             return await ctx.reply("Bet amount must be positive!")
 
-        # Check if user has enough balance
+        # Take the bet and record game stats in one atomic update
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
-        if not user_data:
-            return await ctx.reply("Your account couldn't be found. Please try again later.")
-        
-        balance = user_data[currency_type]
-        
-        # Initialize tokens and credits used
-        tokens_used = 0
-        credits_used = 0
-        
-        if balance < bet_amount:
+        bet_split = await db.debit_bet(ctx.author.id, bet_amount, currency_type)
+        if bet_split is None:
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if not user_data:
+                return await ctx.reply("Your account couldn't be found. Please try again later.")
+            balance = user_data[currency_type]
             return await ctx.reply(f"You don't have enough {currency_type} to place this bet! Your balance: {balance:,.2f} {currency_type}")
-        
-        # Set the amount used based on currency type
-        if currency_type == "tokens":
-            tokens_used = bet_amount
-        else:
-            credits_used = bet_amount
 
         # Loading message
         loading_message = await ctx.reply("⚽ Setting up the penalty game...")
 
         # Mark game as ongoing
         self.ongoing_games[ctx.author.id] = {
+            "tokens_used": bet_split["tokens_used"],
+            "credits_used": bet_split["credits_used"],
             "bet_amount": bet_amount,
             "currency_type": currency_type
         }
 
-        # Deduct bet from user's balance
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, -tokens_used, "tokens", "$inc")
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, -credits_used, "credits", "$inc")
-
         # Create role selection embed
         embed = discord.Embed(
             title="⚽ PENALTY KICK - CHOOSE YOUR ROLE",
@@ -339,9 +325,8 @@ class PenaltyCog(commands.Cog):
 
     async def process_penalty_shot(self, ctx, interaction, shot_direction, bet_amount):
         """Process the penalty shot when user is the taker"""
-        # Remove from ongoing games
-        if ctx.author.id in self.ongoing_games:
-            del self.ongoing_games[ctx.author.id]
+        # Remove from ongoing games, keeping its bet in case it has to be refunded
+        game = self.ongoing_games.pop(ctx.author.id, None)
 
         # Goalkeeper picks a random direction
         goalkeeper_directions = ["left", "middle", "right"]
@@ -360,16 +345,6 @@ class PenaltyCog(commands.Cog):
             description = f"You shot **{shot_direction.upper()}**, the goalkeeper dove **{goalkeeper_direction.upper()}**.\n\n**You won {winnings:,.2f} credits!**"
             color = 0x00FF00  # Green for win
 
-            # Update user balance with winnings
-            db = Users()
-            db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-            # Update statistics
-            db.collection.update_one(
-                {"discord_id": ctx.author.id},
-                {"$inc": {"total_played": 1, "total_won": 1, "total_earned": winnings}}
-            )
-
             # Result text
             result_text = f"**You shot {shot_direction.upper()} and the goalkeeper went {goalkeeper_direction.upper()}!**"
         else:
@@ -377,13 +352,6 @@ class PenaltyCog(commands.Cog):
             description = f"You shot **{shot_direction.upper()}**, the goalkeeper dove **{goalkeeper_direction.upper()}**.\n\n**You lost {bet_amount:,.2f} credits.**"
             color = 0xFF0000  # Red for loss
 
-            # Update statistics
-            db = Users()
-            db.collection.update_one(
-                {"discord_id": ctx.author.id},
-                {"$inc": {"total_played": 1, "total_lost": 1, "total_spent": bet_amount}}
-            )
-
             # Result text
             result_text = f"**You shot {shot_direction.upper()} and the goalkeeper went {goalkeeper_direction.upper()}!**"
 
@@ -395,8 +363,9 @@ class PenaltyCog(commands.Cog):
         )
         embed.set_footer(text="BetSync Casino | Want to try again?", icon_url=self.bot.user.avatar.url)
 
-        # Add betting history
-        self.update_bet_history(ctx, "penalty_taker", bet_amount, shot_direction, goalkeeper_direction, goal_scored, multiplier, winnings)
+        # Pay out and record the game
+        if not await self.update_bet_history(ctx, game, "penalty_taker", bet_amount, shot_direction, goalkeeper_direction, goal_scored, multiplier, winnings):
+            return
 
         # Create "Play Again" button
         play_again_view = PlayAgainView(self, ctx, bet_amount, timeout=15)
@@ -405,9 +374,8 @@ class PenaltyCog(commands.Cog):
 
     async def process_goalkeeper_save(self, ctx, interaction, dive_direction, bet_amount):
         """Process the penalty save when user is the goalkeeper"""
-        # Remove from ongoing games
-        if ctx.author.id in self.ongoing_games:
-            del self.ongoing_games[ctx.author.id]
+        # Remove from ongoing games, keeping its bet in case it has to be refunded
+        game = self.ongoing_games.pop(ctx.author.id, None)
 
         # Striker picks a random direction
         striker_directions = ["left", "middle", "right"]
@@ -426,16 +394,6 @@ class PenaltyCog(commands.Cog):
             description = f"You dove **{dive_direction.upper()}**, the striker shot **{striker_direction.upper()}**.\n\n**You won {winnings:,.2f} credits!**"
             color = 0x00FF00  # Green for win
 
-            # Update user balance with winnings
-            db = Users()
-            db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-            # Update statistics
-            db.collection.update_one(
-                {"discord_id": ctx.author.id},
-                {"$inc": {"total_played": 1, "total_won": 1, "total_earned": winnings}}
-            )
-
             # Result text
             result_text = f"**You dove {dive_direction.upper()} and the striker shot {striker_direction.upper()}!**"
         else:
@@ -443,13 +401,6 @@ class PenaltyCog(commands.Cog):
             description = f"You dove **{dive_direction.upper()}**, the striker shot **{striker_direction.upper()}**.\n\n**You lost {bet_amount:,.2f} credits.**"
             color = 0xFF0000  # Red for loss
 
-            # Update statistics
-            db = Users()
-            db.collection.update_one(
-                {"discord_id": ctx.author.id},
-                {"$inc": {"total_played": 1, "total_lost": 1, "total_spent": bet_amount}}
-            )
-
             # Result text
             result_text = f"**You dove {dive_direction.upper()} and the striker shot {striker_direction.upper()}!**"
 
@@ -461,49 +412,39 @@ class PenaltyCog(commands.Cog):
         )
         embed.set_footer(text="BetSync Casino | Want to try again?", icon_url=self.bot.user.avatar.url)
 
-        # Add betting history
-        self.update_bet_history(ctx, "penalty_goalkeeper", bet_amount, dive_direction, striker_direction, save_made, multiplier, winnings)
+        # Pay out and record the game
+        if not await self.update_bet_history(ctx, game, "penalty_goalkeeper", bet_amount, dive_direction, striker_direction, save_made, multiplier, winnings):
+            return
 
         # Create "Play Again" button
         play_again_view = PlayAgainView(self, ctx, bet_amount, timeout=15)
         message = await interaction.followup.send(embed=embed, view=play_again_view)
         play_again_view.message = message
 
-    def update_bet_history(self, ctx, game_type, bet_amount, user_choice, ai_choice, won, multiplier, winnings):
-        """Update bet history in database"""
-        # Create timestamp
-        timestamp = int(datetime.utcnow().timestamp())
-        
-        # Create game data
-        game_data = {
-            "game": game_type,
-            "type": "win" if won else "loss",
-            "bet": bet_amount,
-            "amount": winnings if won else bet_amount,
-            "multiplier": multiplier if won else 0,
-            "choice": user_choice,
-            "outcome": ai_choice,
-            "win": won,
-            "timestamp": timestamp
-        }
-        
-        # Update user history
-        db = Users()
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [game_data], "$slice": -100}}}
-        )
-
-        # Update server history with additional user information
-        server_db = Servers()
-        server_id = ctx.guild.id if ctx.guild else None
-        
-        if server_id:
-            server_game_data = game_data.copy()
-            server_game_data["user_id"] = ctx.author.id
-            server_game_data["user_name"] = str(ctx.author)
-            
-            server_db.update_history(server_id, server_game_data)
+    async def update_bet_history(self, ctx, game, game_type, bet_amount, user_choice, ai_choice, won, multiplier, winnings):
+        """Settle the game: winnings, stats, user and server history in one go
+
+        Refunds the bet and tells the player if the game can't be settled.
+        """
+        settled = await Settlement().settle_or_refund(GameOutcome(
+            ctx.author, ctx.guild, game_type,
+            "win" if won else "loss",
+            bet_amount,
+            payout=winnings,
+            multiplier=multiplier if won else 0,
+            timestamp=int(datetime.utcnow().timestamp()),
+            choice=user_choice,
+            outcome=ai_choice,
+            win=won
+        ), game)
+        if not settled:
+            error_embed = discord.Embed(
+                title="❌ | Game Error",
+                description="An error occurred during the game. Your bet has been refunded.",
+                color=0xFF0000
+            )
+            await ctx.reply(embed=error_embed)
+        return settled
 
 
 def setup(bot):
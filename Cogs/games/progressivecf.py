@@ -1,9 +1,9 @@
 import discord
 import asyncio
 import random
-import time
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 from Cogs.utils.emojis import emoji
 
 class PCFView(discord.ui.View):
@@ -123,51 +123,13 @@ class PCFView(discord.ui.View):
             await interaction.message.edit(view=play_again_view)
             play_again_view.message = interaction.message
 
-            # Process loss (if they've already flipped some coins)
-            if self.current_flips > 0:
-                # Register the loss in history
-                db = Users()
-
-                loss_entry = {
-                    "type": "loss",
-                    "game": "progressive_coinflip",
-                    "bet": self.bet_amount,
-                    "flips": self.current_flips,
-                    "multiplier": self.current_multiplier,
-                    "timestamp": int(time.time())
-                }
-                db.collection.update_one(
-                    {"discord_id": self.ctx.author.id},
-                    {"$push": {"history": {"$each": [loss_entry], "$slice": -100}}}
-                )
-
-                # Update server history if available
-                server_db = Servers()
-                server_data = server_db.fetch_server(self.ctx.guild.id)
-
-                if server_data:
-                    server_loss_entry = {
-                        "type": "loss",
-                        "game": "progressive_coinflip",
-                        "user_id": self.ctx.author.id,
-                        "user_name": self.ctx.author.name,
-                        "bet": self.bet_amount,
-                        "flips": self.current_flips,
-                        "timestamp": int(time.time())
-                    }
-                    server_db.collection.update_one(
-                        {"server_id": self.ctx.guild.id},
-                        {
-                            "$push": {"server_bet_history": {"$each": [server_loss_entry], "$slice": -100}},
-                            "$inc": {"total_profit": self.bet_amount}
-                        }
-                    )
-
-                # Update user stats
-                db.collection.update_one(
-                    {"discord_id": self.ctx.author.id},
-                    {"$inc": {"total_lost": 1}}
-                )
+            # Settle the loss
+            await self.cog.settle(self.ctx, GameOutcome(
+                self.ctx.author, self.ctx.guild, "progressive_coinflip", "loss",
+                self.bet_amount,
+                multiplier=self.current_multiplier,
+                flips=self.current_flips
+            ))
 
             # Remove from ongoing games
             if self.ctx.author.id in self.cog.ongoing_games:
@@ -226,7 +188,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the bet amount
         db = Users()
-        user_data = db.fetch_user(self.ctx.author.id)
+        user_data = await db.fetch_user(self.ctx.author.id, BALANCE_PROJECTION)
         tokens_balance = user_data.get('tokens', 0)
         credits_balance = user_data.get('credits', 0)
         total_balance = tokens_balance + credits_balance
@@ -332,18 +294,7 @@ class ProgressiveCoinflipCog(commands.Cog):
         )
         loading_message = await ctx.reply(embed=loading_embed)
 
-        # Process bet amount
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
-
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
 
         # Format currency type if provided
         if currency_type:
@@ -358,6 +309,15 @@ class ProgressiveCoinflipCog(commands.Cog):
         try:
             # Handle 'all' or 'max' bet
             if bet_amount.lower() in ['all', 'max']:
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
                 bet_amount_value = user_data['tokens'] + user_data['credits']
             else:
                 # Check if bet has 'k' or 'm' suffix
@@ -388,62 +348,40 @@ class ProgressiveCoinflipCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Get user balances
-        tokens_balance = user_data['tokens']
-        credits_balance = user_data['credits']
-
-        # Determine which currency to use
-        tokens_used = 0
-        credits_used = 0
+        # Take the bet and record game stats in one atomic update
+        bet_split = await db.debit_bet(ctx.author.id, bet_amount_value, currency_type)
 
-        if currency_type == 'tokens':
-            # User specifically wants to use tokens
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            else:
-                await loading_message.delete()
+        if bet_split is None:
+            await loading_message.delete()
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if user_data is None:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | User Not Found",
+                    description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                    color=0xFF0000
+                )
+            elif currency_type == 'tokens':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Tokens",
-                    description=f"You don't have enough tokens. Your balance: **{tokens_balance:.2f} tokens**",
+                    description=f"You don't have enough tokens. Your balance: **{user_data['tokens']:.2f} tokens**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        elif currency_type == 'credits':
-            # User specifically wants to use credits
-            if bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            else:
-                await loading_message.delete()
+            elif currency_type == 'credits':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Credits",
-                    description=f"You don't have enough credits. Your balance: **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough credits. Your balance: **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        else:
-            # Auto determine what to use
-            if bet_amount_value <= tokens_balance:
-                tokens_used = bet_amount_value
-            elif bet_amount_value <= credits_balance:
-                credits_used = bet_amount_value
-            elif bet_amount_value <= tokens_balance + credits_balance:
-                # Use all tokens and some credits
-                tokens_used = tokens_balance
-                credits_used = bet_amount_value - tokens_balance
             else:
-                await loading_message.delete()
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Funds",
-                    description=f"You don't have enough funds. Your balance: **{tokens_balance:.2f} tokens** and **{credits_balance:.2f} credits**",
+                    description=f"You don't have enough funds. Your balance: **{user_data['tokens']:.2f} tokens** and **{user_data['credits']:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
+            return await ctx.reply(embed=embed)
 
-        # Deduct from user balances
-        if tokens_used > 0:
-            db.update_balance(ctx.author.id, -tokens_used, "tokens", "$inc")
-        if credits_used > 0:
-            db.update_balance(ctx.author.id, -credits_used, "credits", "$inc")
+        tokens_used = bet_split["tokens_used"]
+        credits_used = bet_split["credits_used"]
 
         # Get total amount bet
         total_bet = tokens_used + credits_used
@@ -511,58 +449,14 @@ class ProgressiveCoinflipCog(commands.Cog):
         await message.edit(view=play_again_view)
         play_again_view.message = message
 
-        # Process win
-        # Add credits to user
-        db = Users()
-        db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-        # Add to win history
-        win_entry = {
-            "type": "win",
-            "game": "progressive_coinflip",
-            "bet": bet_amount,
-            "amount": winnings,
-            "flips": flips,
-            "multiplier": multiplier,
-            "timestamp": int(time.time())
-        }
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [win_entry], "$slice": -100}}}
-        )
-
-        # Update server history
-        server_db = Servers()
-        server_data = server_db.fetch_server(ctx.guild.id)
-
-        if server_data:
-            server_win_entry = {
-                "type": "win",
-                "game": "progressive_coinflip",
-                "user_id": ctx.author.id,
-                "user_name": ctx.author.name,
-                "bet": bet_amount,
-                "amount": winnings,
-                "flips": flips,
-                "multiplier": multiplier,
-                "timestamp": int(time.time())
-            }
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$push": {"server_bet_history": {"$each": [server_win_entry], "$slice": -100}}}
-            )
-
-            # Update server profit (negative because player won)
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$inc": {"total_profit": -(winnings - bet_amount)}}
-            )
-
-        # Update user stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_won": 1, "total_earned": winnings, "total_played": 1}}
-        )
+        # Pay out the winnings and record the game
+        await self.settle(ctx, GameOutcome(
+            ctx.author, ctx.guild, "progressive_coinflip", "win",
+            bet_amount,
+            payout=winnings,
+            multiplier=multiplier,
+            flips=flips
+        ))
 
         # Remove from ongoing games
         if ctx.author.id in self.ongoing_games:
@@ -743,110 +637,38 @@ class ProgressiveCoinflipCog(commands.Cog):
             if ctx.author.id in self.ongoing_games:
                 del self.ongoing_games[ctx.author.id]
 
+    async def settle(self, ctx, outcome):
+        """Settle the game, refunding the bet and telling the player if that fails"""
+        if not await Settlement().settle_or_refund(outcome, self.ongoing_games.get(ctx.author.id)):
+            error_embed = discord.Embed(
+                title="❌ | Game Error",
+                description="An error occurred during the game. Your bet has been refunded.",
+                color=0xFF0000
+            )
+            await ctx.reply(embed=error_embed)
+
     async def process_win(self, ctx, bet_amount, multiplier, flips):
         """Process win for progressive coinflip"""
         # Calculate winnings
         winnings = bet_amount * multiplier
 
-        # Get database connection
-        db = Users()
-
-        # Add credits to user (always give credits for winnings)
-        db.update_balance(ctx.author.id, winnings, "credits", "$inc")
-
-        # Add to win history
-        win_entry = {
-            "type": "win",
-            "game": "pcf",
-            "bet": bet_amount,
-            "amount": winnings,
-            "multiplier": multiplier,
-            "flips": flips,
-            "timestamp": int(time.time())
-        }
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [win_entry], "$slice": -100}}}
-        )
-
-        # Update server history
-        server_db = Servers()
-        server_data = server_db.fetch_server(ctx.guild.id)
-
-        if server_data:
-            server_win_entry = {
-                "type": "win",
-                "game": "pcf",
-                "user_id": ctx.author.id,
-                "user_name": ctx.author.name,
-                "bet": bet_amount,
-                "amount": winnings,
-                "multiplier": multiplier,
-                "flips": flips,
-                "timestamp": int(time.time())
-            }
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$push": {"server_bet_history": {"$each": [server_win_entry], "$slice": -100}}}
-            )
-
-            # Update server profit (negative value because server loses when player wins)
-            profit = winnings - bet_amount
-            server_db.update_server_profit(ctx.guild.id, -profit)
-
-        # Update user stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_won": 1, "total_earned": winnings}}
-        )
+        # Credits, stats and history in one combined update
+        await self.settle(ctx, GameOutcome(
+            ctx.author, ctx.guild, "pcf", "win",
+            bet_amount,
+            payout=winnings,
+            multiplier=multiplier,
+            flips=flips
+        ))
 
     async def process_loss(self, ctx, bet_amount, flips):
         """Process loss for progressive coinflip"""
-        # Get database connection
-        db = Users()
-
-        # Add to loss history
-        loss_entry = {
-            "type": "loss",
-            "game": "pcf",
-            "bet": bet_amount,
-            "amount": bet_amount,
-            "flips": flips,
-            "timestamp": int(time.time())
-        }
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$push": {"history": {"$each": [loss_entry], "$slice": -100}}}
-        )
-
-        # Update server history
-        server_db = Servers()
-        server_data = server_db.fetch_server(ctx.guild.id)
-
-        if server_data:
-            server_loss_entry = {
-                "type": "loss",
-                "game": "pcf",
-                "user_id": ctx.author.id,
-                "user_name": ctx.author.name,
-                "bet": bet_amount,
-                "flips": flips,
-                "timestamp": int(time.time())
-            }
-            server_db.collection.update_one(
-                {"server_id": ctx.guild.id},
-                {"$push": {"server_bet_history": {"$each": [server_loss_entry], "$slice": -100}}}
-            )
-
-            # Update server profit
-            server_db.update_server_profit(ctx.guild.id, bet_amount)
-
-        # Update user stats
-        db.collection.update_one(
-            {"discord_id": ctx.author.id},
-            {"$inc": {"total_lost": 1}}
-        )
-
+        await self.settle(ctx, GameOutcome(
+            ctx.author, ctx.guild, "pcf", "loss",
+            bet_amount,
+            multiplier=0,
+            flips=flips
+        ))
 
 
 def setup(bot):
@@ -1,11 +1,24 @@
 
 import discord
 import asyncio
+import io
+import os
 import random
 import time
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
+from Cogs.utils.settlement import Settlement, GameOutcome
 from Cogs.utils.emojis import emoji
+from Cogs.utils.render_service import get_render_service
+from Cogs.utils.sampler import WeightedSampler
+from Cogs.utils.wheel_render import WHEEL_ANIMATION, WHEEL_SPIN_SECONDS
+from dotenv import load_dotenv
+load_dotenv()
+
+# Spin limits, all overridable from the environment
+WHEEL_MAX_SPINS = int(os.environ.get("WHEEL_MAX_SPINS", 10000))
+# Batches up to this size list every spin, bigger ones are summarized per color and settled as one game
+WHEEL_LISTED_SPINS = int(os.environ.get("WHEEL_LISTED_SPINS", 15))
 
 class WheelCog(commands.Cog):
     def __init__(self, bot):
@@ -21,13 +34,24 @@ class WheelCog(commands.Cog):
         }
         # Calculate total chance to verify it sums to 100
         self.total_chance = sum(color["chance"] for color in self.colors.values())
+        # 4% of spins are forced to gray on top of its own chance
+        self.house_edge = 0.04
+        self.sampler = WeightedSampler({
+            color: data["chance"] / self.total_chance * (1 - self.house_edge) + (self.house_edge if color == "gray" else 0)
+            for color, data in self.colors.items()
+        })
+        # Spin animations, one per result color, kept for the life of the bot
+        self.segments = tuple((color, data["chance"]) for color, data in self.colors.items())
+        self.spin_animations = {}
+        if WHEEL_ANIMATION == "gif":
+            self.bot.loop.create_task(self.warm_animations())
 
     @commands.command(aliases=["w"])
     async def wheel(self, ctx, bet_amount: str = None, currency_type: str = None, spins: int = 1):
         """Play the wheel game - bet on colors with different multipliers!"""
-        # Limit the number of spins to 15
-        if spins > 15:
-            spins = 15
+        # Limit the number of spins
+        if spins > WHEEL_MAX_SPINS:
+            spins = WHEEL_MAX_SPINS
         elif spins < 1:
             spins = 1
         if not bet_amount:
@@ -36,7 +60,8 @@ class WheelCog(commands.Cog):
                 description=(
                     "**Wheel** is a game where you bet and win based on where the wheel lands.\n\n"
                     "**Usage:** `!wheel <amount> [currency_type] [spins]`\n"
-                    "**Example:** `!wheel 100` or `!wheel 100 tokens` or `!wheel 100 tokens 5`\n\n"
+                    "**Example:** `!wheel 100` or `!wheel 100 tokens` or `!wheel 100 tokens 5`\n"
+                    f"Spin up to {WHEEL_MAX_SPINS:,} times at once, more than {WHEEL_LISTED_SPINS} spins are summarized per color.\n\n"
                     "**Colors and Multipliers:**\n"
                     "⚪ **Gray** - 0x (Loss)\n"
                     "🟡 **Yellow** - 1.5x\n"
@@ -71,47 +96,44 @@ class WheelCog(commands.Cog):
         )
         loading_message = await ctx.reply(embed=loading_embed)
 
-        # Process bet amount
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
 
-        if user_data == False:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | User Not Found",
-                description="You don't have an account. Please wait for auto-registration or use `!signup`.",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
-            
-        # Auto-select currency if not specified
-        if currency_type is None:
-            tokens_balance = user_data['tokens']
-            credits_balance = user_data['credits']
-            
-            # Use currency with higher balance, or tokens if equal
-            if tokens_balance >= credits_balance and tokens_balance > 0:
-                currency_type = "tokens"
-            elif credits_balance > 0:
-                currency_type = "credits"
+        # Process currency type
+        if currency_type is not None:
+            if currency_type.lower() in ['t', 'token', 'tokens']:
+                currency_type = 'tokens'
+            elif currency_type.lower() in ['c', 'credit', 'credits']:
+                currency_type = 'credits'
             else:
-                currency_type = "tokens"  # Default to tokens if both are 0 await ctx.reply(embed=embed)
+                await loading_message.delete()
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | Invalid Currency",
+                    description="Please use 'tokens' (t) or 'credits' (c).",
+                    color=0xFF0000
+                )
+                return await ctx.reply(embed=embed)
 
-        # Process bet amount
+        # Process bet amount, 'all' is split over every spin
+        total_bet = None
         try:
             # Handle 'all' or 'max' bet
             if bet_amount.lower() in ['all', 'max']:
-                tokens_balance = user_data['tokens']
-                credits_balance = user_data['credits']
-                
+                user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+                if user_data is None:
+                    await loading_message.delete()
+                    embed = discord.Embed(
+                        title="<:no:1344252518305234987> | User Not Found",
+                        description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                        color=0xFF0000
+                    )
+                    return await ctx.reply(embed=embed)
+
                 # Determine which currency to use if not specified
                 if currency_type is None:
                     # Use tokens if available, otherwise credits
-                    if tokens_balance > 0:
-                        bet_amount_value = tokens_balance
+                    if user_data['tokens'] > 0:
                         currency_type = 'tokens'
-                    elif credits_balance > 0:
-                        bet_amount_value = credits_balance
+                    elif user_data['credits'] > 0:
                         currency_type = 'credits'
                     else:
                         embed = discord.Embed(
@@ -121,20 +143,8 @@ class WheelCog(commands.Cog):
                         )
                         await loading_message.delete()
                         return await ctx.reply(embed=embed)
-                elif currency_type.lower() in ['t', 'token', 'tokens']:
-                    bet_amount_value = tokens_balance
-                    currency_type = 'tokens'
-                elif currency_type.lower() in ['c', 'credit', 'credits']:
-                    bet_amount_value = credits_balance
-                    currency_type = 'credits'
-                else:
-                    await loading_message.delete()
-                    embed = discord.Embed(
-                        title="<:no:1344252518305234987> | Invalid Currency",
-                        description="Please use 'tokens' (t) or 'credits' (c).",
-                        color=0xFF0000
-                    )
-                    return await ctx.reply(embed=embed)
+                total_bet = user_data[currency_type]
+                bet_amount_value = total_bet / spins
             else:
                 # Check if bet_amount has 'k' or 'm' suffix
                 if bet_amount.lower().endswith('k'):
@@ -162,361 +172,273 @@ class WheelCog(commands.Cog):
             )
             return await ctx.reply(embed=embed)
 
-        # Process currency type
-        if currency_type is None or currency_type.lower() in ['t', 'token', 'tokens']:
-            currency_type = 'tokens'
-        elif currency_type.lower() in ['c', 'credit', 'credits']:
-            currency_type = 'credits'
-        else:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | Invalid Currency",
-                description="Please use 'tokens' (t) or 'credits' (c).",
-                color=0xFF0000
-            )
-            return await ctx.reply(embed=embed)
+        # Take the bet for all spins and record game stats in one atomic update
+        if total_bet is None:
+            total_bet = bet_amount_value * spins
+        bet_split = await db.debit_bet(
+            ctx.author.id, total_bet, currency_type, plays=spins
+        )
 
-        # Check if the user has enough balance
-        tokens_balance = user_data['tokens']
-        credits_balance = user_data['credits']
-        
-        # Initialize tokens and credits used
-        tokens_used = 0
-        credits_used = 0
-        
-        # Determine which currencies to use
-        if currency_type == 'tokens':
-            if tokens_balance >= bet_amount_value:
-                tokens_used = bet_amount_value
-            else:
-                await loading_message.delete()
+        if bet_split is None:
+            await loading_message.delete()
+            user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
+            if user_data is None:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | User Not Found",
+                    description="You don't have an account. Please wait for auto-registration or use `!signup`.",
+                    color=0xFF0000
+                )
+            elif currency_type == 'tokens':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Tokens",
-                    description=f"You don't have enough tokens. Your balance: **{tokens_balance:.2f} tokens**\nRequired: **{bet_amount_value:.2f} tokens**",
+                    description=f"You don't have enough tokens for {spins} spin{'s' if spins > 1 else ''}. Your balance: **{user_data['tokens']:.2f} tokens**\nRequired: **{total_bet:.2f} tokens**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
-        else:  # credits
-            if credits_balance >= bet_amount_value:
-                credits_used = bet_amount_value
-            else:
-                await loading_message.delete()
+            elif currency_type == 'credits':
                 embed = discord.Embed(
                     title="<:no:1344252518305234987> | Insufficient Credits",
-                    description=f"You don't have enough credits. Your balance: **{credits_balance:.2f} credits**\nRequired: **{bet_amount_value:.2f} credits**",
+                    description=f"You don't have enough credits for {spins} spin{'s' if spins > 1 else ''}. Your balance: **{user_data['credits']:.2f} credits**\nRequired: **{total_bet:.2f} credits**",
                     color=0xFF0000
                 )
-                return await ctx.reply(embed=embed)
+            else:
+                embed = discord.Embed(
+                    title="<:no:1344252518305234987> | Insufficient Funds",
+                    description=f"You don't have enough funds for {spins} spin{'s' if spins > 1 else ''}. Your balance: **{user_data['tokens']:.2f} tokens** and **{user_data['credits']:.2f} credits**\nRequired: **{total_bet:.2f}**",
+                    color=0xFF0000
+                )
+            return await ctx.reply(embed=embed)
 
-        # Calculate total bet amount for all spins
-        total_tokens_used = tokens_used * spins
-        total_credits_used = credits_used * spins
-        
-        # Check if user has enough for all spins
-        if tokens_used > 0 and user_data['tokens'] < total_tokens_used:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | Insufficient Tokens",
-                description=f"You don't have enough tokens for {spins} spins. Your balance: **{tokens_balance:.2f} tokens**\nRequired: **{total_tokens_used:.2f} tokens**",
-                color=0xFF0000
+        settled = False
+        try:
+            # Split used for all spins, and per spin
+            total_tokens_used = bet_split["tokens_used"]
+            total_credits_used = bet_split["credits_used"]
+            tokens_used = total_tokens_used / spins
+            credits_used = total_credits_used / spins
+
+            # Mark game as ongoing
+            self.ongoing_games[ctx.author.id] = {
+                "bet_amount": bet_amount_value,
+                "tokens_used": total_tokens_used,
+                "credits_used": total_credits_used,
+                "spins": spins
+            }
+
+            # Create initial wheel embed
+            intro = "The wheel is spinning..." if spins == 1 else f"You spun the wheel {spins:,} times."
+            wheel_embed = discord.Embed(
+                title="<a:hersheyparkSpin:1345317103158431805> Wheel of Fortune",
+                description=(
+                    f"{intro}\n\n"
+                    "**Your Bet:** "
+                ),
+                color=0x00FFAE
             )
-            return await ctx.reply(embed=embed)
-        elif credits_used > 0 and user_data['credits'] < total_credits_used:
-            await loading_message.delete()
-            embed = discord.Embed(
-                title="<:no:1344252518305234987> | Insufficient Credits",
-                description=f"You don't have enough credits for {spins} spins. Your balance: **{credits_balance:.2f} credits**\nRequired: **{total_credits_used:.2f} credits**",
-                color=0xFF0000
+
+            # Format bet description
+            per_spin_text = ""
+            if tokens_used > 0 and credits_used > 0:
+                per_spin_text = f"{tokens_used:.2f} tokens + {credits_used:.2f} credits"
+                wheel_embed.description += f"{total_tokens_used:.2f} tokens + {total_credits_used:.2f} credits"
+            elif tokens_used > 0:
+                per_spin_text = f"{tokens_used:.2f} tokens"
+                wheel_embed.description += f"{total_tokens_used:.2f} tokens"
+            else:
+                per_spin_text = f"{credits_used:.2f} credits"
+                wheel_embed.description += f"{total_credits_used:.2f} credits"
+
+            if spins > 1:
+                wheel_embed.description += f" ({per_spin_text} per spin)"
+
+            wheel_embed.add_field(
+                name="Possible Outcomes",
+                value=(
+                    "⚪ **Gray** - 0x (Loss)\n"
+                    "🟡 **Yellow** - 1.5x\n"
+                    "🔴 **Red** - 2x\n"
+                    "🔵 **Blue** - 3x\n"
+                    "🟢 **Green** - 5x"
+                ),
+                inline=False
             )
-            return await ctx.reply(embed=embed)
 
-        # Mark game as ongoing
-        self.ongoing_games[ctx.author.id] = {
-            "bet_amount": bet_amount_value,
-            "tokens_used": total_tokens_used,
-            "credits_used": total_credits_used,
-            "spins": spins
-        }
+            wheel_embed.add_field(
+                name="Wheel Spinning",
+                value="⚙️ " + "⬛" * 10 + " ⚙️",
+                inline=False
+            )
 
-        # Deduct bet from user's balance
-        if total_tokens_used > 0:
-            db.update_balance(ctx.author.id, -total_tokens_used, "tokens", "$inc")
-        if total_credits_used > 0:
-            db.update_balance(ctx.author.id, -total_credits_used, "credits", "$inc")
-
-        # Delete loading message
-        await loading_message.delete()
-
-        # Create initial wheel embed
-        wheel_embed = discord.Embed(
-            title="<a:hersheyparkSpin:1345317103158431805> Wheel of Fortune",
-            description=(
-                f"The wheel is spinning for {spins} spin{'s' if spins > 1 else ''}...\n\n"
-                "**Your Bet:** "
-            ),
-            color=0x00FFAE
-        )
-        
-        # Format bet description
-        per_spin_text = ""
-        if tokens_used > 0 and credits_used > 0:
-            per_spin_text = f"{tokens_used:.2f} tokens + {credits_used:.2f} credits"
-            wheel_embed.description += f"{total_tokens_used:.2f} tokens + {total_credits_used:.2f} credits"
-        elif tokens_used > 0:
-            per_spin_text = f"{tokens_used:.2f} tokens"
-            wheel_embed.description += f"{total_tokens_used:.2f} tokens"
-        else:
-            per_spin_text = f"{credits_used:.2f} credits"
-            wheel_embed.description += f"{total_credits_used:.2f} credits"
-            
-        if spins > 1:
-            wheel_embed.description += f" ({per_spin_text} per spin)"
-            
-        wheel_embed.add_field(
-            name="Possible Outcomes",
-            value=(
-                "⚪ **Gray** - 0x (Loss)\n"
-                "🟡 **Yellow** - 1.5x\n"
-                "🔴 **Red** - 2x\n"
-                "🔵 **Blue** - 3x\n"
-                "🟢 **Green** - 5x"
-            ),
-            inline=False
-        )
-        
-        wheel_embed.add_field(
-            name="Wheel Spinning",
-            value="⚙️ " + "⬛" * 10 + " ⚙️",
-            inline=False
-        )
-        
-        wheel_embed.set_footer(text="BetSync Casino • Good luck!", icon_url=self.bot.user.avatar.url)
-        
-        # Send the initial wheel embed
-        wheel_message = await ctx.reply(embed=wheel_embed)
-        
-        # Create spinning animation - reduced to exactly 2 seconds total
-        spinning_frames = [
-            "⚙️ " + "⬛" * 4 + "🟡" + "⬛" * 5 + " ⚙️",
-            "⚙️ " + "⬛" * 5 + "🔴" + "⬛" * 4 + " ⚙️",
-            "⚙️ " + "⬛" * 6 + "🔵" + "⬛" * 3 + " ⚙️",
-            "⚙️ " + "⬛" * 7 + "🟢" + "⬛" * 2 + " ⚙️",
-            "⚙️ " + "⬛" * 8 + "⚪" + "⬛" * 1 + " ⚙️",
-            "⚙️ " + "⬛" * 9 + "🟡" + " ⚙️",
-            "⚙️ " + "🔴" + "⬛" * 9 + " ⚙️",
-            "⚙️ " + "⬛" * 1 + "🔵" + "⬛" * 8 + " ⚙️",
-            "⚙️ " + "⬛" * 2 + "🟢" + "⬛" * 7 + " ⚙️",
-            "⚙️ " + "⬛" * 3 + "⚪" + "⬛" * 6 + " ⚙️"
-        ]
-        
-        # Animate the wheel spinning - 20 frames × 0.1s = 2 seconds total
-        for _ in range(1):  # Reduced to 2 cycles
-            for frame in spinning_frames:
+            wheel_embed.set_footer(text="BetSync Casino • Good luck!", icon_url=self.bot.user.avatar.url)
+
+            # The loading message is edited into the spin and then the result
+            spin_embed = wheel_embed.copy()
+
+            # Draw every spin at once, the house edge is part of the weights
+            bet_total = tokens_used + credits_used
+            total_bet_amount = bet_total * spins
+            draws = self.sampler.draw(spins)
+            counts = self.sampler.counts(draws)
+            total_winnings = bet_total * sum(self.colors[color]["multiplier"] * count for color, count in counts.items())
+            wins_count = sum(count for color, count in counts.items() if self.colors[color]["multiplier"] > 0)
+
+            if spins <= WHEEL_LISTED_SPINS:
+                # Few enough spins to list one by one
+                spin_results = []
+                for index in draws:
+                    result_color = self.sampler.outcomes[index]
+                    result_multiplier = self.colors[result_color]["multiplier"]
+                    spin_results.append({
+                        "color": result_color,
+                        "emoji": self.colors[result_color]["emoji"],
+                        "multiplier": result_multiplier,
+                        "winnings": bet_total * result_multiplier  # Always paid out in credits
+                    })
+
+                # Update the wheel embed with a single animated result
+                random_result = random.choice(spin_results)
+                result_frame = "⚙️ " + "⬛" * 5 + random_result["emoji"] + "⬛" * 4 + " ⚙️"
                 wheel_embed.set_field_at(
-                    1,  # Index 1 is the "Wheel Spinning" field
-                    name="Wheel Spinning",
-                    value=frame,
+                    1,
+                    name="Wheel Animation",
+                    value=result_frame,
                     inline=False
                 )
-                await wheel_message.edit(embed=wheel_embed)
-                await asyncio.sleep(0.004)  # Exactly 20 frames × 0.1s = 2 seconds total
 
-        # Calculate results for all spins with house edge (3-5%)
-        house_edge = 0.04  # 4% house edge
-        
-        # Store results for all spins
-        spin_results = []
-        total_winnings = 0
-        bet_total = tokens_used + credits_used
-        total_bet_amount = bet_total * spins
-        
-        # Calculate results for each spin
-        for _ in range(spins):
-            # Apply house edge to outcome calculation
-            if random.random() < house_edge:
-                # Force a loss (gray) more often for house edge
-                result_color = "gray"
+                # Create a summary of all results
+                results_summary = ""
+                for i, result in enumerate(spin_results):
+                    results_summary += f"Spin {i+1}: {result['emoji']} ({result['color'].capitalize()}) - {result['multiplier']}x - {result['winnings']:.2f} credits\n"
+
+                # Settle every spin in one combined update per document
+                now = int(time.time())
+                outcomes = [
+                    GameOutcome(
+                        ctx.author, ctx.guild, "wheel",
+                        "win" if result["multiplier"] > 0 else "loss",
+                        bet_total,
+                        payout=result["winnings"],
+                        multiplier=result["multiplier"],
+                        timestamp=now + i  # Ensure unique timestamps
+                    )
+                    for i, result in enumerate(spin_results)
+                ]
             else:
-                # Normal weighted random selection
-                random_value = random.randint(1, self.total_chance)
-                cumulative = 0
-                result_color = None
-                
-                for color, data in self.colors.items():
-                    cumulative += data["chance"]
-                    if random_value <= cumulative:
-                        result_color = color
-                        break
-            
-            # Get multiplier for the result
-            result_multiplier = self.colors[result_color]["multiplier"]
-            result_emoji = self.colors[result_color]["emoji"]
-            
-            # Calculate winnings for this spin (always paid out in credits)
-            winnings = bet_total * result_multiplier
-            total_winnings += winnings
-            
-            # Add this result to our results list
-            spin_results.append({
-                "color": result_color,
-                "emoji": result_emoji,
-                "multiplier": result_multiplier,
-                "winnings": winnings
-            })
-        
-        # Update the wheel embed with a single animated result
-        random_result = random.choice(spin_results)
-        result_frame = "⚙️ " + "⬛" * 5 + random_result["emoji"] + "⬛" * 4 + " ⚙️"
-        wheel_embed.set_field_at(
-            1,
-            name="Wheel Animation",
-            value=result_frame,
-            inline=False
-        )
-        
-        # Create a summary of all results
-        results_summary = ""
-        wins_count = 0
-        for i, result in enumerate(spin_results):
-            if result["multiplier"] > 0:
-                wins_count += 1
-            results_summary += f"Spin {i+1}: {result['emoji']} ({result['color'].capitalize()}) - {result['multiplier']}x - {result['winnings']:.2f} credits\n"
-        
-        # Add overall results summary
-        wheel_embed.add_field(
-            name=f"Spin Results ({wins_count}/{spins} wins)",
-            value=results_summary,
-            inline=False
-        )
-        
-        # Add overall result field
-        if total_winnings > 0:
-            net_profit = total_winnings - total_bet_amount
+                # Too many spins to list, count them per color instead
+                wheel_embed.remove_field(1)
+                results_summary = ""
+                for color, count in counts.items():
+                    data = self.colors[color]
+                    results_summary += (
+                        f"{data['emoji']} **{color.capitalize()}** ({data['multiplier']}x) - "
+                        f"{count:,} ({count / spins:.1%}) - {bet_total * data['multiplier'] * count:.2f} credits\n"
+                    )
+
+                # The whole batch is one game in the history, won or lost on its net payout,
+                # while the stats count every spin like the listed ones
+                if total_winnings > total_bet_amount:
+                    result = "win"
+                elif total_winnings < total_bet_amount:
+                    result = "loss"
+                else:
+                    result = "draw"
+                outcomes = [GameOutcome(
+                    ctx.author, ctx.guild, "wheel", result, total_bet_amount,
+                    payout=total_winnings, wins=wins_count, losses=spins - wins_count, spins=spins, colors=counts
+                )]
+
+            # Add overall results summary
             wheel_embed.add_field(
-                name=f"🎉 Overall Results",
-                value=f"**Total Bet:** {total_bet_amount:.2f}\n**Total Winnings:** {total_winnings:.2f} credits\n**Net Profit:** {net_profit:.2f} credits",
+                name=f"Spin Results ({wins_count:,}/{spins:,} wins)",
+                value=results_summary,
                 inline=False
             )
-            
-            if net_profit > 0:
-                wheel_embed.color = 0x00FF00  # Green for overall profit
-            else:
-                wheel_embed.color = 0xFFA500  # Orange for win but overall loss/breakeven
-            
-            # Update user's balance with winnings
-            db.update_balance(ctx.author.id, total_winnings, "credits", "$inc")
-            
-            # Process stats and history for each spin
-            server_db = Servers()
-            server_data = server_db.fetch_server(ctx.guild.id)
-            
-            # Track wins and losses for stats
-            wins_count = 0
-            losses_count = 0
-            house_profit = 0
-            
-            # History entries for batch update
-            history_entries = []
-            server_history_entries = []
-            
-            for i, result in enumerate(spin_results):
-                # Process individual spin history
-                if result["multiplier"] > 0:
-                    # This spin was a win
-                    wins_count += 1
-                    history_entry = {
-                        "type": "win",
-                        "game": "wheel",
-                        "bet": bet_total,
-                        "amount": result["winnings"],
-                        "multiplier": result["multiplier"],
-                        "timestamp": int(time.time()) + i  # Ensure unique timestamps
-                    }
-                    
-                    if server_data:
-                        server_bet_history_entry = {
-                            "type": "win",
-                            "game": "wheel",
-                            "user_id": ctx.author.id,
-                            "user_name": ctx.author.name,
-                            "bet": bet_total,
-                            "amount": result["winnings"],
-                            "multiplier": result["multiplier"],
-                            "timestamp": int(time.time()) + i
-                        }
-                        server_history_entries.append(server_bet_history_entry)
-                        house_profit += bet_total - result["winnings"]
+
+            await Settlement().settle_many(outcomes)
+            settled = True
+
+            # Add overall result field
+            if total_winnings > 0:
+                net_profit = total_winnings - total_bet_amount
+                wheel_embed.add_field(
+                    name=f"🎉 Overall Results",
+                    value=f"**Total Bet:** {total_bet_amount:.2f}\n**Total Winnings:** {total_winnings:.2f} credits\n**Net Profit:** {net_profit:.2f} credits",
+                    inline=False
+                )
+
+                if net_profit > 0:
+                    wheel_embed.color = 0x00FF00  # Green for overall profit
+                else:
+                    wheel_embed.color = 0xFFA500  # Orange for win but overall loss/breakeven
+
+                # Set final embed color based on overall result
+                if total_winnings > total_bet_amount:
+                    wheel_embed.color = 0x00FF00  # Green for overall profit
+                elif total_winnings > 0:
+                    wheel_embed.color = 0xFFA500  # Orange for some wins but overall loss
                 else:
-                    # This spin was a loss
-                    losses_count += 1
-                    history_entry = {
-                        "type": "loss",
-                        "game": "wheel",
-                        "bet": bet_total,
-                        "amount": bet_total,
-                        "multiplier": result["multiplier"],
-                        "timestamp": int(time.time()) + i
-                    }
-                    
-                    if server_data:
-                        server_bet_history_entry = {
-                            "type": "loss",
-                            "game": "wheel",
-                            "user_id": ctx.author.id,
-                            "user_name": ctx.author.name,
-                            "bet": bet_total,
-                            "amount": bet_total,
-                            "multiplier": result["multiplier"],
-                            "timestamp": int(time.time()) + i
-                        }
-                        server_history_entries.append(server_bet_history_entry)
-                        house_profit += bet_total
-                
-                history_entries.append(history_entry)
-            
-            # Update user's stats with all spins
-            db.collection.update_one(
-                {"discord_id": ctx.author.id},
-                {
-                    "$push": {"history": {"$each": history_entries, "$slice": -100}},
-                    "$inc": {
-                        "total_played": spins,
-                        "total_won": wins_count,
-                        "total_lost": losses_count,
-                        "total_earned": total_winnings,
-                        "total_spent": total_bet_amount - total_winnings if total_winnings < total_bet_amount else 0
-                    }
-                }
+                    wheel_embed.color = 0xFF0000  # Red for complete loss
+
+            # Only a single spin is shown spinning, several spins go straight to the results
+            if spins == 1:
+                filename = await self.show_spin(loading_message, spin_embed, self.sampler.outcomes[draws[0]])
+                if filename:
+                    # Keep the animation in the embed, stopped on the result
+                    wheel_embed.set_image(url=f"attachment://{filename}")
+
+            # Show the result with the play again button in one edit
+            view = PlayAgainView(self, ctx, bet_total, spins=spins)
+            await loading_message.edit(embed=wheel_embed, view=view)
+            view.message = loading_message
+        except Exception as e:
+            print(f"Error in wheel game: {e}")
+            error_embed = discord.Embed(
+                title="❌ | Error",
+                description="An error occurred while playing wheel. Please try again later.",
+                color=0xFF0000
             )
-            
-            # Update server data with all spins
-            if server_data and server_history_entries:
-                server_db.collection.update_one(
-                    {"server_id": ctx.guild.id},
-                    {
-                        "$push": {"server_bet_history": {"$each": server_history_entries, "$slice": -100}},
-                        "$inc": {"total_profit": house_profit}
-                    }
+            # Nothing was paid out yet, so the bet goes back
+            if not settled:
+                await db.refund_bet(
+                    ctx.author.id, bet_split["tokens_used"], bet_split["credits_used"],
+                    plays=spins
                 )
-                
-            # Set final embed color based on overall result
-            if total_winnings > total_bet_amount:
-                wheel_embed.color = 0x00FF00  # Green for overall profit
-            elif total_winnings > 0:
-                wheel_embed.color = 0xFFA500  # Orange for some wins but overall loss
-            else:
-                wheel_embed.color = 0xFF0000  # Red for complete loss
-                
-        # Update the embed with play again button
-        await wheel_message.edit(embed=wheel_embed)
-        
-        # Create play again view
-        view = PlayAgainView(self, ctx, bet_total, spins=spins)
-        await wheel_message.edit(view=view)
-        view.message = wheel_message
-        
-        # Remove user from ongoing games
-        self.ongoing_games.pop(ctx.author.id, None)
+                error_embed.description = "An error occurred while playing wheel. Your bet has been refunded."
+            await ctx.reply(embed=error_embed)
+        finally:
+            # Remove user from ongoing games
+            self.ongoing_games.pop(ctx.author.id, None)
+
+    async def spin_animation(self, color):
+        """(GIF bytes, filename) of a spin landing on color, rendered once per color"""
+        animation = self.spin_animations.get(color)
+        if animation is None:
+            try:
+                animation = await get_render_service().render("wheel_spin", color, self.segments)
+            except Exception as e:
+                print(f"Error rendering wheel spin: {e}")
+                return None
+            self.spin_animations[color] = animation
+        return animation
+
+    async def warm_animations(self):
+        for color in self.colors:
+            await self.spin_animation(color)
+
+    async def show_spin(self, message, embed, result_color):
+        """Edit the game message into the spin and wait for it to finish
+
+        Returns the animation's filename, or None if only the spinning state was shown.
+        """
+        animation = await self.spin_animation(result_color) if WHEEL_ANIMATION == "gif" else None
+        if animation is None:
+            await message.edit(embed=embed)
+        else:
+            gif, filename = animation
+            embed.remove_field(1)  # The animation replaces the text wheel
+            embed.set_image(url=f"attachment://{filename}")
+            await message.edit(embed=embed, file=discord.File(io.BytesIO(gif), filename=filename))
+        await asyncio.sleep(WHEEL_SPIN_SECONDS)
+        return animation[1] if animation else None
 
 
 class PlayAgainView(discord.ui.View):
@@ -539,7 +461,7 @@ class PlayAgainView(discord.ui.View):
 
         # Check if user can afford the same bet
         db = Users()
-        user_data = db.fetch_user(interaction.user.id)
+        user_data = await db.fetch_user(interaction.user.id, BALANCE_PROJECTION)
         if not user_data:
             return await interaction.followup.send("Your account couldn't be found. Please try again later.", ephemeral=True)
 
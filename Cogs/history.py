@@ -1,32 +1,57 @@
 import discord
 from discord.ext import commands
-from Cogs.utils.mongo import Users
+from Cogs.utils.mongo import Users, Bets, history_projection
 from Cogs.utils.emojis import emoji
+import asyncio
 import datetime
 
+# Categories that live in the bets collection, the rest are in the user's history
+BET_CATEGORIES = ("win", "loss")
+
 class HistoryView(discord.ui.View):
     def __init__(self, bot, user, history_data, author_id, category="all", page=0):
         super().__init__(timeout=120)
         self.bot = bot
         self.user = user
-        self.history_data = history_data
+        self.history_data = history_data  # Deposits, withdrawals, tips... from the user document
+        self.bets = Bets()
         self.author_id = author_id
         self.category = category
         self.page = page
         self.per_page = 10
         self.max_pages = 0
+        self.page_items = []
         self.message = None
 
-        # Calculate the initial max pages
-        self._calculate_max_pages()
+    async def load_page(self):
+        """Load the current page and refresh the buttons
 
-        # Add the buttons to the view
-        self._update_buttons()
+        Bets are paged straight from the bets collection, "all" merges the
+        newest bets with the (small) embedded transaction history.
+        """
+        start = self.page * self.per_page
+        transactions = [] if self.category in BET_CATEGORIES else self._get_filtered_history(full=True)
+
+        if self.category in BET_CATEGORIES:
+            bets, bet_count = await asyncio.gather(
+                self.bets.fetch_user_bets(self.user.id, self.category, skip=start, limit=self.per_page),
+                self.bets.count_user_bets(self.user.id, self.category)
+            )
+            self.page_items = bets
+        elif self.category == "all":
+            bets, bet_count = await asyncio.gather(
+                self.bets.fetch_user_bets(self.user.id, limit=start + self.per_page),
+                self.bets.count_user_bets(self.user.id)
+            )
+            merged = sorted(bets + transactions, key=lambda x: x.get("timestamp", 0), reverse=True)
+            self.page_items = merged[start:start + self.per_page]
+        else:
+            bet_count = 0
+            self.page_items = transactions[start:start + self.per_page]
 
-    def _calculate_max_pages(self):
-        """Calculate the maximum number of pages for the current category"""
-        filtered = self._get_filtered_history(full=True)
-        self.max_pages = max(1, (len(filtered) + self.per_page - 1) // self.per_page)
+        total = bet_count + len(transactions)
+        self.max_pages = max(1, (total + self.per_page - 1) // self.per_page)
+        self._update_buttons()
 
     def _update_buttons(self):
         """Update all buttons in the view based on current state"""
@@ -67,8 +92,8 @@ class HistoryView(discord.ui.View):
         return filtered
 
     def create_embed(self):
-        """Create the history embed with the filtered data"""
-        filtered_data = self._get_filtered_history()
+        """Create the history embed with the loaded page"""
+        filtered_data = self.page_items
 
         # Prepare embed
         embed = discord.Embed(
@@ -170,11 +195,8 @@ class HistoryView(discord.ui.View):
             if self.page < self.max_pages - 1:
                 self.page += 1
 
-        # Recalculate max pages
-        self._calculate_max_pages()
-
-        # Update buttons
-        self._update_buttons()
+        # Load the page and update buttons
+        await self.load_page()
 
         # Update the message
         await interaction.response.edit_message(embed=self.create_embed(), view=self)
@@ -237,9 +259,9 @@ class History(commands.Cog):
             user = ctx.author
 
         db = Users()
-        user_data = db.fetch_user(user.id)
+        user_data = await db.fetch_user(user.id, history_projection())
 
-        if user_data == False:
+        if user_data is None:
             embed = discord.Embed(
                 title="<:no:1344252518305234987> | User Not Found",
                 description="This user doesn't have an account. Please wait for auto-registration or use `!signup`.",
@@ -252,6 +274,7 @@ class History(commands.Cog):
 
         # Create view with buttons
         view = HistoryView(self.bot, user, history_data, ctx.author.id)
+        await view.load_page()
 
         # Send initial embed
         embed = view.create_embed()
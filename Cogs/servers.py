@@ -4,7 +4,7 @@ import asyncio
 import time
 import random
 from discord.ext import commands
-from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.mongo import Users, Servers, BALANCE_PROJECTION
 from Cogs.utils.emojis import emoji
 
 class AirdropButton(discord.ui.Button):
@@ -23,12 +23,7 @@ class AirdropButton(discord.ui.Button):
         self.airdrop_data["participants"].append(interaction.user.id)
         
         # Register user if needed
-        db = Users()
-        if db.fetch_user(interaction.user.id) == False:
-            dump = {"discord_id": interaction.user.id, "tokens": 0, "credits": 0, "history": [], 
-                   "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, 
-                   "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost': 0}
-            db.register_new_user(dump)
+        await Users().ensure_user(interaction.user.id)
         
         # Update participant count on the embed
         embed = interaction.message.embeds[0]
@@ -165,7 +160,7 @@ class ServersCog(commands.Cog):
         """
         # Check if user is authorized (in admins.txt or server_admins)
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
         
         if not server_data:
             embed = discord.Embed(
@@ -213,7 +208,7 @@ class ServersCog(commands.Cog):
     async def serverbethistory(self, ctx):
         """View the server's bet history with pagination"""
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
         
         if not server_data:
             return await ctx.reply("This server hasn't been registered yet.")
@@ -259,7 +254,7 @@ class ServersCog(commands.Cog):
         
         # Get user data from database
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
+        user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
         
         if not user_data:
             embed = discord.Embed(
@@ -415,8 +410,7 @@ class ServersCog(commands.Cog):
         airdrop_amount = amount_value - service_fee
         
         # Deduct from user's balance
-        new_balance = user_balance - amount_value
-        db.update_balance(ctx.author.id, new_balance, db_field)
+        await db.update_balance(ctx.author.id, -amount_value, db_field, "$inc")
         
         # Create airdrop data
         airdrop_data = {
@@ -544,11 +538,9 @@ class ServersCog(commands.Cog):
             if participant_count == 0:
                 # No participants - refund the creator (minus fee)
                 db = Users()
-                creator_data = db.fetch_user(airdrop_data["author_id"])
+                creator_data = await db.fetch_user(airdrop_data["author_id"], BALANCE_PROJECTION)
                 if creator_data:
-                    current_balance = creator_data.get(airdrop_data["currency"], 0)
-                    new_balance = current_balance + airdrop_data["amount"]
-                    db.update_balance(airdrop_data["author_id"], new_balance, airdrop_data["currency"])
+                    await db.update_balance(airdrop_data["author_id"], airdrop_data["amount"], airdrop_data["currency"], "$inc")
                     
                     embed.description = f"No one joined the airdrop. The amount has been refunded to {airdrop_data['author_name']}."
                     
@@ -580,12 +572,10 @@ class ServersCog(commands.Cog):
                 participants_notified = 0
                 
                 for participant_id in participants:
-                    participant_data = db.fetch_user(participant_id)
+                    participant_data = await db.fetch_user(participant_id, BALANCE_PROJECTION)
                     if participant_data:
                         # Update participant balance
-                        current_balance = participant_data.get(airdrop_data["currency"], 0)
-                        new_balance = current_balance + share_amount
-                        db.update_balance(participant_id, new_balance, airdrop_data["currency"])
+                        await db.update_balance(participant_id, share_amount, airdrop_data["currency"], "$inc")
                         
                         # Add to history
                         history_entry = {
@@ -596,7 +586,7 @@ class ServersCog(commands.Cog):
                             "from_name": airdrop_data["author_name"],
                             "timestamp": int(time.time())
                         }
-                        db.collection.update_one(
+                        await db.collection.update_one(
                             {"discord_id": participant_id},
                             {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
                         )
@@ -669,7 +659,7 @@ import discord
 import os
 import time
 from discord.ext import commands
-from Cogs.utils.mongo import Servers, Users
+from Cogs.utils.mongo import Servers, Users, Bets, BALANCE_PROJECTION
 from Cogs.utils.emojis import emoji
 
 class ServerBetHistoryView(discord.ui.View):
@@ -677,25 +667,26 @@ class ServerBetHistoryView(discord.ui.View):
         super().__init__(timeout=120)
         self.bot = bot
         self.server_data = server_data
-        self.server_bet_history = server_data.get("server_bet_history", [])
+        self.bets = Bets()
         self.author_id = author_id
         self.category = category
         self.page = page
         self.per_page = 10
         self.max_pages = 0
+        self.page_items = []
         self.message = None
 
-        # Calculate the initial max pages
-        self._calculate_max_pages()
-
-        # Add the buttons to the view
+    async def load_page(self):
+        """Load the current page from the bets collection and refresh the buttons"""
+        bet_type = None if self.category == "all" else self.category
+        server_id = self.server_data["server_id"]
+        self.page_items, total = await asyncio.gather(
+            self.bets.fetch_server_bets(server_id, bet_type, skip=self.page * self.per_page, limit=self.per_page),
+            self.bets.count_server_bets(server_id, bet_type)
+        )
+        self.max_pages = max(1, (total + self.per_page - 1) // self.per_page)
         self._update_buttons()
 
-    def _calculate_max_pages(self):
-        """Calculate the maximum number of pages for the current category"""
-        filtered = self._get_filtered_history(full=True)
-        self.max_pages = max(1, (len(filtered) + self.per_page - 1) // self.per_page)
-
     def _update_buttons(self):
         """Update all buttons in the view based on current state"""
         self.clear_items()
@@ -709,32 +700,9 @@ class ServerBetHistoryView(discord.ui.View):
         self.add_item(discord.ui.Button(emoji="⬅️", style=discord.ButtonStyle.secondary, custom_id="prev", disabled=self.page == 0))
         self.add_item(discord.ui.Button(emoji="➡️", style=discord.ButtonStyle.secondary, custom_id="next", disabled=self.page >= self.max_pages - 1))
 
-    def _get_filtered_history(self, full=False):
-        """Get filtered history based on the selected category
-
-        Args:
-            full: If True, return all items in category, otherwise return just current page items
-        """
-        if self.category == "all":
-            filtered = self.server_bet_history
-        else:
-            filtered = [item for item in self.server_bet_history if item.get("type") == self.category]
-
-        # Sort by timestamp (most recent first)
-        filtered.sort(key=lambda x: x.get("timestamp", 0), reverse=True)
-
-        # Limit to items per page if not requesting full list
-        if not full:
-            # Get items for current page
-            start_idx = self.page * self.per_page
-            end_idx = min(start_idx + self.per_page, len(filtered))
-            return filtered[start_idx:end_idx]
-
-        return filtered
-
     def create_embed(self):
-        """Create the server bet history embed with the filtered data"""
-        filtered_data = self._get_filtered_history()
+        """Create the server bet history embed with the loaded page"""
+        filtered_data = self.page_items
         server_name = self.server_data.get("server_name", "Unknown Server")
 
         # Prepare embed
@@ -813,11 +781,8 @@ class ServerBetHistoryView(discord.ui.View):
             if self.page < self.max_pages - 1:
                 self.page += 1
 
-        # Recalculate max pages
-        self._calculate_max_pages()
-
-        # Update buttons
-        self._update_buttons()
+        # Load the page and update buttons
+        await self.load_page()
 
         # Update the message
         await interaction.response.edit_message(embed=self.create_embed(), view=self)
@@ -841,7 +806,7 @@ class ServersCog(commands.Cog):
     @commands.command(aliases=["ss"])
     async def serverstats(self, ctx):
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
 
         total_profit = server_data["total_profit"]
         server_admins = server_data["server_admins"]
@@ -895,7 +860,7 @@ class ServersCog(commands.Cog):
         
         # Get user data from database
         db = Users()
-        user_data = db.fetch_user(ctx.author.id)
+        user_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
         
         if not user_data:
             embed = discord.Embed(
@@ -1051,8 +1016,7 @@ class ServersCog(commands.Cog):
         airdrop_amount = amount_value - service_fee
         
         # Deduct from user's balance
-        new_balance = user_balance - amount_value
-        db.update_balance(ctx.author.id, new_balance, db_field)
+        await db.update_balance(ctx.author.id, -amount_value, db_field, "$inc")
         
         # Create airdrop data
         airdrop_data = {
@@ -1180,11 +1144,9 @@ class ServersCog(commands.Cog):
             if participant_count == 0:
                 # No participants - refund the creator (minus fee)
                 db = Users()
-                creator_data = db.fetch_user(airdrop_data["author_id"])
+                creator_data = await db.fetch_user(airdrop_data["author_id"], BALANCE_PROJECTION)
                 if creator_data:
-                    current_balance = creator_data.get(airdrop_data["currency"], 0)
-                    new_balance = current_balance + airdrop_data["amount"]
-                    db.update_balance(airdrop_data["author_id"], new_balance, airdrop_data["currency"])
+                    await db.update_balance(airdrop_data["author_id"], airdrop_data["amount"], airdrop_data["currency"], "$inc")
                     
                     embed.description = f"No one joined the airdrop. The amount has been refunded to {airdrop_data['author_name']}."
                     
@@ -1216,12 +1178,10 @@ class ServersCog(commands.Cog):
                 participants_notified = 0
                 
                 for participant_id in participants:
-                    participant_data = db.fetch_user(participant_id)
+                    participant_data = await db.fetch_user(participant_id, BALANCE_PROJECTION)
                     if participant_data:
                         # Update participant balance
-                        current_balance = participant_data.get(airdrop_data["currency"], 0)
-                        new_balance = current_balance + share_amount
-                        db.update_balance(participant_id, new_balance, airdrop_data["currency"])
+                        await db.update_balance(participant_id, share_amount, airdrop_data["currency"], "$inc")
                         
                         # Add to history
                         history_entry = {
@@ -1232,7 +1192,7 @@ class ServersCog(commands.Cog):
                             "from_name": airdrop_data["author_name"],
                             "timestamp": int(time.time())
                         }
-                        db.collection.update_one(
+                        await db.collection.update_one(
                             {"discord_id": participant_id},
                             {"$push": {"history": {"$each": [history_entry], "$slice": -100}}}
                         )
@@ -1309,9 +1269,9 @@ class ServersCog(commands.Cog):
         
         # Get server data
         db = Servers()
-        server_data = db.fetch_server(ctx.guild.id)
+        server_data = await db.fetch_server(ctx.guild.id)
 
-        if server_data == False:
+        if server_data is None:
             embed = discord.Embed(
                 title="<:no:1344252518305234987> | Server Not Found",
                 description="This server isn't registered in our database. Please contact an administrator.",
@@ -1322,6 +1282,7 @@ class ServersCog(commands.Cog):
 
         # Create view with buttons
         view = ServerBetHistoryView(self.bot, server_data, ctx.author.id)
+        await view.load_page()
 
         # Send initial embed
         embed = view.create_embed()
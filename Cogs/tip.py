@@ -2,7 +2,7 @@
 import discord
 import datetime
 from discord.ext import commands
-from Cogs.utils.mongo import Users
+from Cogs.utils.mongo import Users, BALANCE_PROJECTION
 from Cogs.utils.emojis import emoji
 
 
@@ -97,7 +97,7 @@ class Tip(commands.Cog):
         
         # Check if sender has an account
         db = Users()
-        sender_data = db.fetch_user(ctx.author.id)
+        sender_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION)
         if not sender_data:
             embed = discord.Embed(
                 title="<:no:1344252518305234987> | Account Required",
@@ -107,14 +107,9 @@ class Tip(commands.Cog):
             return await ctx.reply(embed=embed)
         
         # Check if recipient has an account
-        recipient_data = db.fetch_user(recipient.id)
-        if not recipient_data:
-            # Auto-register recipient
-            dump = {"discord_id": recipient.id, "tokens": 0, "credits": 0, "history": [], 
-                   "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, 
-                   "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost': 0}
-            db.register_new_user(dump)
-            recipient_data = db.fetch_user(recipient.id)
+        # Auto-register recipient
+        await db.ensure_user(recipient.id)
+        recipient_data = await db.fetch_user(recipient.id, BALANCE_PROJECTION)
         
         # Process token to credit conversion if needed
         if currency == "credits" and formatted_currency == "tokens":
@@ -133,12 +128,20 @@ class Tip(commands.Cog):
             return await ctx.reply(embed=embed)
         
         # Process the tip
-        # Deduct from sender
-        db.update_balance(ctx.author.id, sender_balance - amount, db_field, "$set")
+        # Deduct from sender, only if the balance still covers it
+        sender_new_balance = await db.debit_balance(ctx.author.id, amount, db_field)
+        if sender_new_balance is None:
+            sender_data = await db.fetch_user(ctx.author.id, BALANCE_PROJECTION) or {}
+            embed = discord.Embed(
+                title="<:no:1344252518305234987> | Insufficient Balance",
+                description=f"You don't have enough {formatted_currency}. Your balance: **{sender_data.get(db_field, 0):.2f} {formatted_currency}**",
+                color=0xFF0000
+            )
+            return await ctx.reply(embed=embed)
         
         # Add to recipient
         recipient_balance = recipient_data.get(db_field, 0)
-        db.update_balance(recipient.id, recipient_balance + amount, "tokens", "$set")
+        await db.update_balance(recipient.id, amount, "tokens", "$inc")
         
         # Record in history for both users
         timestamp = int(datetime.datetime.now().timestamp())
@@ -151,7 +154,7 @@ class Tip(commands.Cog):
             "recipient": recipient.id,
             "timestamp": timestamp
         }
-        db.collection.update_one(
+        await db.collection.update_one(
             {"discord_id": ctx.author.id},
             {"$push": {"history": {"$each": [sender_history], "$slice": -100}}}
         )
@@ -164,7 +167,7 @@ class Tip(commands.Cog):
             "sender": ctx.author.id,
             "timestamp": timestamp
         }
-        db.collection.update_one(
+        await db.collection.update_one(
             {"discord_id": recipient.id},
             {"$push": {"history": {"$each": [recipient_history], "$slice": -100}}}
         )
@@ -177,7 +180,7 @@ class Tip(commands.Cog):
         )
         embed.add_field(
             name="Your New Balance",
-            value=f"**{(sender_balance - amount):.2f} {formatted_currency}**",
+            value=f"**{sender_new_balance:.2f} {formatted_currency}**",
             inline=True
         )
         embed.add_field(
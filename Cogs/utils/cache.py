@@ -0,0 +1,210 @@
+import asyncio
+import copy
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from colorama import Fore
+from dotenv import load_dotenv
+load_dotenv()
+
+# Bounds for the user profile cache, all overridable from the environment
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 30))
+
+# Shared cache, one per process
+_user_cache = None
+
+
+class UserCache:
+    """Bounded LRU/TTL cache of user profiles keyed by discord_id
+
+    Only the small profile fields are cached (balances and stats, never the
+    history). The Users repository writes through on every mutation, so within
+    one process the cache always matches Mongo; the TTL bounds how stale an
+    entry can get when another process writes to the same user.
+
+    A read that overlaps a write of the same user may have seen the document
+    before that write, so its put is dropped: writes are wrapped in writing(),
+    which bumps the user's generation once they land, and readers hand put
+    the generation they took before reading.
+    """
+
+    def __init__(self, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # discord_id -> (expires_at, profile)
+        self.clock = 0
+        self.generations = OrderedDict()  # discord_id -> clock when last written, oldest first
+        self.writes = {}  # discord_id -> writes in flight
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_reads = 0
+
+    def get(self, user_id):
+        """Cached profile, or None on a miss"""
+        entry = self.entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[user_id]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def generation(self):
+        """Taken before reading a profile, then handed to put"""
+        return self.clock
+
+    def put(self, user_id, profile, generation=None):
+        """Store a freshly read profile, unless a write to the user overlapped the read"""
+        if generation is not None and (self.writes.get(user_id) or self.generations.get(user_id, 0) > generation):
+            self.stale_reads += 1
+            return
+        self.entries[user_id] = (time.monotonic() + self.ttl, copy.deepcopy(profile))
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def apply(self, user_id, update):
+        """Mirror a successful update document onto the cached profile"""
+        entry = self.entries.get(user_id)
+        if entry is None:
+            return
+        profile = entry[1]
+        for field, value in update.get("$inc", {}).items():
+            if field in profile:
+                profile[field] += value
+        for field, value in update.get("$set", {}).items():
+            if field in profile:
+                profile[field] = value
+        if set(update) - {"$inc", "$set", "$push"}:
+            # Anything we can't mirror exactly is dropped instead
+            self.invalidate(user_id)
+
+    @contextmanager
+    def writing(self, user_ids):
+        """Wrap a write to these users, a failed write drops them from the cache"""
+        for user_id in user_ids:
+            self.writes[user_id] = self.writes.get(user_id, 0) + 1
+        try:
+            yield
+        except Exception:
+            for user_id in user_ids:
+                self.invalidate(user_id)
+            raise
+        finally:
+            for user_id in user_ids:
+                self.writes[user_id] -= 1
+                if not self.writes[user_id]:
+                    del self.writes[user_id]
+                self._bump(user_id)
+
+    def _bump(self, user_id):
+        """Move a user to a new generation, keeping at most max_size generations"""
+        self.clock += 1
+        self.generations[user_id] = self.clock
+        self.generations.move_to_end(user_id)
+        while len(self.generations) > self.max_size:
+            self.generations.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drop a user, e.g. after a write from another process"""
+        self._bump(user_id)
+        if self.entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """Hit/miss metrics"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "stale_reads": self.stale_reads
+        }
+
+
+class KnownUsers:
+    """discord_ids known to be registered, so registration checks cost no query
+
+    Users are never deleted, so once an id is in here it stays correct.
+    """
+
+    def __init__(self):
+        self.ids = set()
+
+    def __contains__(self, user_id):
+        return user_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, user_id):
+        self.ids.add(user_id)
+
+    async def warm(self, collection):
+        """Load every registered id with a projection-only scan"""
+        async for doc in collection.find({}, {"_id": 0, "discord_id": 1}, batch_size=10000):
+            self.ids.add(doc["discord_id"])
+        return len(self.ids)
+
+
+# Shared set, one per process
+_known_users = None
+
+
+def get_known_users():
+    """Return the shared known users set, creating it on first use"""
+    global _known_users
+    if _known_users is None:
+        _known_users = KnownUsers()
+    return _known_users
+
+
+def get_user_cache():
+    """Return the shared user cache, creating it on first use"""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache()
+    return _user_cache
+
+
+async def watch_invalidations(collection, cache=None):
+    """Optional cross-process invalidation through a Mongo change stream
+
+    Drops a user from the cache whenever their document changes, including
+    writes made by this process, so it trades some hit rate for correctness
+    when more than one bot process shares the database. Needs a replica set.
+    """
+    cache = cache or get_user_cache()
+    pipeline = [
+        {"$match": {"operationType": {"$in": ["update", "replace", "delete"]}}},
+        {"$project": {"fullDocument.discord_id": 1, "documentKey": 1}}
+    ]
+    while True:
+        try:
+            async with collection.watch(pipeline, full_document="updateLookup") as stream:
+                async for change in stream:
+                    user_id = (change.get("fullDocument") or {}).get("discord_id")
+                    if user_id is None:
+                        # Deleted documents can't be mapped back, start over
+                        cache.clear()
+                    else:
+                        cache.invalidate(user_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"{Fore.RED}[-] {Fore.WHITE}User cache change stream failed, retrying: {e}")
+            cache.clear()
+            await asyncio.sleep(5)
@@ -0,0 +1,142 @@
+import io
+import os
+import threading
+import time
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+from dotenv import load_dotenv
+load_dotenv()
+
+# Renderer settings, all overridable from the environment
+CARD_FONT = os.environ.get("CARD_FONT", "roboto.ttf")
+
+# Deposit card layout
+CARD_SIZE = (500, 600)
+QR_SIZE = 280
+QR_Y = 120
+GRADIENT_COLOR = (240, 240, 255)
+
+# Shared renderer, one per process
+_card_renderer = None
+
+
+class RenderStats:
+    """Timing metrics for a renderer"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.renders = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.renders += 1
+            self.total_ms += elapsed
+            self.max_ms = max(self.max_ms, elapsed)
+            self.last_ms = elapsed
+
+    def stats(self):
+        return {
+            "renders": self.renders,
+            "avg_ms": self.total_ms / self.renders if self.renders else 0,
+            "max_ms": self.max_ms,
+            "last_ms": self.last_ms
+        }
+
+
+class DepositCardRenderer:
+    """Deposit QR cards drawn on a pre-built template
+
+    The gradient background, the static text and the watermark are painted
+    once; each card only pastes its QR code and draws the user's name and
+    amount on a copy. Cogs render cards through the render service.
+    """
+
+    def __init__(self, font_path=CARD_FONT):
+        self.font_path = font_path
+        self.template_lock = threading.Lock()
+        self.template = None
+        # FreeType faces aren't safe to share between threads, so each worker loads its own
+        self.local = threading.local()
+        self.metrics = RenderStats()
+
+    def _fonts(self):
+        fonts = getattr(self.local, "fonts", None)
+        if fonts is None:
+            fonts = {
+                "title": ImageFont.truetype(self.font_path, 36),
+                "detail": ImageFont.truetype(self.font_path, 24),
+                "watermark": ImageFont.truetype(self.font_path, 60)
+            }
+            self.local.fonts = fonts
+        return fonts
+
+    def _template(self):
+        """Background with everything that's the same on every card"""
+        if self.template is None:
+            with self.template_lock:
+                if self.template is None:
+                    self.template = self._build_template()
+        return self.template
+
+    def _build_template(self):
+        width, height = CARD_SIZE
+        # Vertical gradient from one column of alpha values, fading out downwards
+        alpha = Image.new("L", (1, height))
+        alpha.putdata([int(255 * (1 - y / height)) for y in range(height)])
+        gradient = Image.new("RGBA", CARD_SIZE, GRADIENT_COLOR)
+        gradient.putalpha(alpha.resize(CARD_SIZE, Image.Resampling.NEAREST))
+        background = Image.alpha_composite(Image.new("RGBA", CARD_SIZE, "white"), gradient)
+
+        fonts = self._fonts()
+        draw = ImageDraw.Draw(background)
+        draw.text((250, QR_Y + QR_SIZE + 50), "Scan to get address", font=fonts["detail"], anchor="mm", fill="black")
+
+        # Semi-transparent watermark
+        watermark = "BETSYNC"
+        watermark_bbox = draw.textbbox((0, 0), watermark, font=fonts["watermark"])
+        watermark_x = (width - (watermark_bbox[2] - watermark_bbox[0])) // 2
+        draw.text((watermark_x, 520), watermark, font=fonts["watermark"], fill=(0, 0, 0, 64))
+        return background
+
+    def render(self, user_name, amount, currency, address):
+        """PNG bytes of a deposit card, blocking"""
+        started = time.perf_counter()
+        qr = qrcode.QRCode(
+            version=1,
+            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            box_size=8,
+            border=1
+        )
+        qr.add_data(f"Amount: {amount:.6f} {currency}\nAddress: {address}")
+        qr.make(fit=True)
+        # One bit image, so nearest neighbour is what any resample filter would give
+        qr_img = qr.make_image(fill_color="black", back_color="white").get_image()
+        qr_img = qr_img.resize((QR_SIZE, QR_SIZE), Image.Resampling.NEAREST)
+
+        card = self._template().copy()
+        card.paste(qr_img, ((CARD_SIZE[0] - QR_SIZE) // 2, QR_Y))
+        fonts = self._fonts()
+        draw = ImageDraw.Draw(card)
+        draw.text((250, 50), f"{user_name}'s Deposit QR", font=fonts["title"], anchor="mm", fill="black")
+        draw.text((250, QR_Y + QR_SIZE + 20), f"Amount: {amount:.6f} {currency}", font=fonts["detail"], anchor="mm", fill="black")
+
+        img_buf = io.BytesIO()
+        card.save(img_buf, format="PNG", compress_level=1)
+        img_buf.seek(0)
+        self.metrics.record(started)
+        return img_buf
+
+    def stats(self):
+        return self.metrics.stats()
+
+
+def get_card_renderer():
+    """Return the shared deposit card renderer, creating it on first use"""
+    global _card_renderer
+    if _card_renderer is None:
+        _card_renderer = DepositCardRenderer()
+    return _card_renderer
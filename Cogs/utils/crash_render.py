@@ -0,0 +1,536 @@
+import io
+import math
+import os
+import random
+import time
+from functools import lru_cache
+import matplotlib
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from Cogs.utils.cards import RenderStats
+from dotenv import load_dotenv
+load_dotenv()
+
+# "fast" draws frames with PIL, "legacy" builds a matplotlib figure per frame
+CRASH_RENDERER = os.environ.get("CRASH_RENDERER", "fast")
+# JPEG encodes several times faster than PNG and the frames have no transparency
+CRASH_FRAME_FORMAT = os.environ.get("CRASH_FRAME_FORMAT", "JPEG").upper()
+CRASH_FONT = os.environ.get("CRASH_FONT", os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans-Bold.ttf"))
+
+# Frame layout, matching what the matplotlib figure came out as at 120dpi
+FRAME_SIZE = (954, 578)
+PLOT_BOX = (12, 12, 942, 566)  # left, top, right, bottom of the axes
+PT = 120 / 72  # Pixels per point
+SUPERSAMPLE = 2  # Curves and markers are drawn larger and scaled down for antialiasing
+CURVE_POINTS = 300
+
+BG_COLOR = (30, 31, 34)
+WHITE = (255, 255, 255)
+HIGHLIGHT_MULTIPLIERS = [2, 5, 10, 15]
+
+# Curve colours by multiplier while the game runs
+LIVE_COLORS = [(1.5, (0, 255, 174)), (3, (255, 221, 0)), (7, (255, 136, 0)), (math.inf, (255, 68, 0))]
+
+# Shared renderer, one per process
+_crash_renderer = None
+
+
+def _alpha(*alphas):
+    """Combined opacity of stacked translucent layers"""
+    remaining = 1.0
+    for alpha in alphas:
+        remaining *= 1 - alpha
+    return 1 - remaining
+
+
+def _star(cx, cy, radius, points=5, inner=0.382):
+    """Polygon for a star marker"""
+    vertices = []
+    for i in range(points * 2):
+        r = radius if i % 2 == 0 else radius * inner
+        angle = math.pi / points * i - math.pi / 2
+        vertices.append((cx + r * math.cos(angle), cy + r * math.sin(angle)))
+    return vertices
+
+
+def _diamond(cx, cy, radius):
+    return [(cx, cy - radius), (cx + radius, cy), (cx, cy + radius), (cx - radius, cy)]
+
+
+class CrashRenderer:
+    """Crash frames drawn straight onto a cached background
+
+    The background (colour, gradient and watermark) only depends on a couple
+    of quantised values, so it's cached. The curve is evaluated with numpy on
+    a precomputed parameter grid and each translucent layer (glows, curve,
+    points, markers) is drawn into a supersampled mask and pasted once, so a
+    frame is a handful of Pillow calls instead of a matplotlib figure.
+    """
+
+    def __init__(self, font_path=CRASH_FONT):
+        self.font_path = font_path
+        self.t = np.linspace(0, 1, CURVE_POINTS)
+        self.fonts = {
+            "multiplier": ImageFont.truetype(font_path, round(22 * PT)),
+            "label": ImageFont.truetype(font_path, round(14 * PT)),
+            "watermark": ImageFont.truetype(font_path, round(14 * PT)),
+            "highlight": ImageFont.truetype(font_path, round(8 * PT))
+        }
+        self.metrics = RenderStats()
+
+    @lru_cache(maxsize=64)
+    def _background(self, gradient_right, gradient_top, gradient_alpha):
+        """Background colour, viridis gradient and watermark"""
+        from matplotlib import colormaps
+
+        img = Image.new("RGB", FRAME_SIZE, BG_COLOR)
+        left, _, _, bottom = PLOT_BOX
+        height = bottom - gradient_top
+        if gradient_right > left and height > 0:
+            colors = colormaps["viridis"](np.linspace(0, 1, height))[:, :3] * 255
+            column = np.asarray(BG_COLOR) * (1 - gradient_alpha) + colors * gradient_alpha
+            column = Image.fromarray(column.round().astype(np.uint8).reshape(height, 1, 3))
+            img.paste(column.resize((gradient_right - left, height)), (left, gradient_top))
+
+        plot_left, plot_top, plot_right, plot_bottom = PLOT_BOX
+        self._text(
+            img, ((plot_left + plot_right) / 2, plot_bottom - 0.03 * (plot_bottom - plot_top)),
+            "BetSync Casino", self.fonts["watermark"], WHITE, 0.3, "ms"
+        )
+        return img
+
+    def _mapper(self, limit):
+        """Data to pixel coordinates, in supersampled pixels"""
+        left, top, right, bottom = PLOT_BOX
+        sx = (right - left) / limit * SUPERSAMPLE
+        sy = (bottom - top) / limit * SUPERSAMPLE
+
+        def to_px(x, y):
+            return left * SUPERSAMPLE + np.asarray(x) * sx, bottom * SUPERSAMPLE - np.asarray(y) * sy
+        return to_px
+
+    def curve(self, current_multiplier):
+        """Curve points in data coordinates, same shape as the matplotlib version"""
+        x = self.t * current_multiplier
+        if current_multiplier <= 1.5:
+            y = np.exp(x) - 1
+        else:
+            y = np.power(1.5, x) - 0.5
+        return x, y * (current_multiplier / y[-1])
+
+    def _paste(self, img, mask, color):
+        """Paste a colour through a supersampled mask, only where the mask is set"""
+        box = mask.getbbox()
+        if box is None:
+            return
+        # Snap to whole output pixels so the reduced mask lines up
+        box = (
+            box[0] // SUPERSAMPLE * SUPERSAMPLE,
+            box[1] // SUPERSAMPLE * SUPERSAMPLE,
+            -(-box[2] // SUPERSAMPLE) * SUPERSAMPLE,
+            -(-box[3] // SUPERSAMPLE) * SUPERSAMPLE
+        )
+        region = mask.crop(box).reduce(SUPERSAMPLE)
+        img.paste(Image.new("RGB", region.size, color), (box[0] // SUPERSAMPLE, box[1] // SUPERSAMPLE), region)
+
+    def _text(self, img, xy, text, font, color, opacity, anchor):
+        """Translucent text, drawn through a mask since RGB images can't blend it"""
+        box = ImageDraw.Draw(img).textbbox(xy, text, font=font, anchor=anchor)
+        box = (int(box[0]), int(box[1]), int(math.ceil(box[2])), int(math.ceil(box[3])))
+        mask = Image.new("L", (box[2] - box[0], box[3] - box[1]))
+        ImageDraw.Draw(mask).text((xy[0] - box[0], xy[1] - box[1]), text, font=font, fill=round(opacity * 255), anchor=anchor)
+        img.paste(Image.new("RGB", mask.size, color), box[:2], mask)
+
+    def _new_mask(self):
+        return Image.new("L", (FRAME_SIZE[0] * SUPERSAMPLE, FRAME_SIZE[1] * SUPERSAMPLE))
+
+    def _stroke_bands(self, img, points, color, bands):
+        """Concentric strokes of one colour, widest first, [(width_pt, opacity)]"""
+        mask = self._new_mask()
+        draw = ImageDraw.Draw(mask)
+        for width, opacity in bands:
+            draw.line(points, fill=round(opacity * 255), width=max(1, round(width * PT * SUPERSAMPLE)))
+        self._paste(img, mask, color)
+
+    def render(self, current_multiplier, crashed=False, cash_out=False):
+        """Image bytes of one frame, blocking"""
+        started = time.perf_counter()
+        m = current_multiplier
+        limit = max(2, m * 1.15)
+        to_px = self._mapper(limit)
+        left, top, right, bottom = PLOT_BOX
+
+        # Gradient covers [0, 1.1m] of the axes, its opacity grows with the multiplier
+        if crashed or cash_out:
+            gradient_alpha = 0.15
+        else:
+            gradient_alpha = round(0.12 + min(0.03, m * 0.005), 3)
+        extent = max(2, m * 1.1) / limit
+        img = self._background(
+            round(left + extent * (right - left)),
+            round(bottom - extent * (bottom - top)),
+            gradient_alpha
+        ).copy()
+        draw = ImageDraw.Draw(img, "RGBA")
+
+        # Highlight lines at the milestones reached so far
+        for level in HIGHLIGHT_MULTIPLIERS:
+            if level <= m * 1.1:
+                _, y = to_px(0, level)
+                y = float(y) / SUPERSAMPLE
+                draw.line([(left, y), (right, y)], fill=(*WHITE, 51), width=1)
+                self._text(img, (left + 0.05 / limit * (right - left), y - 2), f"{level}x", self.fonts["highlight"], WHITE, 0.5, "ld")
+
+        if crashed:
+            line_color, glow_color, line_width = (255, 85, 85), (255, 0, 0), 4
+        elif cash_out:
+            line_color, glow_color, line_width = (85, 255, 85), (0, 255, 0), 4
+        else:
+            line_color = next(color for bound, color in LIVE_COLORS if m < bound)
+            glow_color, line_width = line_color, 3.5
+
+        x, y = self.curve(m)
+        px, py = to_px(x, y)
+        points = list(zip(px.tolist(), py.tolist()))
+
+        # Soft white glow, then the coloured glow and the line itself
+        self._stroke_bands(img, points, WHITE, [(10, 0.01), (8, _alpha(0.01, 0.03)), (6, _alpha(0.01, 0.03, 0.05))])
+        glow = [(line_width + 2, 0.05), (line_width + 1, _alpha(0.05, 0.1)), (line_width, _alpha(0.05, 0.1, 0.2))]
+        if glow_color == line_color:
+            self._stroke_bands(img, points, glow_color, glow[:-1] + [(line_width, 1)])
+        else:
+            self._stroke_bands(img, points, glow_color, glow)
+            self._stroke_bands(img, points, line_color, [(line_width, 1)])
+
+        # Points along the curve while it's still climbing
+        if not crashed and not cash_out and m > 1.2:
+            n_points = min(int(m * 4), 40)
+            indices = np.linspace(0, len(x) - 1, n_points, dtype=int)
+            sizes = 15 + 10 * np.sin(np.linspace(0, 2 * np.pi, n_points))
+            glow = _alpha(0.1, 0.05, 0.02)
+            mask = self._new_mask()
+            dots = ImageDraw.Draw(mask)
+            for index, size in zip(indices, sizes):
+                cx, cy = points[index]
+                for area, opacity in [(40, 0.02), (30, _alpha(0.02, 0.05)), (20, glow)]:
+                    r = math.sqrt(area) / 2 * PT * SUPERSAMPLE
+                    dots.ellipse([cx - r, cy - r, cx + r, cy + r], fill=round(opacity * 255))
+                r = math.sqrt(max(size, 0)) / 2 * PT * SUPERSAMPLE
+                dots.ellipse([cx - r, cy - r, cx + r, cy + r], fill=round(_alpha(glow, 0.7) * 255))
+            self._paste(img, mask, WHITE)
+
+        cx, cy = points[-1]
+        if crashed:
+            # Explosion star with its glow and lines radiating out of it
+            mask = self._new_mask()
+            marker = ImageDraw.Draw(mask)
+            opacity = 0
+            for i, alpha in enumerate([0.05, 0.1, 0.15, 0.2, 0.3]):
+                opacity = _alpha(opacity, alpha)
+                marker.polygon(_star(cx, cy, math.sqrt(400 - i * 50) / 2 * PT * SUPERSAMPLE), fill=round(opacity * 255))
+            self._paste(img, mask, (139, 0, 0))
+
+            mask = self._new_mask()
+            marker = ImageDraw.Draw(mask)
+            for i in range(12):
+                angle = 2 * np.pi * i / 12
+                length = 0.3 + 0.1 * random.random()
+                ex, ey = to_px(m + length * math.cos(angle), m + length * math.sin(angle))
+                marker.line([(cx, cy), (float(ex), float(ey))], fill=153, width=round(1.5 * PT * SUPERSAMPLE))
+            marker.polygon(_star(cx, cy, math.sqrt(150) / 2 * PT * SUPERSAMPLE), fill=255)
+            self._paste(img, mask, (255, 0, 0))
+            self._label(img, cx, cy, f"CRASHED AT {m:.2f}x", (255, 0, 0), (139, 0, 0), limit)
+
+        elif cash_out:
+            # Diamond with its glow and a shine across it
+            mask = self._new_mask()
+            marker = ImageDraw.Draw(mask)
+            opacity = 0
+            for i, alpha in enumerate([0.05, 0.1, 0.15, 0.2, 0.3]):
+                opacity = _alpha(opacity, alpha)
+                marker.polygon(_diamond(cx, cy, math.sqrt(300 - i * 30) * 0.7 * PT * SUPERSAMPLE), fill=round(opacity * 255))
+            self._paste(img, mask, (0, 100, 0))
+
+            mask = self._new_mask()
+            ImageDraw.Draw(mask).polygon(_diamond(cx, cy, math.sqrt(130) * 0.7 * PT * SUPERSAMPLE), fill=255)
+            self._paste(img, mask, (0, 255, 0))
+            (sx, ex), (sy, ey) = to_px([m - 0.1, m + 0.1], [m + 0.1, m - 0.1])
+            mask = self._new_mask()
+            ImageDraw.Draw(mask).line([(sx, sy), (ex, ey)], fill=204, width=round(1.5 * PT * SUPERSAMPLE))
+            self._paste(img, mask, WHITE)
+            self._label(img, cx, cy, f"CASHED OUT AT {m:.2f}x", (0, 128, 0), (0, 100, 0), limit)
+
+        else:
+            # Live multiplier in the top right corner
+            self._boxed_text(
+                img, left + 0.95 * (right - left), top + 0.05 * (bottom - top), f"{m:.2f}x",
+                self.fonts["multiplier"], 22, line_color, WHITE, "ra"
+            )
+
+        buf = io.BytesIO()
+        if CRASH_FRAME_FORMAT == "PNG":
+            img.save(buf, format="PNG", compress_level=1)
+        else:
+            img.save(buf, format="JPEG", quality=90, subsampling=0)
+        buf.seek(0)
+        self.metrics.record(started)
+        return buf
+
+    def _label(self, img, cx, cy, text, fill, outline, limit):
+        """Result label above the end of the curve"""
+        _, top, _, bottom = PLOT_BOX
+        y = cy / SUPERSAMPLE - 0.3 / limit * (bottom - top)
+        self._boxed_text(img, cx / SUPERSAMPLE, y, text, self.fonts["label"], 14, fill, outline, "rd")
+
+    def _boxed_text(self, img, x, y, text, font, size, fill, outline, anchor):
+        """Right aligned text in a rounded box, like matplotlib's round bbox
+
+        The anchor is "ra" to hang the text from y or "rd" to stand it on y,
+        and the box is moved back inside the frame if it would overflow.
+        """
+        ascent, descent = font.getmetrics()
+        pad = 0.3 * size * PT
+        top = y if anchor == "ra" else y - ascent - descent
+        box = [x - font.getlength(text) - pad, top - pad, x + pad, top + ascent + descent + pad]
+        dx = max(0, -box[0]) - max(0, box[2] - FRAME_SIZE[0] + 1)
+        dy = max(0, -box[1]) - max(0, box[3] - FRAME_SIZE[1] + 1)
+        box = [box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy]
+
+        draw = ImageDraw.Draw(img, "RGBA")
+        draw.rounded_rectangle(box, radius=pad, fill=(*fill, 204), outline=outline, width=max(1, round(PT)))
+        draw.text((x + dx, y + dy), text, font=font, fill=WHITE, anchor=anchor)
+
+    @property
+    def filename(self):
+        return "crash_graph.png" if CRASH_FRAME_FORMAT == "PNG" else "crash_graph.jpg"
+
+    def stats(self):
+        return self.metrics.stats()
+
+
+def render_legacy(current_multiplier, crashed=False, cash_out=False):
+    """The original matplotlib frame, kept for comparison and as a fallback"""
+    import matplotlib.pyplot as plt
+
+    # Clear and close previous plots to prevent memory issues
+    plt.close('all')
+    fig = plt.figure(figsize=(10, 6), dpi=100)
+
+    # Set background color with a darker theme
+    bg_color = '#1E1F22'
+    plt.gca().set_facecolor(bg_color)
+    plt.gcf().set_facecolor(bg_color)
+
+    # Generate x and y coordinates with more points for smoother curve
+    x = np.linspace(0, current_multiplier, 300)  # Increased for smoother curve
+
+    # Create a more dynamic curve that starts slower and grows faster
+    if current_multiplier <= 1.5:
+        # For small multipliers, use simple exponential
+        y = np.exp(x) - 1
+    else:
+        # For larger multipliers, use a combination for more dramatic curve
+        y = np.power(1.5, x) - 0.5
+
+    # Scale y values to match the current multiplier
+    y = y * (current_multiplier / y[-1])
+
+    # Use the existing figure and set its properties
+    fig.set_facecolor(bg_color)
+    ax = plt.gca()
+    ax.set_facecolor(bg_color)
+
+    # Gradient opacity changes based on multiplier and state
+    if crashed or cash_out:
+        gradient_alpha = 0.15
+    else:
+        gradient_alpha = 0.12 + min(0.03, current_multiplier * 0.005)  # Increases with multiplier
+
+    # Apply gradient background
+    gradient = np.linspace(0, 1, 100).reshape(-1, 1)
+    plt.imshow(gradient, extent=[0, max(2, current_multiplier * 1.1), 0, max(2, current_multiplier * 1.1)],
+               aspect='auto', cmap='viridis', alpha=gradient_alpha)
+
+    # Add subtle glowing effect
+    for i, alpha in zip(range(3), [0.05, 0.03, 0.01]):
+        plt.plot(x, y, color='white', linewidth=6+i*2, alpha=alpha, zorder=1)
+
+    # Determine line color and style based on game state
+    if crashed:
+        line_color = '#FF5555'  # Bright red for crash
+        line_style = '-'
+        line_width = 4
+        glow_color = '#FF0000'
+    elif cash_out:
+        line_color = '#55FF55'  # Bright green for cashout
+        line_style = '-'
+        line_width = 4
+        glow_color = '#00FF00'
+    else:
+        # Create a gradient line color based on multiplier
+        if current_multiplier < 1.5:
+            line_color = '#00FFAE'  # Teal/cyan color
+            glow_color = '#00FFAE'
+        elif current_multiplier < 3:
+            line_color = '#FFDD00'  # Yellow
+            glow_color = '#FFDD00'
+        elif current_multiplier < 7:
+            line_color = '#FF8800'  # Orange
+            glow_color = '#FF8800'
+        else:
+            line_color = '#FF4400'  # Deep orange/red
+            glow_color = '#FF4400'
+        line_style = '-'
+        line_width = 3.5
+
+    # Add subtle line glow effect
+    for i, alpha in zip(range(3), [0.2, 0.1, 0.05]):
+        plt.plot(x, y, color=glow_color, linewidth=line_width+i, alpha=alpha, zorder=3)
+
+    # Plot the main line
+    plt.plot(x, y, color=line_color, linewidth=line_width, linestyle=line_style, zorder=4)
+
+    # Add points along the curve for visual effect
+    if not crashed and not cash_out and current_multiplier > 1.2:
+        # More points for higher multipliers
+        n_points = min(int(current_multiplier * 4), 40)
+        point_indices = np.linspace(0, len(x)-1, n_points, dtype=int)
+
+        # Add glow to points
+        for i, alpha in zip(range(3), [0.1, 0.05, 0.02]):
+            plt.scatter(x[point_indices], y[point_indices], color='white', s=20+i*10, alpha=alpha, zorder=4)
+
+        # Main points with pulsating sizes based on index
+        sizes = 15 + 10 * np.sin(np.linspace(0, 2*np.pi, len(point_indices)))
+        plt.scatter(x[point_indices], y[point_indices], color='white', s=sizes, alpha=0.7, zorder=5)
+
+    # Add special markers and text for crash or cash out points
+    if crashed:
+        # Create explosion effect for crash
+        for i, alpha in zip(range(5), [0.05, 0.1, 0.15, 0.2, 0.3]):
+            plt.scatter([current_multiplier], [current_multiplier], color='darkred',
+                        s=400-i*50, marker='*', alpha=alpha, zorder=5+i)
+
+        # Main explosion
+        plt.scatter([current_multiplier], [current_multiplier], color='red', s=150, marker='*', zorder=10)
+
+        # Add "boom" lines radiating from crash point
+        n_lines = 12
+        for i in range(n_lines):
+            angle = 2 * np.pi * i / n_lines
+            length = 0.3 + 0.1 * np.random.random()
+            dx, dy = length * np.cos(angle), length * np.sin(angle)
+            plt.plot([current_multiplier, current_multiplier+dx],
+                     [current_multiplier, current_multiplier+dy],
+                     color='red', alpha=0.6, linewidth=1.5, zorder=9)
+
+        # Add crash text without shadow effect
+        plt.text(current_multiplier, current_multiplier + 0.3, f"CRASHED AT {current_multiplier:.2f}x",
+                 color='white', fontweight='bold', fontsize=14, ha='right', va='bottom',
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor='red', alpha=0.8, edgecolor='darkred'))
+
+    elif cash_out:
+        # Add diamond symbol for cash out with glowing effect
+        for i, alpha in zip(range(5), [0.05, 0.1, 0.15, 0.2, 0.3]):
+            plt.scatter([current_multiplier], [current_multiplier], color='darkgreen',
+                        s=300-i*30, marker='D', alpha=alpha, zorder=5+i)
+
+        # Main diamond
+        plt.scatter([current_multiplier], [current_multiplier], color='lime', s=130, marker='D', zorder=10)
+
+        # Add shine effect on diamond
+        plt.plot([current_multiplier-0.1, current_multiplier+0.1],
+                 [current_multiplier+0.1, current_multiplier-0.1],
+                 color='white', alpha=0.8, linewidth=1.5, zorder=11)
+
+        # Add cash out text without shadow effect
+        plt.text(current_multiplier, current_multiplier + 0.3, f"CASHED OUT AT {current_multiplier:.2f}x",
+                 color='white', fontweight='bold', fontsize=14, ha='right', va='bottom',
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor='green', alpha=0.8, edgecolor='darkgreen'))
+
+    # Add current multiplier display
+    # Create a more prominent display in top-right corner
+    if not crashed and not cash_out:
+        # Add glowing effect around the multiplier text
+        for i, alpha in zip(range(3), [0.1, 0.07, 0.04]):
+            plt.text(0.95, 0.95, f"{current_multiplier:.2f}x",
+                     transform=plt.gca().transAxes, color='white', fontsize=22+i, fontweight='bold',
+                     ha='right', va='top', alpha=alpha)
+
+        # Main multiplier text
+        plt.text(0.95, 0.95, f"{current_multiplier:.2f}x",
+                 transform=plt.gca().transAxes, color='white', fontsize=22, fontweight='bold',
+                 ha='right', va='top',
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor=line_color, alpha=0.8, edgecolor='white', linewidth=1))
+
+    # Set axes properties with improved grid
+    plt.grid(True, linestyle='--', alpha=0.15, color='white')
+
+    # Add grid highlights at important multiplier levels
+    highlight_multipliers = [2, 5, 10, 15]
+    for m in highlight_multipliers:
+        if m <= current_multiplier * 1.1:
+            plt.axhline(y=m, color='white', alpha=0.2, linestyle='-', linewidth=0.8)
+            plt.text(0.05, m, f"{m}x", color='white', alpha=0.5, fontsize=8, va='bottom')
+
+    # Set limits with more headroom for visual effect
+    plt.xlim(0, max(2, current_multiplier * 1.15))
+    plt.ylim(0, max(2, current_multiplier * 1.15))
+
+    # Remove axis numbers, keep only the graph
+    plt.xticks([])
+    plt.yticks([])
+
+    # Remove spines (borders)
+    for spine in plt.gca().spines.values():
+        spine.set_visible(False)
+
+    # Add BetSync watermark
+    plt.text(0.5, 0.03, "BetSync Casino", transform=plt.gca().transAxes,
+             color='white', alpha=0.3, fontsize=14, fontweight='bold', ha='center')
+
+    # Save plot to bytes buffer with higher quality
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png', dpi=120, bbox_inches='tight', transparent=False)
+    buf.seek(0)
+    return buf
+
+
+def get_crash_renderer():
+    """Return the shared crash renderer, creating it on first use"""
+    global _crash_renderer
+    if _crash_renderer is None:
+        _crash_renderer = CrashRenderer()
+    return _crash_renderer
+
+
+def render_crash_graph(current_multiplier, crashed=False, cash_out=False):
+    """(image bytes, filename) of a crash frame with the configured renderer"""
+    if CRASH_RENDERER == "legacy":
+        return render_legacy(current_multiplier, crashed, cash_out), "crash_graph.png"
+    renderer = get_crash_renderer()
+    return renderer.render(current_multiplier, crashed, cash_out), renderer.filename
+
+
+def benchmark(frames=50):
+    """Time both renderers over the frames of a typical game"""
+    multipliers = [1 + 0.05 * i for i in range(frames)]
+    renderer = get_crash_renderer()
+    renderer.render(1.0)  # Warm the background cache and fonts
+
+    results = {}
+    for name, render in [("legacy", render_legacy), ("fast", renderer.render)]:
+        started = time.perf_counter()
+        for m in multipliers:
+            render(m)
+        render(multipliers[-1], crashed=True)
+        render(multipliers[-1], cash_out=True)
+        results[name] = (time.perf_counter() - started) * 1000 / (len(multipliers) + 2)
+    return results
+
+
+if __name__ == "__main__":
+    results = benchmark()
+    for name, ms in results.items():
+        print(f"{name:>6}: {ms:7.2f}ms per frame")
+    print(f"speedup: {results['legacy'] / results['fast']:.1f}x")
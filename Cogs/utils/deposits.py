@@ -0,0 +1,149 @@
+import asyncio
+import heapq
+import os
+import time
+from colorama import Fore
+from Cogs.utils.mongo import get_database
+from dotenv import load_dotenv
+load_dotenv()
+
+# Polling settings, all overridable from the environment
+WATCH_BATCH = int(os.environ.get("DEPOSIT_WATCH_BATCH", 50))
+WATCH_CONCURRENCY = int(os.environ.get("DEPOSIT_WATCH_CONCURRENCY", 10))
+WATCH_MIN_INTERVAL = float(os.environ.get("DEPOSIT_WATCH_MIN_INTERVAL", 5))
+WATCH_MAX_INTERVAL = float(os.environ.get("DEPOSIT_WATCH_MAX_INTERVAL", 60))
+WATCH_BACKOFF = float(os.environ.get("DEPOSIT_WATCH_BACKOFF", 1.5))
+
+
+class DepositWatcher:
+    """Single poller for every pending deposit
+
+    Orders sit in a heap keyed by their next check. Due orders are polled in
+    batches with bounded concurrency, often right after creation and less and
+    less as they age. Pending orders live in the pending_deposits collection
+    (keyed by order id), so a restart picks up where it left off.
+
+    check(order_id) returns {"received": bool, "amount": float}; the callbacks
+    get the order document (and the received amount for complete/partial).
+    An order is only deleted once its callback returns, so callbacks must be
+    idempotent on the order id. Orders whose callback raises are kept, marked
+    failed, and no longer polled.
+    """
+
+    def __init__(self, check, on_complete, on_partial, on_expire):
+        self.collection = get_database()["pending_deposits"]
+        self.check = check
+        self.on_complete = on_complete
+        self.on_partial = on_partial
+        self.on_expire = on_expire
+        self.orders = {}  # order_id -> order
+        self.by_user = {}  # user_id -> order
+        self.queue = []  # (next_check, order_id)
+        self.wakeup = asyncio.Event()
+        self.semaphore = asyncio.Semaphore(WATCH_CONCURRENCY)
+
+    def _track(self, order, next_check):
+        self.orders[order["_id"]] = order
+        self.by_user[order["user_id"]] = order
+        heapq.heappush(self.queue, (next_check, order["_id"]))
+
+    def _untrack(self, order):
+        self.orders.pop(order["_id"], None)
+        if self.by_user.get(order["user_id"]) is order:
+            del self.by_user[order["user_id"]]
+
+    def is_pending(self, user_id):
+        return user_id in self.by_user
+
+    async def add(self, order_id, user_id, timeout, **details):
+        """Start watching a new order"""
+        now = time.time()
+        order = {
+            "_id": order_id,
+            "user_id": user_id,
+            "created_at": now,
+            "expires_at": now + timeout,
+            "checks": 0,
+            "notified_amount": None,
+            **details
+        }
+        await self.collection.insert_one(order)
+        self._track(order, now + WATCH_MIN_INTERVAL)
+        self.wakeup.set()
+        return order
+
+    async def cancel(self, user_id):
+        """Stop watching a user's pending order, returns False if there was none"""
+        order = self.by_user.get(user_id)
+        if order is None:
+            return False
+        self._untrack(order)
+        await self.collection.delete_one({"_id": order["_id"]})
+        return True
+
+    async def resume(self):
+        """Reload the orders that were pending when the bot stopped"""
+        now = time.time()
+        async for order in self.collection.find({"status": {"$ne": "failed"}}):
+            self._track(order, now)
+        if self.orders:
+            print(f"{Fore.GREEN}[+] {Fore.WHITE}Resumed tracking {Fore.GREEN}{len(self.orders)}{Fore.WHITE} pending deposits")
+
+    async def run(self):
+        """Poll due orders forever"""
+        await self.resume()
+        while True:
+            self.wakeup.clear()
+            now = time.time()
+            if not self.queue or self.queue[0][0] > now:
+                delay = self.queue[0][0] - now if self.queue else None
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = []
+            while self.queue and self.queue[0][0] <= now and len(due) < WATCH_BATCH:
+                _, order_id = heapq.heappop(self.queue)
+                # Cancelled or finished orders leave a stale heap entry behind
+                if order_id in self.orders:
+                    due.append(self.orders[order_id])
+            await asyncio.gather(*(self._poll(order) for order in due))
+
+    async def _poll(self, order):
+        try:
+            async with self.semaphore:
+                status = await self.check(order["_id"])
+            if order["_id"] not in self.orders:
+                return  # Cancelled while we were waiting on the API
+
+            received, amount = status["received"], status["amount"]
+            if received and amount >= order["expected_amount"]:
+                await self._finish(order, self.on_complete, amount)
+                return
+            if time.time() >= order["expires_at"]:
+                await self._finish(order, self.on_expire)
+                return
+            if received and amount != order["notified_amount"]:
+                # Only tell the user about a partial payment once per new amount
+                order["notified_amount"] = amount
+                await self.collection.update_one({"_id": order["_id"]}, {"$set": {"notified_amount": amount}})
+                await self.on_partial(order, amount)
+        except Exception as e:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Error checking deposit {order['_id']}: {e}")
+
+        if order["_id"] in self.orders:
+            order["checks"] += 1
+            interval = min(WATCH_MAX_INTERVAL, WATCH_MIN_INTERVAL * WATCH_BACKOFF ** order["checks"])
+            heapq.heappush(self.queue, (time.time() + interval, order["_id"]))
+
+    async def _finish(self, order, callback, *args):
+        """Hand the order off, then delete it, or mark it failed if the callback raises"""
+        self._untrack(order)
+        try:
+            await callback(order, *args)
+        except Exception as e:
+            await self.collection.update_one({"_id": order["_id"]}, {"$set": {"status": "failed", "error": str(e)}})
+            raise
+        await self.collection.delete_one({"_id": order["_id"]})
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import time
+import discord
+from colorama import Fore
+from dotenv import load_dotenv
+load_dotenv()
+
+# Pacing settings, all overridable from the environment
+EDIT_MIN_INTERVAL = float(os.environ.get("EDIT_MIN_INTERVAL", 0.5))
+EDIT_MAX_INTERVAL = float(os.environ.get("EDIT_MAX_INTERVAL", 5))
+# An edit this many times slower than usual sat in the HTTP client's rate limit queue
+EDIT_THROTTLE_FACTOR = float(os.environ.get("EDIT_THROTTLE_FACTOR", 3))
+
+
+def _discard(fields):
+    """Close the attachments of a frame that's never going to be sent"""
+    for file in fields.get("files") or ():
+        file.close()
+    if fields.get("file") is not None:
+        fields["file"].close()
+
+
+class MessageEditor:
+    """Paces the edits of one animated message
+
+    Animation frames go through frame(), which never blocks: only the newest
+    frame is kept and it's sent once the previous edit is done and the
+    interval has passed, so superseded frames are dropped instead of queueing
+    up in the HTTP client. Result frames go through final(), which drops any
+    waiting frame and is sent straight after the edit in flight.
+
+    The library consumes Discord's rate limit headers itself and just sleeps
+    when a bucket runs dry, so that shows up here as an edit that took far
+    longer than usual. Each one doubles the interval, and it eases back down
+    towards EDIT_MIN_INTERVAL while edits go through at normal speed.
+    """
+
+    def __init__(self, message, min_interval=EDIT_MIN_INTERVAL, max_interval=EDIT_MAX_INTERVAL):
+        self.message = message
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.latency = None  # Moving average of unthrottled edits
+        self.pending = None
+        self.last_sent = 0.0
+        self.lock = asyncio.Lock()  # One edit in flight at a time
+        self.task = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.throttled = 0
+
+    def wants_frame(self):
+        """False while a frame is already waiting, so callers can skip rendering one"""
+        return self.pending is None and not self.closed
+
+    def frame(self, **fields):
+        """Queue an animation frame, replacing any frame that hasn't been sent yet"""
+        if self.closed:
+            _discard(fields)
+            return
+        if self.pending is not None:
+            _discard(self.pending)
+            self.dropped += 1
+        self.pending = fields
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._pump())
+
+    async def final(self, **fields):
+        """Send a result frame ahead of any waiting animation frame and stop animating"""
+        self.closed = True
+        if self.pending is not None:
+            _discard(self.pending)
+            self.pending = None
+            self.dropped += 1
+        async with self.lock:
+            await self._send(fields)
+
+    async def _pump(self):
+        while self.pending is not None:
+            wait = self.last_sent + self.interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.lock:
+                fields, self.pending = self.pending, None
+                if fields is None:
+                    return  # A result frame replaced it
+                try:
+                    await self._send(fields)
+                except Exception as e:
+                    print(f"{Fore.RED}[-] {Fore.WHITE}Error editing message {self.message.id}: {e}")
+
+    async def _send(self, fields):
+        started = time.monotonic()
+        try:
+            await self.message.edit(**fields)
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self._slow_down()
+            raise
+        finally:
+            self.last_sent = time.monotonic()
+        self.sent += 1
+        self._adapt(self.last_sent - started)
+
+    def _adapt(self, elapsed):
+        if self.latency is not None and elapsed > self.latency * EDIT_THROTTLE_FACTOR:
+            self._slow_down()
+            return
+        self.latency = elapsed if self.latency is None else self.latency * 0.8 + elapsed * 0.2
+        self.interval = max(self.min_interval, self.interval * 0.9)
+
+    def _slow_down(self):
+        self.throttled += 1
+        self.interval = min(self.max_interval, self.interval * 2)
+
+    def stats(self):
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "throttled": self.throttled,
+            "interval": self.interval
+        }
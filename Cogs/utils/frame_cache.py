@@ -0,0 +1,189 @@
+import asyncio
+import os
+from collections import OrderedDict
+from colorama import Fore
+from Cogs.utils.crash_render import CRASH_RENDERER, CRASH_FRAME_FORMAT
+from Cogs.utils.render_service import get_render_service, RenderBusy
+from dotenv import load_dotenv
+load_dotenv()
+
+# Cache settings, all overridable from the environment
+CRASH_FRAME_CACHE_MB = float(os.environ.get("CRASH_FRAME_CACHE_MB", 64))
+# Leave empty to keep frames in memory only
+CRASH_FRAME_CACHE_DIR = os.environ.get("CRASH_FRAME_CACHE_DIR", "")
+# Running frames from 1.00x up to this are rendered at startup, 0 turns warming off
+CRASH_FRAME_PREWARM_MAX = float(os.environ.get("CRASH_FRAME_PREWARM_MAX", 3.0))
+# Longest wait in seconds between warming retries while the render pool is busy
+WARM_MAX_BACKOFF = 30
+
+# Bump when the crash frame layout changes, so old frames on disk are ignored
+FRAME_VERSION = 1
+
+# Shared cache, one per process
+_frame_cache = None
+
+
+def frame_key(current_multiplier, crashed=False, cash_out=False):
+    """Multiplier at display precision plus the state of the frame"""
+    state = "crashed" if crashed else "cashout" if cash_out else "running"
+    return round(current_multiplier, 2), state
+
+
+class CrashFrameCache:
+    """Rendered crash frames keyed by multiplier and state
+
+    A frame only depends on the multiplier shown (two decimals) and whether
+    the game is running, crashed or cashed out, so every game at 1.05x can
+    share one render. Frames live in a byte-bounded LRU, optionally backed by
+    a directory that survives restarts; misses are rendered through the render
+    service, and concurrent misses for the same frame share one render.
+    Crashed frames keep whatever boom lines they were first drawn with.
+    """
+
+    def __init__(self, max_bytes=CRASH_FRAME_CACHE_MB * 1024 * 1024, directory=CRASH_FRAME_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.entries = OrderedDict()  # key -> (image bytes, filename)
+        self.size = 0
+        self.rendering = {}  # key -> future of a render in progress
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def filename(self):
+        return "crash_graph.png" if CRASH_RENDERER == "legacy" or CRASH_FRAME_FORMAT == "PNG" else "crash_graph.jpg"
+
+    def _path(self, key):
+        multiplier, state = key
+        return os.path.join(self.directory, f"v{FRAME_VERSION}_{CRASH_RENDERER}_{state}_{multiplier:.2f}_{self.filename}")
+
+    def _put(self, key, frame):
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key)[0])
+        self.entries[key] = frame
+        self.size += len(frame[0])
+        while self.size > self.max_bytes and self.entries:
+            _, (graph, _) = self.entries.popitem(last=False)
+            self.size -= len(graph)
+            self.evictions += 1
+
+    def _read(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read(), self.filename
+
+    def _write(self, key, graph):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(graph)
+        os.replace(tmp, path)
+
+    def cached(self, key):
+        return key in self.entries
+
+    async def frame(self, current_multiplier, crashed=False, cash_out=False, fallback=True):
+        """(image bytes, filename) of a crash frame, rendering it only on a miss"""
+        key = frame_key(current_multiplier, crashed, cash_out)
+        frame = self.entries.get(key)
+        if frame is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return frame
+
+        pending = self.rendering.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self.rendering[key] = future
+        try:
+            frame = await self._load(key, fallback)
+            self._put(key, frame)
+            future.set_result(frame)
+            return frame
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting on it, don't let asyncio warn about it
+            future.exception()
+            raise
+        finally:
+            del self.rendering[key]
+
+    async def _load(self, key, fallback):
+        if self.directory:
+            try:
+                frame = await asyncio.to_thread(self._read, key)
+                if frame is not None:
+                    self.disk_hits += 1
+                    return frame
+            except OSError as e:
+                print(f"{Fore.RED}[-] {Fore.WHITE}Error reading cached crash frame: {e}")
+
+        self.misses += 1
+        multiplier, state = key
+        frame = await get_render_service().render(
+            "crash_frame", multiplier, state == "crashed", state == "cashout", fallback=fallback
+        )
+        if self.directory:
+            try:
+                await asyncio.to_thread(self._write, key, frame[0])
+            except OSError as e:
+                print(f"{Fore.RED}[-] {Fore.WHITE}Error writing cached crash frame: {e}")
+        return frame
+
+    async def warm(self, high=CRASH_FRAME_PREWARM_MAX, low=1.0):
+        """Render the running frames between low and high ahead of the first games"""
+        steps = int(round((high - low) * 100))
+        warmed = 0
+        backoff = 1
+        step = 0
+        while step <= steps:
+            multiplier = round(low + step / 100, 2)
+            if self.cached(frame_key(multiplier)):
+                step += 1
+                continue
+            try:
+                # Never push real games onto the fallback threads for this
+                await self.frame(multiplier, fallback=False)
+                warmed += 1
+                step += 1
+                backoff = 1
+            except RenderBusy:
+                # The pool is busy with real games, back off and retry the same frame
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, WARM_MAX_BACKOFF)
+            except Exception as e:
+                print(f"{Fore.RED}[-] {Fore.WHITE}Error warming crash frames: {e}")
+                return
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Warmed {Fore.GREEN}{warmed}{Fore.WHITE} crash frames")
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "frames": len(self.entries),
+            "size_mb": self.size / (1024 * 1024),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0
+        }
+
+
+def get_frame_cache():
+    """Return the shared crash frame cache, creating it on first use"""
+    global _frame_cache
+    if _frame_cache is None:
+        _frame_cache = CrashFrameCache()
+    return _frame_cache
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import time
+import aiohttp
+from colorama import Fore
+from dotenv import load_dotenv
+load_dotenv()
+
+# Upstream APIs, overridable so they can point at a local stand-in server
+COINGECKO_API = os.environ.get("COINGECKO_API", "https://api.coingecko.com/api/v3")
+SIMPLESWAP_API = os.environ.get("SIMPLESWAP_API", "https://api.simpleswap.io/v1")
+
+# Client settings, all overridable from the environment
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 10))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", 3))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", 0.5))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 100))
+
+# How long price and range lookups are reused
+PRICE_TTL = float(os.environ.get("PRICE_TTL", 60))
+RANGE_TTL = float(os.environ.get("RANGE_TTL", 300))
+
+# Statuses worth another try
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Shared client and caches, created lazily so they bind to the running event loop
+_client = None
+_price_cache = None
+_range_cache = None
+
+
+class HttpResponse:
+    """The bits of a response the cogs use, read before the connection is released"""
+
+    def __init__(self, status_code, text, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def json(self):
+        """Decoded body, raises ValueError if it isn't JSON"""
+        return json.loads(self.text)
+
+
+class HttpClient:
+    """One keep-alive connection pool for every outgoing API call
+
+    Idempotent requests are retried with exponential backoff on connection
+    errors, timeouts and 429/5xx responses.
+    """
+
+    def __init__(self, timeout=HTTP_TIMEOUT, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF, pool_size=HTTP_POOL_SIZE):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.session = None
+
+    def _session(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self.session
+
+    async def request(self, method, url, retry=None, **kwargs):
+        """Send a request, retrying it if it's safe to"""
+        if retry is None:
+            retry = method in ("GET", "HEAD")
+        attempts = self.retries + 1 if retry else 1
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                async with self._session().request(method, url, **kwargs) as resp:
+                    response = HttpResponse(resp.status, await resp.text(), dict(resp.headers))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if last:
+                    raise
+                print(f"{Fore.RED}[-] {Fore.WHITE}{method} {url.split('?')[0]} failed ({e!r}), retrying")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+            # Honour Retry-After when the upstream sends one, within reason
+            delay = self.backoff * 2 ** attempt
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(float(retry_after), self.timeout)
+            await asyncio.sleep(delay)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncTTLCache:
+    """TTL cache with single-flight lookups
+
+    Concurrent misses for the same key share one upstream call. Failed or
+    empty (None) lookups aren't cached.
+    """
+
+    def __init__(self, ttl, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = {}  # key -> (expires_at, value)
+        self.inflight = {}  # key -> task
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(self, key, fetch):
+        """Cached value for key, calling fetch() at most once per miss"""
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        task = self.inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            self.inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Shielded so one caller being cancelled doesn't cancel everyone's lookup
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            if value is not None:
+                self._store(key, value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    def _store(self, key, value):
+        now = time.monotonic()
+        if len(self.entries) >= self.max_size:
+            # Drop expired entries first, then the oldest ones
+            self.entries = {k: v for k, v in self.entries.items() if v[0] > now}
+            while len(self.entries) >= self.max_size:
+                self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        self.entries.clear()
+
+
+def get_http():
+    """Return the shared HTTP client"""
+    global _client
+    if _client is None:
+        _client = HttpClient()
+    return _client
+
+
+async def close_http():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def get_price_cache():
+    global _price_cache
+    if _price_cache is None:
+        _price_cache = AsyncTTLCache(PRICE_TTL)
+    return _price_cache
+
+
+def get_range_cache():
+    global _range_cache
+    if _range_cache is None:
+        _range_cache = AsyncTTLCache(RANGE_TTL)
+    return _range_cache
+
+
+async def get_coingecko_prices(ids, vs_currencies="usd"):
+    """CoinGecko simple prices, cached and shared by every cog asking for the same ids"""
+    async def fetch():
+        response = await get_http().get(
+            f"{COINGECKO_API}/simple/price",
+            params={"ids": ids, "vs_currencies": vs_currencies}
+        )
+        if response.status_code != 200:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Failed to fetch crypto prices. Status Code: {Fore.RED}{response.status_code}{Fore.WHITE}")
+            return None
+        return response.json()
+
+    return await get_price_cache().get(("coingecko", ids, vs_currencies), fetch)
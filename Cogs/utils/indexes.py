@@ -0,0 +1,201 @@
+import datetime
+from colorama import Fore
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, BulkWriteError
+from Cogs.utils.mongo import get_database
+
+# Every index the bot relies on, by collection: (name, keys, options)
+INDEXES = {
+    "users": [
+        ("discord_id_unique", [("discord_id", ASCENDING)], {"unique": True}),
+        # Leaderboards sort on these and only read discord_id, so the queries are covered
+        ("total_won_desc", [("total_won", DESCENDING), ("discord_id", ASCENDING)], {}),
+        ("total_lost_desc", [("total_lost", DESCENDING), ("discord_id", ASCENDING)], {}),
+        ("total_spent_desc", [("total_spent", DESCENDING), ("discord_id", ASCENDING)], {}),
+    ],
+    "servers": [
+        ("server_id_unique", [("server_id", ASCENDING)], {"unique": True}),
+    ],
+    # History views page through these newest first
+    "bets": [
+        ("user_ts", [("user_id", ASCENDING), ("timestamp", DESCENDING)], {}),
+        ("server_ts", [("server_id", ASCENDING), ("timestamp", DESCENDING)], {}),
+    ],
+}
+
+# Counters every user document is expected to have
+USER_COUNTERS = [
+    "tokens", "credits", "total_deposit_amount", "total_withdraw_amount", "total_spent",
+    "total_earned", "total_played", "total_won", "total_lost"
+]
+
+
+async def _merge_duplicates(collection, key, counters, arrays=()):
+    """Fold duplicate documents for the same key into the oldest one"""
+    pipeline = [
+        {"$group": {"_id": f"${key}", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    merged = 0
+    async for group in collection.aggregate(pipeline):
+        keep, *extra = sorted(group["ids"])
+        totals = {}
+        items = {}
+        async for doc in collection.find({"_id": {"$in": extra}}):
+            for field in counters:
+                totals[field] = totals.get(field, 0) + (doc.get(field) or 0)
+            for field in arrays:
+                items.setdefault(field, []).extend(doc.get(field) or [])
+        update = {}
+        totals = {field: value for field, value in totals.items() if value}
+        if totals:
+            update["$inc"] = totals
+        if any(items.values()):
+            update["$push"] = {field: {"$each": values} for field, values in items.items() if values}
+        if update:
+            await collection.update_one({"_id": keep}, update)
+        await collection.delete_many({"_id": {"$in": extra}})
+        merged += len(extra)
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Merged {len(extra)} duplicate {key} {Fore.GREEN}{group['_id']}{Fore.WHITE}")
+    return merged
+
+
+async def merge_duplicate_users(db):
+    """Duplicate users from the old count-then-insert registration race"""
+    await _merge_duplicates(db["users"], "discord_id", USER_COUNTERS, ["history"])
+
+
+async def merge_duplicate_servers(db):
+    """Duplicate servers registered twice on join"""
+    await _merge_duplicates(db["servers"], "server_id", ["total_profit"], ["server_bet_history"])
+
+
+async def backfill_user_counters(db):
+    """Give older users every counter, so leaderboards and stats see a number"""
+    for field in USER_COUNTERS:
+        await db["users"].update_many({field: {"$exists": False}}, {"$set": {field: 0}})
+
+
+def _bet_ids(user_id, entries):
+    """Stable ids for legacy history entries
+
+    The same bet sits in both the user's and the server's history, so both
+    copies get the same id and the second insert is dropped as a duplicate.
+    """
+    seen = {}
+    for entry in entries:
+        key = f"{entry.get('user_id', user_id)}:{entry.get('timestamp')}:{entry.get('game')}:{entry.get('type')}:{entry.get('bet')}"
+        seen[key] = seen.get(key, 0) + 1
+        yield f"{key}:{seen[key]}"
+
+
+async def _insert_bets(bets, documents):
+    """Insert migrated bets, skipping any that are already there"""
+    if not documents:
+        return
+    try:
+        await bets.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Duplicate ids are bets that were already moved
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+
+
+async def move_history_to_bets(db):
+    """Stream the embedded bet histories into the bets collection
+
+    Server histories go first since their entries carry the server_id, then
+    the bet entries are pulled out of each user's history. Entries without a
+    game (deposits, tips, airdrops...) stay in the user document.
+    """
+    bets = db["bets"]
+
+    servers = db["servers"].find({"server_bet_history": {"$exists": True}}, {"server_id": 1, "server_bet_history": 1})
+    async for server in servers:
+        entries = [entry for entry in server.get("server_bet_history") or [] if "game" in entry]
+        await _insert_bets(bets, [
+            {**entry, "_id": bet_id, "server_id": server["server_id"]}
+            for entry, bet_id in zip(entries, _bet_ids(None, entries))
+        ])
+        await db["servers"].update_one({"_id": server["_id"]}, {"$unset": {"server_bet_history": ""}})
+
+    users = db["users"].find({"history.game": {"$exists": True}}, {"discord_id": 1, "history": 1})
+    async for user in users:
+        entries = [entry for entry in user.get("history") or [] if "game" in entry]
+        await _insert_bets(bets, [
+            {"server_id": None, **entry, "_id": bet_id, "user_id": user["discord_id"]}
+            for entry, bet_id in zip(entries, _bet_ids(user["discord_id"], entries))
+        ])
+        await db["users"].update_one({"_id": user["_id"]}, {"$pull": {"history": {"game": {"$exists": True}}}})
+
+
+# Applied in order, once each; every migration must be safe to run again
+MIGRATIONS = [
+    ("0001_merge_duplicate_users", merge_duplicate_users),
+    ("0002_merge_duplicate_servers", merge_duplicate_servers),
+    ("0003_backfill_user_counters", backfill_user_counters),
+    ("0004_move_history_to_bets", move_history_to_bets),
+]
+
+
+async def run_migrations(db):
+    """Run every migration that isn't recorded in the migrations collection"""
+    applied = {doc["_id"] async for doc in db["migrations"].find({}, {"_id": 1})}
+    ran = []
+    for migration_id, migration in MIGRATIONS:
+        if migration_id in applied:
+            continue
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Running migration: {Fore.GREEN}{migration_id}{Fore.WHITE}")
+        await migration(db)
+        await db["migrations"].update_one(
+            {"_id": migration_id},
+            {"$set": {"applied_at": datetime.datetime.now(datetime.timezone.utc)}},
+            upsert=True
+        )
+        ran.append(migration_id)
+    return ran
+
+
+async def ensure_indexes(db):
+    """Create any missing index, creating an existing one is a no-op"""
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for name, keys, options in indexes:
+            try:
+                await collection.create_index(keys, name=name, **options)
+            except OperationFailure as e:
+                # Same keys under another name/options, leave it for verify_indexes to report
+                print(f"{Fore.RED}[-] {Fore.WHITE}Couldn't create index {collection_name}.{name}: {e}")
+
+
+async def verify_indexes(db):
+    """Compare the live indexes with INDEXES, returns {collection: {"missing": [...], "extra": [...]}}"""
+    report = {}
+    for collection_name, indexes in INDEXES.items():
+        live = await db[collection_name].index_information()
+        expected = {name for name, keys, options in indexes}
+        report[collection_name] = {
+            "missing": sorted(expected - set(live)),
+            "extra": sorted(set(live) - expected - {"_id_"})
+        }
+    return report
+
+
+async def bootstrap_database():
+    """Migrate, index and verify the database, run once at startup"""
+    db = get_database()
+    try:
+        await run_migrations(db)
+        await ensure_indexes(db)
+        report = await verify_indexes(db)
+    except Exception as e:
+        print(f"{Fore.RED}[-] {Fore.WHITE}Database bootstrap failed: {e}")
+        return None
+
+    for collection_name, result in report.items():
+        for name in result["missing"]:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Missing index: {Fore.RED}{collection_name}.{name}{Fore.WHITE}")
+        for name in result["extra"]:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Unexpected index: {Fore.RED}{collection_name}.{name}{Fore.WHITE}")
+    print(f"{Fore.GREEN}[+] {Fore.WHITE}Database indexes verified")
+    return report
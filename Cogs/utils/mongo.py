@@ -1,62 +1,272 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from Cogs.utils.cache import get_user_cache, get_known_users
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
-mongodb = MongoClient(os.environ["MONGO"])
+# Connection pool settings, all overridable from the environment
+POOL_SETTINGS = {
+    "maxPoolSize": int(os.environ.get("MONGO_MAX_POOL_SIZE", 100)),
+    "minPoolSize": int(os.environ.get("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.environ.get("MONGO_MAX_IDLE_MS", 60000)),
+    "serverSelectionTimeoutMS": int(os.environ.get("MONGO_TIMEOUT_MS", 5000)),
+}
+
+DATABASE_NAME = os.environ.get("MONGO_DB", "BetSync")
+
+# Shared client, created lazily so it binds to the running event loop
+_client = None
+
+
+def get_client():
+    """Return the shared motor client, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(os.environ["MONGO"], **POOL_SETTINGS)
+    return _client
+
+
+def get_database():
+    """Return the BetSync database on the shared client"""
+    return get_client()[DATABASE_NAME]
+
+
+# Field projections for the common read paths
+EXISTS_PROJECTION = {"_id": 1}
+BALANCE_PROJECTION = {"_id": 0, "discord_id": 1, "tokens": 1, "credits": 1}
+STATS_PROJECTION = {
+    "_id": 0, "discord_id": 1, "total_deposit_amount": 1, "total_withdraw_amount": 1,
+    "total_spent": 1, "total_earned": 1, "total_played": 1, "total_won": 1, "total_lost": 1
+}
+
+
+# Fields every new user starts with
+NEW_USER_DEFAULTS = {
+    "tokens": 0, "credits": 0, "history": [], "total_deposit_amount": 0, "total_withdraw_amount": 0,
+    "total_spent": 0, "total_earned": 0, "total_played": 0, "total_won": 0, "total_lost": 0
+}
+
+# Everything the user cache keeps for a user, the history is always read from Mongo
+PROFILE_PROJECTION = {**BALANCE_PROJECTION, **STATS_PROJECTION, "_id": 1}
+PROFILE_FIELDS = set(PROFILE_PROJECTION)
+
+
+def _cacheable(projection):
+    """Whether a projection can be answered from a cached profile"""
+    if not projection or not any(value for value in projection.values()):
+        return False
+    return all(field in PROFILE_FIELDS and value in (0, 1) for field, value in projection.items())
+
+
+def _project(profile, projection):
+    """Apply an inclusion projection to a cached profile"""
+    result = {field: profile[field] for field, value in projection.items() if value and field in profile}
+    if projection.get("_id", 1) and "_id" in profile:
+        result["_id"] = profile["_id"]
+    return result
+
+
+# Server documents without the legacy embedded bet history
+SERVER_PROJECTION = {"server_bet_history": 0}
+
+
+def history_projection(limit=100):
+    """Projection returning only the newest `limit` history entries"""
+    return {"_id": 0, "discord_id": 1, "history": {"$slice": -limit}}
+
+
+def close_client():
+    """Close the shared client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
 
 
 class Users:
-    
+
     def __init__(self):
-        self.db = mongodb["BetSync"]
+        self.db = get_database()
         self.collection = self.db["users"]
+        self.cache = get_user_cache()
+        self.known = get_known_users()
 
     def get_all_users(self):
         return self.collection.find()
 
-    def register_new_user(self, user_data):
+    async def register_new_user(self, user_data):
+        """Insert the user if they don't exist yet, returns False if they already did"""
         discordid = user_data["discord_id"]
-        if self.collection.count_documents({"discord_id": discordid}):
+        fields = {key: value for key, value in user_data.items() if key != "discord_id"}
+        result = await self.collection.update_one({"discord_id": discordid}, {"$setOnInsert": fields}, upsert=True)
+        self.known.add(discordid)
+        if result.upserted_id is None:
             return False
-        else:
-            new_user = self.collection.insert_one(user_data)
-            return new_user.inserted_id
+        return result.upserted_id
 
-    def fetch_user(self, user_id):
-        if self.collection.count_documents({"discord_id": user_id}):
-            return self.collection.find_one({"discord_id": user_id})
+    async def ensure_user(self, user_id):
+        """Register the user if they're new, returns True if they were just created
 
-        else:
+        Users in the known set cost no query, everyone else a single upsert.
+        """
+        if user_id in self.known:
             return False
+        return await self.register_new_user({"discord_id": user_id, **NEW_USER_DEFAULTS}) is not False
 
-    def update_balance(self, user_id, amount, currency: str = "tokens", operation = "$set"):
+    async def fetch_user(self, user_id, projection=None):
+        """Fetch a user in one query, returns None if they aren't registered
+
+        Balance, stats and existence lookups are served from the user cache.
+        """
+        if not _cacheable(projection):
+            return await self.collection.find_one({"discord_id": user_id}, projection)
+
+        profile = self.cache.get(user_id)
+        if profile is None:
+            generation = self.cache.generation()
+            profile = await self.collection.find_one({"discord_id": user_id}, PROFILE_PROJECTION)
+            if profile is None:
+                return None
+            self.cache.put(user_id, profile, generation)
+            self.known.add(user_id)
+        return _project(profile, projection)
+
+    async def update_user(self, user_id, update):
+        """Apply an update document to a user and write it through to the cache"""
+        with self.cache.writing([user_id]):
+            await self.collection.update_one({"discord_id": user_id}, update)
+        self.cache.apply(user_id, update)
+
+    async def credit_deposit(self, user_id, order_id, update):
+        """Apply a deposit's update once per order id, returns False if it was already credited
+
+        The update has to push a history entry carrying the order_id.
+        """
+        with self.cache.writing([user_id]):
+            result = await self.collection.update_one({"discord_id": user_id, "history.order_id": {"$ne": order_id}}, update)
+        if not result.modified_count:
+            return False
+        self.cache.apply(user_id, update)
+        return True
+
+    async def update_balance(self, user_id, amount, currency: str = "tokens", operation = "$set"):
         try:
-            self.collection.update_one({"discord_id": user_id}, {operation: {currency: amount}})
+            await self.update_user(user_id, {operation: {currency: amount}})
             return True
         except Exception as e:
             return False
 
+    async def debit_balance(self, user_id, amount, currency="tokens"):
+        """Atomically take an amount from one balance, returns the new balance or None if it can't cover it"""
+        with self.cache.writing([user_id]):
+            before = await self.collection.find_one_and_update(
+                {"discord_id": user_id, currency: {"$gte": amount}},
+                {"$inc": {currency: -amount}},
+                projection={"_id": 0, currency: 1},
+                return_document=ReturnDocument.BEFORE
+            )
+        if before is None:
+            # The cached balance may be what let this through, read it again next time
+            self.cache.invalidate(user_id)
+            return None
+        balance = before[currency] - amount
+        self.cache.apply(user_id, {"$set": {currency: balance}})
+        return balance
+
+    async def debit_bet(self, user_id, amount, currency=None, plays=1):
+        """Atomically take a bet from the user's balance and record it in their stats
+
+        A specific currency ("tokens" or "credits") is debited on its own, otherwise
+        tokens are used first, then credits, then a mix of both. Returns the split
+        that was used, or None if the user is missing or can't cover the bet.
+        """
+        with self.cache.writing([user_id]):
+            if currency in ("tokens", "credits"):
+                # Single currency, the filter guards the balance
+                before = await self.collection.find_one_and_update(
+                    {"discord_id": user_id, currency: {"$gte": amount}},
+                    {"$inc": {currency: -amount, "total_played": plays, "total_spent": amount}},
+                    projection={"_id": 0, "tokens": 1, "credits": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before is None:
+                    return None
+                tokens_used = amount if currency == "tokens" else 0
+            else:
+                # Tokens if they cover the bet, else credits, else everything in tokens and the rest in credits
+                tokens_used_expr = {"$cond": [
+                    {"$gte": ["$tokens", amount]}, amount,
+                    {"$cond": [{"$gte": ["$credits", amount]}, 0, "$tokens"]}
+                ]}
+                before = await self.collection.find_one_and_update(
+                    {"discord_id": user_id, "$expr": {"$gte": [{"$add": ["$tokens", "$credits"]}, amount]}},
+                    [{"$set": {
+                        "tokens": {"$subtract": ["$tokens", tokens_used_expr]},
+                        "credits": {"$subtract": ["$credits", {"$subtract": [amount, tokens_used_expr]}]},
+                        "total_played": {"$add": [{"$ifNull": ["$total_played", 0]}, plays]},
+                        "total_spent": {"$add": [{"$ifNull": ["$total_spent", 0]}, amount]}
+                    }}],
+                    projection={"_id": 0, "tokens": 1, "credits": 1},
+                    return_document=ReturnDocument.BEFORE
+                )
+                if before is None:
+                    return None
+                # Same rule as the pipeline, applied to the balances it saw
+                if before["tokens"] >= amount:
+                    tokens_used = amount
+                elif before["credits"] >= amount:
+                    tokens_used = 0
+                else:
+                    tokens_used = before["tokens"]
+
+        credits_used = amount - tokens_used
+        self.cache.apply(user_id, {
+            "$set": {"tokens": before["tokens"] - tokens_used, "credits": before["credits"] - credits_used},
+            "$inc": {"total_played": plays, "total_spent": amount}
+        })
+        return {
+            "tokens_used": tokens_used,
+            "credits_used": credits_used,
+            "tokens": before["tokens"] - tokens_used,
+            "credits": before["credits"] - credits_used
+        }
+
+    async def refund_bet(self, user_id, tokens_used, credits_used, plays=1):
+        """Give a debited bet back and undo its stats"""
+        try:
+            await self.update_user(user_id, {"$inc": {
+                "tokens": tokens_used,
+                "credits": credits_used,
+                "total_played": -plays,
+                "total_spent": -(tokens_used + credits_used)
+            }})
+            return True
+        except Exception as e:
+            print(f"Error refunding bet: {e}")
+            return False
+
 class Servers:
 
     def __init__(self):
-        self.db = mongodb["BetSync"]
+        self.db = get_database()
         self.collection = self.db["servers"]
 
-    def get_total_all_servers(self):
-        return self.collection.count_documents({})
+    async def get_total_all_servers(self):
+        return await self.collection.count_documents({})
 
-    def new_server(self, dump):
+    async def new_server(self, dump):
         server_id = dump["server_id"]
-        if self.collection.count_documents({"server_id": server_id}):
+        if await self.collection.count_documents({"server_id": server_id}):
             return False
         else:
-            new_server_ = self.collection.insert_one(dump) 
-            return self.collection.find_one({"server_id": server_id})
-            
-    def update_server_profit(self, server_id, profit_amount):
+            new_server_ = await self.collection.insert_one(dump)
+            return await self.collection.find_one({"server_id": server_id})
+
+    async def update_server_profit(self, server_id, profit_amount):
         try:
-            self.collection.update_one(
+            await self.collection.update_one(
                 {"server_id": server_id},
                 {"$inc": {"total_profit": profit_amount}}
             )
@@ -65,20 +275,61 @@ class Servers:
             print(f"Error updating server profit: {e}")
             return False
 
-    def update_history(self, server_id, history_data):
-            if self.collection.count_documents({"server_id": server_id}):
-                self.collection.update_one(
-                    {"server_id": server_id},
-                    {"$push": {"server_bet_history": history_data}}
-                )
-                return True
-            else:
-                return False
-
-    def fetch_server(self, server_id):
-        if self.collection.count_documents({"server_id": server_id}):
-            return self.collection.find_one({"server_id": server_id})
-
+    async def update_history(self, server_id, history_data):
+        """Record a bet played in this server"""
+        if await self.collection.count_documents({"server_id": server_id}):
+            await Bets().record([{**history_data, "server_id": server_id}])
+            return True
         else:
             return False
-            
\ No newline at end of file
+
+    async def fetch_server(self, server_id, projection=None):
+        """Fetch a server in one query, returns None if it isn't registered"""
+        return await self.collection.find_one({"server_id": server_id}, projection or SERVER_PROJECTION)
+
+
+class Bets:
+    """Bet history, one document per settled game, newest first by timestamp"""
+
+    def __init__(self):
+        self.db = get_database()
+        self.collection = self.db["bets"]
+
+    async def record(self, bets):
+        """Upsert settled bets by _id in one round trip, returns the _ids that were new
+
+        Recording a bet that is already there changes nothing, so replaying
+        settled games never stores them twice. Bets without an _id get a new one.
+        """
+        if not bets:
+            return set()
+        bets = [bet if "_id" in bet else {**bet, "_id": ObjectId()} for bet in bets]
+        result = await self.collection.bulk_write([
+            UpdateOne({"_id": bet["_id"]}, {"$setOnInsert": {k: v for k, v in bet.items() if k != "_id"}}, upsert=True)
+            for bet in bets
+        ], ordered=False)
+        return {bets[i]["_id"] for i in result.upserted_ids}
+
+    def _query(self, field, value, bet_type=None):
+        query = {field: value}
+        if bet_type is not None:
+            query["type"] = bet_type
+        return query
+
+    async def _page(self, query, skip, limit):
+        cursor = self.collection.find(query, {"_id": 0}).sort("timestamp", -1).skip(skip).limit(limit)
+        return await cursor.to_list(None)
+
+    async def fetch_user_bets(self, user_id, bet_type=None, skip=0, limit=10):
+        """A page of a user's bets, optionally only wins/losses/draws"""
+        return await self._page(self._query("user_id", user_id, bet_type), skip, limit)
+
+    async def count_user_bets(self, user_id, bet_type=None):
+        return await self.collection.count_documents(self._query("user_id", user_id, bet_type))
+
+    async def fetch_server_bets(self, server_id, bet_type=None, skip=0, limit=10):
+        """A page of the bets played in a server"""
+        return await self._page(self._query("server_id", server_id, bet_type), skip, limit)
+
+    async def count_server_bets(self, server_id, bet_type=None):
+        return await self.collection.count_documents(self._query("server_id", server_id, bet_type))
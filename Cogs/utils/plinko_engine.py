@@ -0,0 +1,48 @@
+import os
+import numpy as np
+from dotenv import load_dotenv
+load_dotenv()
+
+# Batch limits, all overridable from the environment
+PLINKO_MAX_BALLS = int(os.environ.get("PLINKO_MAX_BALLS", 1000))
+# Paths drawn on the board image, the rest only show up in the summary
+PLINKO_DRAWN_BALLS = int(os.environ.get("PLINKO_DRAWN_BALLS", 5))
+
+# One generator per process, seeded from the OS
+_rng = np.random.default_rng()
+
+
+class PlinkoDrop:
+    """Paths and landing slots of a batch of balls"""
+
+    def __init__(self, steps):
+        self.steps = steps  # (balls, rows) array, 1 where the ball went right
+        self.landing = steps.sum(axis=1)  # Slot each ball landed in
+
+    def __len__(self):
+        return len(self.landing)
+
+    def path(self, ball):
+        """[(x, y), ...] from the top peg to the slot, the format the board renderer draws"""
+        xs = np.concatenate(([0], np.cumsum(self.steps[ball])))
+        return [(int(x), y) for y, x in enumerate(xs)]
+
+    def counts(self, slots):
+        """Balls per slot"""
+        return np.bincount(self.landing, minlength=slots)
+
+    def payout(self, bet_per_ball, multipliers):
+        """Total paid out over every ball"""
+        return float(bet_per_ball * np.asarray(multipliers, dtype=float)[self.landing].sum())
+
+
+def drop_balls(balls, rows, left_prob=0.5, variance=0.0, rng=None):
+    """Drop every ball through every row at once
+
+    Same model as dropping them one at a time: at each peg the chance of
+    going left is left_prob shifted by up to half the variance either way.
+    """
+    rng = rng or _rng
+    adjusted = left_prob + (rng.random((balls, rows)) - 0.5) * variance
+    steps = (rng.random((balls, rows)) >= adjusted).astype(np.int8)
+    return PlinkoDrop(steps)
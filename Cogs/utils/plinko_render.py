@@ -0,0 +1,289 @@
+import io
+import os
+import time
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from Cogs.utils.cards import RenderStats
+from dotenv import load_dotenv
+load_dotenv()
+
+# Renderer settings, all overridable from the environment
+PLINKO_FONT = os.environ.get("PLINKO_FONT", "roboto.ttf")
+# Board templates kept per worker, one per rows and multiplier table (about 5MB each)
+PLINKO_TEMPLATE_CACHE = int(os.environ.get("PLINKO_TEMPLATE_CACHE", 16))
+
+BG_COLOR = (33, 33, 33)
+PEG_COLOR = (200, 200, 200)
+WATERMARK_COLOR = (255, 255, 255, 40)
+OUTLINE_COLOR = (0, 0, 0, 255)
+# Ball and path colours, one per drawn ball
+BALL_COLORS = [
+    (0, 255, 0),      # Green
+    (0, 191, 255),    # Deep Sky Blue
+    (255, 69, 0),     # Red-Orange
+    (255, 215, 0),    # Gold
+    (138, 43, 226)    # Purple
+]
+PATH_COLORS = [
+    (0, 200, 0, 128),
+    (0, 150, 200, 128),
+    (200, 60, 0, 128),
+    (200, 170, 0, 128),
+    (100, 30, 170, 128)
+]
+
+# Largest board sent, bigger boards used to be drawn larger and scaled down to this
+MAX_WIDTH = 1500
+MAX_HEIGHT = 1200
+
+# Shared renderer, one per process
+_plinko_renderer = None
+
+
+def multiplier_color(multiplier):
+    if multiplier >= 10:
+        return (255, 50, 50)
+    if multiplier >= 1.5:
+        return (255, 165, 0)
+    if multiplier >= 0.5:
+        return (255, 255, 0)
+    return (150, 150, 150)
+
+
+def _brighten(color, amount):
+    return tuple(min(255, c + amount) for c in color)
+
+
+class BoardLayout:
+    """Sizes and positions of a board, at the resolution it's sent at
+
+    The board used to be drawn on a canvas sized from the row and slot count,
+    then scaled down to fit MAX_WIDTH. The canvas size is still worked out the
+    same way, but every position and size is scaled by the same factor up
+    front, so the board is drawn at its final size and never resized.
+    """
+
+    def __init__(self, rows, slots):
+        self.rows = rows
+        self.slots = slots
+
+        scale_factor = min(1.0, 12 / max(10, rows))
+        width_scale = 1.2 if slots < 13 else min(1.6, slots / 10)
+        height_scale = 1.0 if rows <= 10 else min(1.3, rows / 10)
+        width = int(1200 * width_scale)
+        height = int(800 * height_scale / scale_factor)
+        if rows >= 14 or slots >= 15:
+            width = int(width * 1.25)
+            height = int(height * 1.1)
+        if width < height * 1.2:
+            width = int(height * 1.2)
+
+        # Size the canvas would have been scaled down to, it's always at least 1.2:1 by now
+        self.width, self.height = width, height
+        if height > MAX_HEIGHT or width > MAX_WIDTH:
+            self.width = min(MAX_WIDTH, width)
+            self.height = max(800, int(self.width * height / width))
+        sx, sy = self.width / width, self.height / height
+        shrink = min(sx, sy)
+        scale = shrink * scale_factor
+
+        self.horizontal_spacing = self.width / (rows + 1)
+        self.vertical_spacing = self.height / (rows + 3)  # Room for the multipliers at the bottom
+        self.peg_radius = max(9, int(16 * scale_factor)) * shrink
+        self.ball_radius = max(15, int(24 * scale_factor)) * shrink
+
+        self.watermark_size = max(1, round(80 * scale))
+        self.win_info_size = max(1, round(32 * scale))
+        self.win_info_padding = 20 * scale
+        self.win_info_lines = (15 * scale, 55 * scale)
+
+        self.slot_width = self.width / slots
+        self.slot_y = self.vertical_spacing * (rows + 1) + 30 * scale_factor * sy
+        self.text_y = self.slot_y + (45 if rows >= 11 else 35) * scale_factor * sy
+        self.multiplier_size = max(1, round(max(24, int(35 * min(1.0, 12 / slots))) * shrink))
+        # Crowded rows only label every Nth slot, slots with a ball are always labelled
+        self.text_skip = max(1, int(slots / (12 if rows >= 11 else 14)))
+        self.outline = max(1, round(2 * shrink))
+        self.box_padding = 8 * scale
+        self.border = max(2, round(max(2, int(3 * scale_factor)) * shrink))
+        self.indicator_size = max(8, int(12 * scale_factor)) * shrink
+        self.indicator_font_size = max(1, int(self.indicator_size * 0.8))
+        self.ball_font_size = max(1, int(self.ball_radius * 1.2))
+
+    def peg(self, col, row):
+        """Centre of a peg, the slot row is row == rows"""
+        return (self.width - row * self.horizontal_spacing) / 2 + col * self.horizontal_spacing, self.vertical_spacing * (row + 1)
+
+    def slot(self, i):
+        """Centre of a slot's multiplier label"""
+        return i * self.slot_width + self.slot_width / 2, self.text_y
+
+
+@lru_cache(maxsize=64)
+def board_layout(rows, slots):
+    return BoardLayout(rows, slots)
+
+
+class PlinkoBoardRenderer:
+    """Plinko boards drawn on cached board templates
+
+    Everything that only depends on the rows and multiplier table (the
+    background, watermark, pegs and slot labels) is drawn once into a
+    template. A game copies the template and only draws its ball paths,
+    landing boxes, balls and win info on top, with fonts loaded once per size.
+    Templates are keyed by the multiplier table rather than the difficulty
+    name, which is all the difficulty changes on the board.
+    """
+
+    def __init__(self, font_path=PLINKO_FONT):
+        self.font_path = font_path
+        self.fonts = {}
+        self.metrics = RenderStats()
+
+    def font(self, size):
+        """Font at a pixel size, each size is loaded once"""
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = ImageFont.truetype(self.font_path, size)
+        return font
+
+    @lru_cache(maxsize=PLINKO_TEMPLATE_CACHE)
+    def template(self, rows, multipliers):
+        """Background, watermark, pegs and slot labels of a board"""
+        layout = board_layout(rows, len(multipliers))
+        img = Image.new("RGBA", (layout.width, layout.height), BG_COLOR)
+        draw = ImageDraw.Draw(img)
+
+        # Watermark pixels replace the background, so the board is see-through there
+        watermark_font = self.font(layout.watermark_size)
+        center_x, center_y = layout.width // 2, layout.height // 2
+        draw.text((center_x, center_y), "BetSync", font=watermark_font, fill=WATERMARK_COLOR, anchor="mm")
+        draw.text((center_x, center_y + layout.watermark_size), "Plinko", font=watermark_font, fill=WATERMARK_COLOR, anchor="mm")
+
+        for row in range(rows + 1):
+            for col in range(row + 1):
+                self._peg(draw, layout, col, row)
+
+        font = self.font(layout.multiplier_size)
+        for i, multiplier in enumerate(multipliers):
+            if i % layout.text_skip == 0:
+                draw.text(
+                    layout.slot(i), f"{multiplier:.1f}x", font=font, anchor="mm",
+                    fill=_brighten(multiplier_color(multiplier), 30),
+                    stroke_width=layout.outline, stroke_fill=OUTLINE_COLOR
+                )
+        return img
+
+    def _peg(self, draw, layout, col, row):
+        x, y = layout.peg(col, row)
+        r = layout.peg_radius
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=PEG_COLOR)
+
+    def render(self, rows, ball_results, multipliers, total_win, avg_multiplier):
+        """Board image with the paths of the drawn balls, blocking
+
+        Only some balls may be drawn, so the win and multiplier shown are the
+        game's totals rather than worked out from ball_results.
+        """
+        started = time.perf_counter()
+        multipliers = tuple(multipliers)
+        layout = board_layout(rows, len(multipliers))
+        img = self.template(rows, multipliers).copy()
+        draw = ImageDraw.Draw(img)
+
+        if ball_results:
+            self._win_info(draw, layout, total_win, avg_multiplier)
+
+        # Paths go behind the pegs, so the pegs they pass are drawn again on top
+        r = layout.ball_radius
+        visited = {}
+        for i, result in enumerate(ball_results):
+            for point in result["path"]:
+                visited.setdefault(tuple(point), []).append(i)
+        for (col, row), balls in visited.items():
+            x, y = layout.peg(col, row)
+            for i in balls:
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=PATH_COLORS[i % len(PATH_COLORS)])
+            self._peg(draw, layout, col, row)
+
+        landed = {}
+        for i, result in enumerate(ball_results):
+            landed.setdefault(result["landing_position"], []).append(i)
+        for slot, balls in landed.items():
+            self._landing(draw, layout, slot, multipliers[slot], balls)
+
+        ball_font = self.font(layout.ball_font_size)
+        for i, result in enumerate(ball_results):
+            x, y = layout.peg(*result["path"][-1])
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=BALL_COLORS[i % len(BALL_COLORS)])
+            if len(ball_results) > 1:
+                draw.text((x, y), str(i + 1), font=ball_font, fill=(0, 0, 0), anchor="mm")
+
+        self.metrics.record(started)
+        return img
+
+    def _win_info(self, draw, layout, total_win, avg_multiplier):
+        font = self.font(layout.win_info_size)
+        color = (0, 255, 0) if avg_multiplier >= 1 else (255, 100, 100)
+        x = layout.width - layout.win_info_padding
+        for offset, text in zip(layout.win_info_lines, (f"Win: {total_win:.1f}", f"Multiplier: {avg_multiplier:.1f}x")):
+            y = layout.win_info_padding + offset
+            draw.text((x + 2, y + 2), text, font=font, fill=(0, 0, 0), anchor="rt")
+            draw.text((x, y), text, font=font, fill=color, anchor="rt")
+
+    def _landing(self, draw, layout, slot, multiplier, balls):
+        """Box around a slot that caught balls, with a marker per ball when there are several"""
+        x, y = layout.slot(slot)
+        text = f"{multiplier:.1f}x"
+        font = self.font(layout.multiplier_size)
+        left, top, right, bottom = draw.textbbox((x, y), text, font=font, anchor="mm")
+        padding = layout.box_padding
+        box = (left - padding, top - padding, right + padding, bottom + padding)
+        draw.rectangle(box, fill=(0, 0, 0, 150))
+
+        if len(balls) == 1:
+            draw.rectangle(box, outline=BALL_COLORS[balls[0] % len(BALL_COLORS)], width=layout.border)
+        else:
+            draw.rectangle(box, outline=(255, 255, 255), width=layout.border)
+            size = layout.indicator_size
+            spacing = size * 1.5
+            start_x = x - ((len(balls) - 1) * spacing + size) / 2
+            indicator_y = top - padding * 2 - size
+            number_font = self.font(layout.indicator_font_size)
+            for k, ball in enumerate(balls):
+                indicator_x = start_x + k * spacing
+                draw.ellipse(
+                    (indicator_x - size / 2, indicator_y - size / 2, indicator_x + size / 2, indicator_y + size / 2),
+                    fill=BALL_COLORS[ball % len(BALL_COLORS)]
+                )
+                draw.text((indicator_x, indicator_y), str(ball + 1), font=number_font, fill=(0, 0, 0), anchor="mm")
+
+        draw.text((x, y), text, font=font, fill=_brighten(multiplier_color(multiplier), 50), anchor="mm")
+
+    def warm(self, rows=range(8, 17)):
+        """Load the fonts every board size uses, templates are built by the first game"""
+        for row_count in rows:
+            layout = board_layout(row_count, row_count + 1)
+            for size in (layout.watermark_size, layout.win_info_size, layout.multiplier_size,
+                         layout.indicator_font_size, layout.ball_font_size):
+                self.font(size)
+
+    def stats(self):
+        stats = self.metrics.stats()
+        stats["templates"] = self.template.cache_info().currsize
+        return stats
+
+
+def get_plinko_renderer():
+    """Return the shared plinko renderer, creating it on first use"""
+    global _plinko_renderer
+    if _plinko_renderer is None:
+        _plinko_renderer = PlinkoBoardRenderer()
+    return _plinko_renderer
+
+
+def render_plinko_png(rows, ball_results, multipliers, total_win, avg_multiplier):
+    """PNG bytes of the board"""
+    img_buffer = io.BytesIO()
+    get_plinko_renderer().render(rows, ball_results, multipliers, total_win, avg_multiplier).save(img_buffer, format='PNG', compress_level=1)
+    return img_buffer.getvalue()
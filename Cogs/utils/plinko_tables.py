@@ -0,0 +1,198 @@
+import os
+from math import comb, floor
+import numpy as np
+from colorama import Fore
+from dotenv import load_dotenv
+load_dotenv()
+
+# Return to player band every table is checked against, overridable from the environment
+PLINKO_RTP_MIN = float(os.environ.get("PLINKO_RTP_MIN", 0.90))
+PLINKO_RTP_MAX = float(os.environ.get("PLINKO_RTP_MAX", 1.0))
+# "flag" only logs tables below the band, "refuse" also takes them out of play.
+# Tables paying back more than they take (RTP above 1.0) are always scaled down to the band.
+PLINKO_RTP_ACTION = os.environ.get("PLINKO_RTP_ACTION", "flag")
+
+PLINKO_MIN_ROWS = 8
+PLINKO_MAX_ROWS = 16
+
+# Chance of going left at each peg, shifted by up to half the variance either way
+DIFFICULTY_SETTINGS = {
+    "LOW": {
+        "left_prob": 0.5,    # 50% chance to go left at each peg
+        "variance": 0.1      # Small variance in probabilities
+    },
+    "MEDIUM": {
+        "left_prob": 0.5,
+        "variance": 0.15
+    },
+    "HIGH": {
+        "left_prob": 0.5,
+        "variance": 0.2
+    },
+    "EXTREME": {
+        "left_prob": 0.5,
+        "variance": 0.25
+    }
+}
+
+# Multipliers for the row counts with a hand-made table, from left to right
+BASE_TABLES = {
+    8: {
+        "LOW": [9, 3.5, 2, 1.5, 0.3, 1.5, 2, 3.5, 9],
+        "MEDIUM": [14, 4.5, 2, 1.2, 0.2, 1.2, 2, 4.5, 14],
+        "HIGH": [18, 6, 2.4, 1, 0.12, 1, 2.4, 6, 18],
+        "EXTREME": [25, 9, 2.5, 0.8, 0.06, 0.8, 2.5, 9, 25]
+    },
+    12: {
+        "LOW": [18, 6, 3, 2, 1.5, 1, 0.25, 1, 1.5, 2, 3, 6, 18],
+        "MEDIUM": [24, 8, 3.5, 2, 1.3, 0.7, 0.13, 0.7, 1.3, 2, 3.5, 8, 24],
+        "HIGH": [35, 12, 5, 2.5, 1.2, 0.45, 0.07, 0.45, 1.2, 2.5, 5, 12, 35],
+        "EXTREME": [58, 22, 8, 2.5, 1, 0.25, 0.02, 0.25, 1, 2.5, 8, 22, 58]
+    },
+    16: {
+        "LOW": [25, 14, 7, 3.5, 2.2, 1.7, 1.5, 1, 0.25, 1, 1.5, 1.7, 2.2, 3.5, 7, 14, 25],
+        "MEDIUM": [35, 18, 8, 4, 2.3, 1.5, 1, 0.45, 0.12, 0.45, 1, 1.5, 2.3, 4, 8, 18, 35],
+        "HIGH": [52, 25, 12, 6, 3, 1.4, 0.8, 0.22, 0.06, 0.22, 0.8, 1.4, 3, 6, 12, 25, 52],
+        "EXTREME": [85, 40, 18, 8, 3.5, 1.6, 0.8, 0.14, 0.01, 0.14, 0.8, 1.6, 3.5, 8, 18, 40, 85]
+    }
+}
+
+
+def scale_multipliers(base_multipliers, target_slots):
+    """Stretch or squeeze a table to a slot count, keeping the top multiplier on both edges"""
+    if len(base_multipliers) == target_slots:
+        return list(base_multipliers)
+
+    highest_multiplier = max(base_multipliers)
+    result = [highest_multiplier]
+
+    middle_slots = target_slots - 2
+    if middle_slots > 0:
+        middle_values = base_multipliers[1:-1]
+        if len(middle_values) != middle_slots:
+            step = (len(middle_values) - 1) / (middle_slots - 1) if middle_slots > 1 else 0
+            for i in range(middle_slots):
+                idx = min(i * step, len(middle_values) - 1)
+                # Linear interpolation between the two closest values
+                lower_idx = int(idx)
+                upper_idx = min(lower_idx + 1, len(middle_values) - 1)
+                fraction = idx - lower_idx
+
+                if lower_idx == upper_idx:
+                    value = middle_values[lower_idx]
+                else:
+                    value = middle_values[lower_idx] * (1 - fraction) + middle_values[upper_idx] * fraction
+                result.append(value)
+        else:
+            result.extend(middle_values)
+
+    result.append(highest_multiplier)
+    return result
+
+
+def base_multipliers(difficulty, rows):
+    """Multipliers for a row count, derived from the nearest hand-made table below it"""
+    templates = sorted(BASE_TABLES)
+    if rows in BASE_TABLES:
+        return list(BASE_TABLES[rows][difficulty])
+    if rows < templates[0]:
+        return scale_multipliers(BASE_TABLES[templates[0]][difficulty], rows + 1)
+    lower_template = max(t for t in templates if t <= rows)
+    return scale_multipliers(BASE_TABLES[lower_template][difficulty], rows + 1)
+
+
+def right_probability(left_prob, variance):
+    """Exact chance of a ball going right at one peg
+
+    The left chance is drawn uniformly from left_prob ± variance / 2 at every
+    peg and clipped to [0, 1] by the comparison, so this averages the clipped
+    value over that range. While the range stays inside [0, 1] the variance
+    cancels out and it's just 1 - left_prob.
+    """
+    low, high = left_prob - variance / 2, left_prob + variance / 2
+    if high <= low:
+        return 1 - min(1.0, max(0.0, left_prob))
+    inside_low, inside_high = max(low, 0.0), min(high, 1.0)
+    area = max(0.0, inside_high ** 2 - inside_low ** 2) / 2 + max(0.0, high - max(low, 1.0))
+    return 1 - area / (high - low)
+
+
+def landing_distribution(rows, right_prob):
+    """Chance of landing in each slot, binomial over the rows"""
+    return np.array([comb(rows, k) * right_prob ** k * (1 - right_prob) ** (rows - k) for k in range(rows + 1)])
+
+
+class PlinkoTable:
+    """Multipliers of one board with its exact return to player
+
+    A table with a player edge has every multiplier scaled down, rounded
+    down to the cent, so its RTP lands at PLINKO_RTP_MAX (at most 1.0).
+    """
+
+    def __init__(self, rows, difficulty, multipliers, right_prob):
+        self.rows = rows
+        self.difficulty = difficulty
+        self.probabilities = landing_distribution(rows, right_prob)
+        self._set(tuple(float(m) for m in multipliers))
+        self.clamped_from = None
+        if self.rtp > 1.0:
+            self.clamped_from = self.rtp
+            scale = min(PLINKO_RTP_MAX, 1.0) / self.rtp
+            self._set(tuple(floor(m * scale * 100) / 100 for m in self.multipliers))
+        self.in_band = PLINKO_RTP_MIN <= self.rtp <= PLINKO_RTP_MAX
+        self.enabled = self.in_band or PLINKO_RTP_ACTION != "refuse"
+
+    def _set(self, multipliers):
+        self.multipliers = multipliers
+        self.values = np.array(multipliers)
+        self.rtp = float(self.probabilities @ self.values)
+
+
+class PlinkoTables:
+    """Every supported (rows, difficulty) table, compiled once
+
+    Tables for row counts without a hand-made table are derived from the
+    nearest one below it. Each table's return to player is worked out from the
+    landing distribution rather than simulated, and checked against
+    PLINKO_RTP_MIN and PLINKO_RTP_MAX; tables paying more than they take are
+    scaled down instead. Lookups are a dict and a list index.
+    """
+
+    def __init__(self, difficulty_settings=DIFFICULTY_SETTINGS):
+        self.tables = {}
+        for difficulty, settings in difficulty_settings.items():
+            right_prob = right_probability(settings["left_prob"], settings["variance"])
+            self.tables[difficulty] = [
+                PlinkoTable(rows, difficulty, base_multipliers(difficulty, rows), right_prob)
+                for rows in range(PLINKO_MIN_ROWS, PLINKO_MAX_ROWS + 1)
+            ]
+
+    def get(self, difficulty, rows):
+        """Table for a board, None if the board isn't supported or was refused"""
+        if not PLINKO_MIN_ROWS <= rows <= PLINKO_MAX_ROWS or difficulty not in self.tables:
+            return None
+        table = self.tables[difficulty][rows - PLINKO_MIN_ROWS]
+        return table if table.enabled else None
+
+    def out_of_band(self):
+        return [table for tables in self.tables.values() for table in tables if not table.in_band]
+
+    def clamped(self):
+        return [table for tables in self.tables.values() for table in tables if table.clamped_from is not None]
+
+    def report(self):
+        """Log every table that was clamped or is outside the RTP band"""
+        for table in self.clamped():
+            print(
+                f"{Fore.YELLOW}[~] {Fore.WHITE}Plinko {table.difficulty} {table.rows} rows clamped, "
+                f"RTP {table.clamped_from:.2%} scaled down to {table.rtp:.2%}"
+            )
+        flagged = self.out_of_band()
+        for table in flagged:
+            status = "refused" if not table.enabled else "flagged"
+            print(
+                f"{Fore.YELLOW}[~] {Fore.WHITE}Plinko {table.difficulty} {table.rows} rows {status}, "
+                f"RTP {table.rtp:.2%} outside {PLINKO_RTP_MIN:.0%}-{PLINKO_RTP_MAX:.0%}"
+            )
+        total = sum(len(tables) for tables in self.tables.values())
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Compiled {Fore.GREEN}{total}{Fore.WHITE} plinko tables, {len(self.clamped())} clamped, {len(flagged)} outside the RTP band")
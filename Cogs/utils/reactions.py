@@ -0,0 +1,59 @@
+from collections import Counter
+from colorama import Fore
+
+# Shared dispatcher, one per process
+_reaction_dispatcher = None
+
+
+class ReactionDispatcher:
+    """Routes reactions on game messages to the game that owns the message
+
+    Games register their message id with a handler and unregister it when
+    they end. main.py feeds every raw reaction event through dispatch(),
+    which is a single dict lookup, so reactions anywhere else cost nothing
+    no matter how many games are running. Handlers get the raw event payload.
+    """
+
+    def __init__(self):
+        self.handlers = {}  # message_id -> (kind, emoji, handler)
+        self.dispatched = 0
+        self.ignored = 0
+
+    def register(self, message_id, handler, kind, emoji="💰"):
+        """Send reactions with `emoji` on a message to `handler`"""
+        self.handlers[message_id] = (kind, emoji, handler)
+
+    def unregister(self, message_id):
+        """Stop routing reactions for a message, safe to call more than once"""
+        self.handlers.pop(message_id, None)
+
+    async def dispatch(self, payload):
+        entry = self.handlers.get(payload.message_id)
+        if entry is None:
+            self.ignored += 1
+            return
+        kind, emoji, handler = entry
+        if str(payload.emoji) != emoji:
+            self.ignored += 1
+            return
+        self.dispatched += 1
+        try:
+            await handler(payload)
+        except Exception as e:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Error handling {kind} reaction on {payload.message_id}: {e}")
+
+    def stats(self):
+        return {
+            "active": len(self.handlers),
+            "by_kind": dict(Counter(kind for kind, _, _ in self.handlers.values())),
+            "dispatched": self.dispatched,
+            "ignored": self.ignored
+        }
+
+
+def get_reaction_dispatcher():
+    """Return the shared reaction dispatcher, creating it on first use"""
+    global _reaction_dispatcher
+    if _reaction_dispatcher is None:
+        _reaction_dispatcher = ReactionDispatcher()
+    return _reaction_dispatcher
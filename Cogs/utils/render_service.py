@@ -0,0 +1,218 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from colorama import Fore
+from dotenv import load_dotenv
+load_dotenv()
+
+# Pool settings, all overridable from the environment
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+RENDER_QUEUE_DEPTH = int(os.environ.get("RENDER_QUEUE_DEPTH", 32))
+RENDER_TIMEOUT = float(os.environ.get("RENDER_TIMEOUT", 10))
+# Renderers share their fonts, so the in-process fallback runs one job at a time by default
+RENDER_FALLBACK_THREADS = int(os.environ.get("RENDER_FALLBACK_THREADS", 1))
+# Workers are forked from a clean single-threaded server, never from the running bot
+RENDER_START_METHOD = os.environ.get("RENDER_START_METHOD", "forkserver")
+
+# Shared service, one per process
+_render_service = None
+
+
+class RenderBusy(Exception):
+    """The pool is saturated and the caller asked not to fall back"""
+
+
+class RenderTimeout(Exception):
+    """A job didn't finish within its timeout"""
+
+
+def _crash_frame(current_multiplier, crashed=False, cash_out=False):
+    from Cogs.utils.crash_render import render_crash_graph
+    buf, filename = render_crash_graph(current_multiplier, crashed, cash_out)
+    return buf.getvalue(), filename
+
+
+def _plinko_board(rows, ball_results, multipliers, total_win, avg_multiplier):
+    from Cogs.utils.plinko_render import render_plinko_png
+    return render_plinko_png(rows, ball_results, multipliers, total_win, avg_multiplier), "plinko_result.png"
+
+
+def _deposit_card(user_name, amount, currency, address):
+    from Cogs.utils.cards import get_card_renderer
+    return get_card_renderer().render(user_name, amount, currency, address).getvalue(), "qrcode.png"
+
+
+def _wheel_spin(result_color, segments):
+    from Cogs.utils.wheel_render import get_wheel_renderer
+    return get_wheel_renderer().render(result_color, segments), "wheel_spin.gif"
+
+
+# Every job a cog can submit; each returns (image bytes, filename)
+JOBS = {
+    "crash_frame": _crash_frame,
+    "plinko_board": _plinko_board,
+    "deposit_card": _deposit_card,
+    "wheel_spin": _wheel_spin,
+}
+
+
+def _warm_worker():
+    """Load the heavy modules, fonts and templates once per worker"""
+    import matplotlib
+    matplotlib.use("Agg")
+    from Cogs.utils.cards import get_card_renderer
+    from Cogs.utils.crash_render import get_crash_renderer
+    from Cogs.utils.plinko_render import get_plinko_renderer
+    get_crash_renderer().render(1.0)
+    get_card_renderer().render("warmup", 0.0, "BTC", "warmup")
+    get_plinko_renderer().warm()
+
+
+def _run(job, args, submitted):
+    """Run a job in a worker, returns (result, queue wait, render time) in seconds"""
+    started = time.time()
+    result = JOBS[job](*args)
+    return result, started - submitted, time.time() - started
+
+
+class JobStats:
+    """Queue wait and render time for one kind of job"""
+
+    def __init__(self):
+        self.jobs = 0
+        self.wait_ms = 0.0
+        self.render_ms = 0.0
+        self.max_render_ms = 0.0
+        self.fallbacks = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def record(self, wait, render):
+        self.jobs += 1
+        self.wait_ms += wait * 1000
+        self.render_ms += render * 1000
+        self.max_render_ms = max(self.max_render_ms, render * 1000)
+
+    def stats(self):
+        return {
+            "jobs": self.jobs,
+            "avg_wait_ms": self.wait_ms / self.jobs if self.jobs else 0,
+            "avg_render_ms": self.render_ms / self.jobs if self.jobs else 0,
+            "max_render_ms": self.max_render_ms,
+            "fallbacks": self.fallbacks,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "errors": self.errors
+        }
+
+
+class RenderService:
+    """Process pool of warm render workers shared by every cog
+
+    Jobs are submitted by name and awaited, so renders run on other cores and
+    never block the gateway. At most RENDER_QUEUE_DEPTH jobs are in flight;
+    past that a job either runs on a small thread pool in this process or is
+    rejected with RenderBusy, as the caller chooses. Jobs that take longer
+    than the timeout raise RenderTimeout.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, queue_depth=RENDER_QUEUE_DEPTH, timeout=RENDER_TIMEOUT,
+                 start_method=RENDER_START_METHOD):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.start_method = start_method
+        self.pool = None
+        self.fallback_pool = ThreadPoolExecutor(max_workers=RENDER_FALLBACK_THREADS, thread_name_prefix="render")
+        self.in_flight = 0
+        self.job_stats = {job: JobStats() for job in JOBS}
+
+    def start(self):
+        """Start the workers if they aren't running yet"""
+        if self.pool is None:
+            # Forking the bot itself would copy its threads' locks mid-use, forkserver and
+            # spawn start clean (main.py only runs the bot as __main__, so workers can import it)
+            context = multiprocessing.get_context(self.start_method)
+            if self.start_method == "forkserver":
+                context.set_forkserver_preload(["Cogs.utils.render_service"])
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_warm_worker
+            )
+            print(f"{Fore.GREEN}[+] {Fore.WHITE}Started {Fore.GREEN}{self.workers}{Fore.WHITE} render workers")
+        return self.pool
+
+    def _submit(self, executor, job, args):
+        """Submit a job, holding its queue slot until it has really finished
+
+        A job that timed out keeps running in its worker, so the slot is only
+        given back by the job's own done callback.
+        """
+        loop = asyncio.get_running_loop()
+        job_future = executor.submit(_run, job, args, time.time())
+        self.in_flight += 1
+        job_future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+        return job_future
+
+    def _release(self):
+        self.in_flight -= 1
+
+    def _discard(self, pool):
+        """Shut a broken pool down, a fresh one is started by the next render"""
+        if self.pool is pool:
+            self.pool = None
+        # Stops its management thread and whatever workers are left
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, job, *args, fallback=True, timeout=None):
+        """Run a render job and return its (image bytes, filename)"""
+        stats = self.job_stats[job]
+        timeout = timeout or self.timeout
+
+        if self.in_flight >= self.queue_depth:
+            if not fallback:
+                stats.rejected += 1
+                raise RenderBusy(f"{self.in_flight} renders already queued")
+            stats.fallbacks += 1
+            executor = self.fallback_pool
+        else:
+            executor = self.start()
+
+        try:
+            try:
+                job_future = self._submit(executor, job, args)
+            except BrokenProcessPool:
+                # A worker died, start a fresh pool next time and render here for now
+                self._discard(executor)
+                stats.fallbacks += 1
+                job_future = self._submit(self.fallback_pool, job, args)
+            result, wait, render = await asyncio.wait_for(asyncio.wrap_future(job_future), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise RenderTimeout(f"{job} took longer than {timeout}s")
+        except BrokenProcessPool:
+            self._discard(executor)
+            stats.errors += 1
+            raise
+        except Exception:
+            stats.errors += 1
+            raise
+
+        stats.record(wait, render)
+        return result
+
+    def stats(self):
+        return {job: stats.stats() for job, stats in self.job_stats.items()}
+
+
+def get_render_service():
+    """Return the shared render service, creating it on first use"""
+    global _render_service
+    if _render_service is None:
+        _render_service = RenderService()
+    return _render_service
@@ -0,0 +1,48 @@
+import numpy as np
+
+# One generator per process, seeded from the OS
+_rng = np.random.default_rng()
+
+
+class WeightedSampler:
+    """Draws outcomes from a fixed weight table, Vose's alias method
+
+    The table is built once in O(n). Every draw is then one uniform slot pick
+    and one biased coin flip whatever the number of outcomes, and batches
+    are drawn with a couple of numpy calls, so thousands of spins cost about
+    as much as one.
+    """
+
+    def __init__(self, weights):
+        """weights maps each outcome to its relative weight"""
+        self.outcomes = list(weights)
+        total = float(sum(weights.values()))
+        self.probabilities = np.array([weights[outcome] / total for outcome in self.outcomes])
+
+        size = len(self.outcomes)
+        scaled = self.probabilities * size
+        self.accept = np.ones(size)
+        self.alias = np.arange(size)
+        small = [i for i in range(size) if scaled[i] < 1]
+        large = [i for i in range(size) if scaled[i] >= 1]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.accept[low] = scaled[low]
+            self.alias[low] = high
+            scaled[high] -= 1 - scaled[low]
+            (small if scaled[high] < 1 else large).append(high)
+        # Whatever is left is 1 up to rounding and always keeps its own slot
+
+    def draw(self, n=1, rng=None):
+        """Indexes into self.outcomes of n independent draws"""
+        rng = rng or _rng
+        slots = rng.integers(0, len(self.outcomes), n)
+        return np.where(rng.random(n) < self.accept[slots], slots, self.alias[slots])
+
+    def sample(self, n=1, rng=None):
+        """n outcomes, for when the draws themselves are needed"""
+        return [self.outcomes[i] for i in self.draw(n, rng)]
+
+    def counts(self, draws):
+        """How often each outcome came up in a batch of draws"""
+        return dict(zip(self.outcomes, np.bincount(draws, minlength=len(self.outcomes)).tolist()))
@@ -0,0 +1,471 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from colorama import Fore
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from Cogs.utils.mongo import Users, Servers, Bets
+from Cogs.utils.cache import get_user_cache
+from dotenv import load_dotenv
+load_dotenv()
+
+# "direct" writes every game straight away, "write_behind" queues bets, stats and server profit
+SETTLEMENT_MODE = os.environ.get("SETTLEMENT_MODE", "direct")
+WRITE_BEHIND = SETTLEMENT_MODE == "write_behind"
+
+# Write-behind flushes every FLUSH_MS milliseconds or as soon as FLUSH_OPS outcomes are waiting
+FLUSH_MS = int(os.environ.get("SETTLEMENT_FLUSH_MS", 250))
+FLUSH_OPS = int(os.environ.get("SETTLEMENT_FLUSH_OPS", 500))
+JOURNAL_PATH = os.environ.get("SETTLEMENT_JOURNAL", "settlement_journal.jsonl")
+
+# Shared write-behind queue, created lazily so it binds to the running event loop
+_queue = None
+
+
+class GameOutcome:
+    """Everything a finished game needs written to the database"""
+
+    def __init__(self, user, guild, game, result, bet, payout=0, multiplier=None, amount=None,
+                 refund_tokens=0, refund_credits=0, timestamp=None, wins=None, losses=None, **details):
+        self.id = str(ObjectId())  # _id of its bet document, stays the same through the journal
+        self.user_id = user.id
+        self.user_name = user.name
+        self.server_id = guild.id if guild else None
+        self.game = game
+        self.result = result  # "win", "loss" or "draw"
+        # Rounds counted in the player's stats, more than one when a batch is settled as one game
+        self.wins = wins if wins is not None else int(result == "win")
+        self.losses = losses if losses is not None else int(result == "loss")
+        self.bet = bet
+        self.payout = payout  # Credits paid back to the user
+        self.refund_tokens = refund_tokens  # Bet handed back as-is, e.g. on a draw
+        self.refund_credits = refund_credits
+        self.multiplier = multiplier if multiplier is not None else (payout / bet if bet else 0)
+        if amount is None:
+            amount = {"win": payout, "loss": bet}.get(result, 0)
+        self.amount = amount
+        self.timestamp = timestamp if timestamp is not None else int(time.time())
+        self.details = details  # Game specific history fields (flips, balls, mines...)
+
+    @property
+    def server_profit(self):
+        """What the house made on this game"""
+        return self.bet - self.payout - self.refund_tokens - self.refund_credits
+
+    def bet_document(self):
+        """Document for the bets collection"""
+        entry = {
+            "_id": ObjectId(self.id),
+            "type": self.result,
+            "game": self.game,
+            "bet": self.bet,
+            "amount": self.amount,
+            "multiplier": self.multiplier,
+            "timestamp": self.timestamp,
+            "user_id": self.user_id,
+            "user_name": self.user_name,
+            "server_id": self.server_id
+        }
+        entry.update(self.details)
+        return entry
+
+    def to_record(self):
+        """Plain dict of the outcome, used for the journal"""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild an outcome from a journal record"""
+        outcome = cls.__new__(cls)
+        outcome.__dict__.update(record)
+        outcome.__dict__.setdefault("id", str(ObjectId()))  # Journals written before outcomes had ids
+        outcome.__dict__.setdefault("wins", int(outcome.result == "win"))
+        outcome.__dict__.setdefault("losses", int(outcome.result == "loss"))
+        return outcome
+
+
+def build_updates(outcomes, balances=True, records=True):
+    """Merge outcomes into one $inc per user and server, plus their bet documents
+
+    `balances` covers payouts and refunds, `records` covers stats, bets and
+    server profit, so write-behind can send the first now and the rest later.
+    """
+    user_updates = {}
+    server_updates = {}
+    bets = []
+
+    for outcome in outcomes:
+        # Balance and stats for the player
+        inc = user_updates.setdefault(outcome.user_id, {})
+        if balances:
+            if outcome.payout:
+                inc["credits"] = inc.get("credits", 0) + outcome.payout
+            if outcome.refund_tokens:
+                inc["tokens"] = inc.get("tokens", 0) + outcome.refund_tokens
+            if outcome.refund_credits:
+                inc["credits"] = inc.get("credits", 0) + outcome.refund_credits
+        if not records:
+            continue
+        if outcome.wins:
+            inc["total_won"] = inc.get("total_won", 0) + outcome.wins
+            inc["total_earned"] = inc.get("total_earned", 0) + outcome.payout
+        if outcome.losses:
+            inc["total_lost"] = inc.get("total_lost", 0) + outcome.losses
+        bets.append(outcome.bet_document())
+
+        # House profit for the server it was played in
+        if outcome.server_id is not None:
+            server = server_updates.setdefault(outcome.server_id, {})
+            server["total_profit"] = server.get("total_profit", 0) + outcome.server_profit
+
+    return _updates(user_updates), _updates(server_updates), bets
+
+
+def _updates(incs):
+    """$inc update documents, skipping documents with nothing to change"""
+    updates = {}
+    for key, inc in incs.items():
+        inc = {field: value for field, value in inc.items() if value}
+        if inc:
+            updates[key] = {"$inc": inc}
+    return updates
+
+
+async def _write(collection, field, updates):
+    """Send the updates for one collection in a single round trip, returns the keys that didn't apply
+
+    The bulk write is unordered, so when some updates fail the rest still go
+    through and the failed ones come back in the BulkWriteError.
+    """
+    if not updates:
+        return set()
+    keys = list(updates)
+    try:
+        await collection.bulk_write([UpdateOne({field: key}, updates[key]) for key in keys], ordered=False)
+    except BulkWriteError as e:
+        return {keys[error["index"]] for error in e.details.get("writeErrors", [])}
+    return set()
+
+
+async def write_users(user_updates):
+    """Write the users and their cache entries, returns the ids whose update didn't apply"""
+    cache = get_user_cache()
+    with cache.writing(list(user_updates)):
+        failed = await _write(Users().collection, "discord_id", user_updates)
+    for user_id, update in user_updates.items():
+        if user_id in failed:
+            cache.invalidate(user_id)
+        else:
+            cache.apply(user_id, update)
+    return failed
+
+
+async def write_records(server_updates, bets=()):
+    """Write server profit and bet documents concurrently, returns the servers whose update didn't apply"""
+    failed, _ = await asyncio.gather(
+        _write(Servers().collection, "server_id", server_updates),
+        Bets().record(list(bets))
+    )
+    return failed
+
+
+async def pay_out(outcomes, user_updates):
+    """Write the user updates of a batch, returns the outcomes whose update didn't apply
+
+    Any error other than a per-document one leaves no way to tell what was
+    written, so the whole batch is reported as failed.
+    """
+    try:
+        failed = await write_users(user_updates)
+    except Exception as e:
+        raise SettlementError(outcomes, e) from e
+    return [outcome for outcome in outcomes if outcome.user_id in failed]
+
+
+class SettlementError(Exception):
+    """Raised when outcomes couldn't be paid out
+
+    `failed` holds the outcomes to refund, every other outcome of the batch
+    was paid out and recorded as usual.
+    """
+
+    def __init__(self, failed, error=None):
+        super().__init__(error or f"{len(failed)} outcomes could not be paid out")
+        self.failed = failed
+
+
+class Settlement:
+    """Applies game outcomes with one combined update per user and server document"""
+
+    async def settle(self, outcome):
+        """Settle a single game"""
+        return await self.settle_many([outcome])
+
+    async def settle_many(self, outcomes):
+        """Settle several outcomes at once, merged per document
+
+        Every user and server touched gets exactly one update, sent as a single
+        bulk_write per collection, bets included.
+        Users are written first: an outcome is only recorded in the bets and its
+        server's profit once its user update went through, so the ones in the
+        raised SettlementError can be refunded as if they never ran.
+        In write-behind mode the outcomes are journaled to disk first, then only
+        payouts are written here and the rest is queued.
+        """
+        if WRITE_BEHIND:
+            queue = get_queue()
+            await queue.stage(outcomes)
+            user_updates, _, _ = build_updates(outcomes, records=False)
+            try:
+                failed = await pay_out(outcomes, user_updates)
+            except SettlementError:
+                await queue.cancel(outcomes)
+                raise
+            if failed:
+                await queue.cancel(failed)
+            failed_ids = {outcome.id for outcome in failed}
+            queue.put([outcome for outcome in outcomes if outcome.id not in failed_ids])
+        else:
+            user_updates, _, _ = build_updates(outcomes)
+            failed = await pay_out(outcomes, user_updates)
+            failed_ids = {outcome.id for outcome in failed}
+            paid = [outcome for outcome in outcomes if outcome.id not in failed_ids]
+            _, server_updates, bets = build_updates(paid)
+            try:
+                failed_servers = await write_records(server_updates, bets)
+            except Exception as e:
+                # The players are paid already, so this is logged rather than refunded
+                print(f"{Fore.RED}[-] {Fore.WHITE}Error recording {len(paid)} settled games: {e}")
+            else:
+                if failed_servers:
+                    print(f"{Fore.RED}[-] {Fore.WHITE}Error recording server profit for {len(failed_servers)} servers")
+
+        if failed:
+            raise SettlementError(failed)
+
+    async def settle_or_refund(self, outcome, bet_split):
+        """Settle a game, handing its bet back if it can't be written
+
+        For games with no error handling of their own around the settlement.
+        bet_split is the debit_bet result (or the ongoing game holding it).
+        Returns False after a refund so the caller can tell the player.
+        """
+        try:
+            await self.settle(outcome)
+            return True
+        except Exception as e:
+            print(f"{Fore.RED}[-] {Fore.WHITE}Error settling {outcome.game} for {outcome.user_id}, refunding: {e}")
+            if bet_split:
+                await Users().refund_bet(outcome.user_id, bet_split["tokens_used"], bet_split["credits_used"])
+            return False
+
+
+class SettlementQueue:
+    """Write-behind queue for bets, stats and server profit
+
+    Outcomes are appended to a local journal and fsynced before their payouts
+    are written, then queued, and a background task flushes them with one
+    bulk_write per collection. A payout that fails is cancelled in the journal.
+    The fsync runs off the event loop, and appends made while one is running
+    share the next, so a burst of games costs a couple of disk flushes.
+    The batch being written is moved to a separate journal file and only
+    deleted once the write succeeds, so a crash replays it on the next start.
+
+    Replays are idempotent: bets are upserted on the outcome id and only the
+    outcomes whose bet was new get their stats and server profit. A retried
+    flush only resends the updates that didn't apply. A crash between
+    journaling and the payout replays the game without its payout.
+    """
+
+    def __init__(self, journal_path=JOURNAL_PATH, flush_ms=FLUSH_MS, flush_ops=FLUSH_OPS):
+        self.journal_path = journal_path
+        self.inflight_path = journal_path + ".inflight"
+        self.flush_interval = flush_ms / 1000
+        self.flush_ops = flush_ops
+
+        pending, pending_cancelled = self._load(self.journal_path)
+        inflight, inflight_cancelled = self._load(self.inflight_path)
+        cancelled = pending_cancelled | inflight_cancelled
+        self.inflight = self._dedupe(inflight, cancelled)
+        self.pending = self._dedupe(pending, cancelled | {outcome.id for outcome in self.inflight})
+        self.staged = {}  # Journaled, waiting for their payout
+        self.unwritten = None  # (user, server) updates of the in-flight batch still to write
+        self.io = ThreadPoolExecutor(max_workers=1)  # Journal writes, fsyncs and closes, in order
+        self.buffer = []  # Journal lines waiting for the next fsync
+        self.syncing = False
+        self.next_sync = None  # Future of the fsync covering the buffered lines
+
+        self.journal = open(self.journal_path, "a")
+        self.wakeup = None
+        self.task = None
+
+        recovered = len(self.pending) + len(self.inflight)
+        if recovered:
+            print(f"{Fore.GREEN}[+] {Fore.WHITE}Recovered {Fore.GREEN}{recovered}{Fore.WHITE} unsettled games from the journal")
+
+    def _load(self, path):
+        """Read the outcomes and cancelled ids left in a journal file"""
+        outcomes, cancelled = [], set()
+        if not os.path.exists(path):
+            return outcomes, cancelled
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Half written line from a crash mid-append
+                    continue
+                if "cancelled" in record:
+                    cancelled.add(record["cancelled"])
+                else:
+                    outcomes.append(GameOutcome.from_record(record))
+        return outcomes, cancelled
+
+    @staticmethod
+    def _dedupe(outcomes, skip):
+        """Outcomes in journal order, once each, leaving out the ids in skip"""
+        kept = {}
+        for outcome in outcomes:
+            if outcome.id not in skip:
+                kept.setdefault(outcome.id, outcome)
+        return list(kept.values())
+
+    async def _append(self, records):
+        """Append records to the journal and wait until they are on disk"""
+        self.buffer.extend(json.dumps(record, default=str) + "\n" for record in records)
+        future = self.next_sync
+        if future is None:
+            future = self.next_sync = asyncio.get_running_loop().create_future()
+            if not self.syncing:
+                self._sync()
+        await future
+
+    def _sync(self):
+        """Write and fsync everything buffered so far on the journal thread"""
+        future, self.next_sync = self.next_sync, None
+        lines, self.buffer = self.buffer, []
+        self.syncing = True
+        task = asyncio.get_running_loop().run_in_executor(self.io, _write_lines, self.journal, lines)
+        task.add_done_callback(lambda task: self._synced(task, future))
+
+    def _synced(self, task, future):
+        self.syncing = False
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(None)
+        # Appends made during this fsync are waiting for the next one
+        if self.next_sync is not None:
+            self._sync()
+
+    def start(self):
+        """Start the flush task if it isn't running yet"""
+        if self.task is None or self.task.done():
+            self.wakeup = asyncio.Event()
+            self.task = asyncio.create_task(self._run())
+
+    async def stage(self, outcomes):
+        """Journal outcomes before their payouts are written"""
+        # Staged right away, so a rotation while they're being written journals them again
+        for outcome in outcomes:
+            self.staged[outcome.id] = outcome
+        try:
+            await self._append([outcome.to_record() for outcome in outcomes])
+        except Exception:
+            for outcome in outcomes:
+                self.staged.pop(outcome.id, None)
+            raise
+
+    async def cancel(self, outcomes):
+        """Drop staged outcomes whose payouts failed, the games get refunded instead"""
+        for outcome in outcomes:
+            self.staged.pop(outcome.id, None)
+        await self._append([{"cancelled": outcome.id} for outcome in outcomes])
+
+    def put(self, outcomes):
+        """Queue staged outcomes once they are paid out, flushing early once the batch is full"""
+        for outcome in outcomes:
+            self.staged.pop(outcome.id, None)
+        self.pending.extend(outcomes)
+
+        self.start()
+        if len(self.pending) >= self.flush_ops:
+            self.wakeup.set()
+
+    async def _run(self):
+        """Flush every interval, or sooner when woken up"""
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def _rotate(self):
+        """Move the pending outcomes and their journal to the in-flight batch
+
+        Staged outcomes are journaled again in the new file, their first copy
+        goes away with the in-flight journal. Cancellations are read from both
+        files on load, so they can land in either.
+        """
+        journal = self.journal
+        os.replace(self.journal_path, self.inflight_path)
+        self.journal = open(self.journal_path, "a")
+        self.inflight, self.pending = self.pending, []
+        # Writes already handed to the journal thread finish before the old file is closed
+        await asyncio.get_running_loop().run_in_executor(self.io, journal.close)
+        if self.staged:
+            await self._append([outcome.to_record() for outcome in self.staged.values()])
+
+    async def flush(self):
+        """Write the in-flight batch, taking the pending outcomes if there is none"""
+        if not self.inflight:
+            if not self.pending:
+                return
+            await self._rotate()
+
+        try:
+            # Bets first, their upsert tells which outcomes haven't been counted yet
+            if self.unwritten is None:
+                new_ids = await Bets().record([outcome.bet_document() for outcome in self.inflight])
+                fresh = [outcome for outcome in self.inflight if ObjectId(outcome.id) in new_ids]
+                user_updates, server_updates, _ = build_updates(fresh, balances=False)
+                self.unwritten = (user_updates, server_updates)
+
+            # Whatever applied is dropped, so a retry only resends the rest
+            user_updates, server_updates = self.unwritten
+            failed = await write_records(server_updates)
+            self.unwritten = (user_updates, {server_id: server_updates[server_id] for server_id in failed})
+            failed = await write_users(user_updates)
+            self.unwritten = ({user_id: user_updates[user_id] for user_id in failed}, self.unwritten[1])
+            if any(self.unwritten):
+                raise RuntimeError(f"{sum(map(len, self.unwritten))} documents not updated")
+        except Exception as e:
+            # Keep the batch and its journal, the next flush retries it
+            print(f"{Fore.RED}[-] {Fore.WHITE}Error flushing {len(self.inflight)} settlements: {e}")
+            return
+
+        self.inflight = []
+        self.unwritten = None
+        os.remove(self.inflight_path)
+
+
+def _write_lines(journal, lines):
+    """Append lines to a journal file and make sure they are on disk, blocking"""
+    journal.writelines(lines)
+    journal.flush()
+    os.fsync(journal.fileno())
+
+
+def get_queue():
+    """Return the shared write-behind queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        _queue = SettlementQueue()
+    return _queue
@@ -0,0 +1,128 @@
+import io
+import os
+import time
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+from Cogs.utils.cards import RenderStats
+from dotenv import load_dotenv
+load_dotenv()
+
+# "gif" sends one pre-rendered spin per game, "text" only shows a spinning state and the result
+WHEEL_ANIMATION = os.environ.get("WHEEL_ANIMATION", "gif")
+# How long the spin lasts, the result is shown once it's over
+WHEEL_SPIN_SECONDS = float(os.environ.get("WHEEL_SPIN_SECONDS", 2.0))
+WHEEL_FONT = os.environ.get("WHEEL_FONT", "roboto.ttf")
+
+# Animation layout
+WHEEL_SIZE = 320
+SUPERSAMPLE = 2  # The wheel is drawn larger and scaled down for antialiasing
+SPIN_FRAMES = 30
+SPIN_TURNS = 3
+PALETTE_COLORS = 32
+
+BG_COLOR = (49, 51, 56)
+RIM_COLOR = (30, 31, 34)
+POINTER_COLOR = (255, 255, 255)
+SEGMENT_COLORS = {
+    "gray": (149, 165, 166),
+    "yellow": (241, 196, 15),
+    "red": (231, 76, 60),
+    "blue": (52, 152, 219),
+    "green": (46, 204, 113)
+}
+
+# Shared renderer, one per process
+_wheel_renderer = None
+
+
+class WheelRenderer:
+    """Spin animations for the wheel, one GIF per result color
+
+    The wheel face is drawn once per segment layout; each frame rotates it
+    with an ease-out so the spin slows down and stops with the pointer in
+    the middle of the result color's segment. A spin only depends on the
+    result color, so cogs render each one once and reuse the bytes.
+    """
+
+    def __init__(self, font_path=WHEEL_FONT):
+        self.font_path = font_path
+        self.font = ImageFont.truetype(font_path, 26)
+        self.metrics = RenderStats()
+
+    @lru_cache(maxsize=8)
+    def _face(self, segments):
+        """The wheel itself, segments clockwise from the top, on a transparent background"""
+        size = WHEEL_SIZE * SUPERSAMPLE
+        margin = 14 * SUPERSAMPLE
+        face = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(face)
+        box = (margin, margin, size - margin, size - margin)
+        draw.ellipse(box, fill=RIM_COLOR)
+        inner = (box[0] + 6 * SUPERSAMPLE, box[1] + 6 * SUPERSAMPLE, box[2] - 6 * SUPERSAMPLE, box[3] - 6 * SUPERSAMPLE)
+        for color, start, end in self._arcs(segments):
+            draw.pieslice(inner, start, end, fill=SEGMENT_COLORS[color], outline=RIM_COLOR, width=2 * SUPERSAMPLE)
+        return face.reduce(SUPERSAMPLE)
+
+    @staticmethod
+    def _arcs(segments):
+        """(color, start, end) of each segment, in Pillow's clockwise degrees from 3 o'clock"""
+        total = sum(chance for _, chance in segments)
+        arcs = []
+        start = -90.0
+        for color, chance in segments:
+            end = start + 360 * chance / total
+            arcs.append((color, start, end))
+            start = end
+        return arcs
+
+    def _overlay(self, frame):
+        """Pointer and hub, which don't turn with the wheel"""
+        draw = ImageDraw.Draw(frame)
+        center = WHEEL_SIZE / 2
+        draw.polygon([(center - 13, 2), (center + 13, 2), (center, 30)], fill=POINTER_COLOR, outline=RIM_COLOR)
+        draw.ellipse((center - 42, center - 42, center + 42, center + 42), fill=RIM_COLOR)
+        draw.text((center, center), "Spin", font=self.font, fill=POINTER_COLOR, anchor="mm")
+
+    def render(self, result_color, segments):
+        """GIF bytes of a spin landing on result_color, blocking"""
+        started = time.perf_counter()
+        segments = tuple(segments)
+        face = self._face(segments)
+
+        # Rotating the face counter-clockwise by theta moves a point at angle a to a - theta,
+        # so the middle of the result segment ends up under the pointer at -90
+        middle = next((start + end) / 2 for color, start, end in self._arcs(segments) if color == result_color)
+        target = 360 * SPIN_TURNS + (middle + 90) % 360
+
+        frames = []
+        for i in range(SPIN_FRAMES):
+            t = (i + 1) / SPIN_FRAMES
+            angle = target * (1 - (1 - t) ** 3)  # Ease out
+            frame = Image.new("RGB", (WHEEL_SIZE, WHEEL_SIZE), BG_COLOR)
+            wheel = face.rotate(angle, resample=Image.Resampling.BICUBIC)
+            frame.paste(wheel, (0, 0), wheel)
+            self._overlay(frame)
+            frames.append(frame)
+
+        # One palette for every frame, taken from the last one which shows every color
+        palette = frames[-1].quantize(PALETTE_COLORS)
+        frames = [frame.quantize(palette=palette, dither=Image.Dither.NONE) for frame in frames]
+
+        buf = io.BytesIO()
+        frames[0].save(
+            buf, format="GIF", save_all=True, append_images=frames[1:],
+            duration=round(WHEEL_SPIN_SECONDS * 1000 / SPIN_FRAMES), optimize=True
+        )
+        self.metrics.record(started)
+        return buf.getvalue()
+
+    def stats(self):
+        return self.metrics.stats()
+
+
+def get_wheel_renderer():
+    """Return the shared wheel renderer, creating it on first use"""
+    global _wheel_renderer
+    if _wheel_renderer is None:
+        _wheel_renderer = WheelRenderer()
+    return _wheel_renderer
@@ -4,6 +4,12 @@ from colorama import Fore
 from discord.ext import commands
 from pymongo import ReturnDocument
 from Cogs.utils.mongo import Users, Servers
+from Cogs.utils.settlement import WRITE_BEHIND, get_queue
+from Cogs.utils.cache import watch_invalidations, get_known_users
+from Cogs.utils.indexes import bootstrap_database
+from Cogs.utils.render_service import get_render_service
+from Cogs.utils.frame_cache import get_frame_cache, CRASH_FRAME_PREWARM_MAX
+from Cogs.utils.reactions import get_reaction_dispatcher
 from Cogs.utils.emojis import emoji
 from dotenv import load_dotenv
 
@@ -14,6 +20,12 @@ load_dotenv()
 bot = commands.Bot(command_prefix="!", intents=discord.Intents.all(), case_insensitive=True)
 bot.remove_command("help")
 
+# Set USER_CACHE_INVALIDATION=change_stream when several bot processes share the database
+CACHE_INVALIDATION = os.environ.get("USER_CACHE_INVALIDATION")
+cache_watcher = None
+frame_warmer = None
+database_ready = False
+
 cogs = ["Cogs.guide", "Cogs.fetches", "Cogs.start", "Cogs.currency", "Cogs.history", "Cogs.tip", "Cogs.games.crash", "Cogs.games.dice", "Cogs.games.coinflip", "Cogs.games.mines", "Cogs.games.plinko", "Cogs.games.penalty", "Cogs.admin", "Cogs.servers", "Cogs.games.wheel", "Cogs.games.progressivecf"]
 
 @bot.event
@@ -21,6 +33,11 @@ async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
         print(f"{Fore.RED}[-] {Fore.WHITE} Some monkey {Fore.BLACK}{ctx.message.author}{Fore.WHITE} tried to use a non existsent command 💔💔💔")
 
+@bot.event
+async def on_raw_reaction_add(payload):
+    # Cash out reactions on game messages, one dict lookup per event
+    await get_reaction_dispatcher().dispatch(payload)
+
 @bot.event
 async def on_guild_join(guild):
     db = Servers()
@@ -30,9 +47,8 @@ async def on_guild_join(guild):
         "total_profit": 0,
         "giveaway_channel": None,
         "server_admins": [],
-        "server_bet_history": [],
     }
-    resp = db.new_server(dump)
+    resp = await db.new_server(dump)
     if not resp:
         return
     else:
@@ -45,12 +61,9 @@ async def on_command(ctx):
         return
 
     db = Users()
-    if db.fetch_user(ctx.author.id) != False:
+    if not await db.ensure_user(ctx.author.id):
         return
 
-    dump = {"discord_id": ctx.author.id, "tokens": 0, "credits": 0, "history": [], "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost':0}
-    db.register_new_user(dump)
-
     embed = discord.Embed(title=":wave: Welcome to BetSync Casino!", color=0x00FFAE, description="**Type** `!guide` **to get started**")
     embed.set_footer(text="BetSync Casino", icon_url=bot.user.avatar.url)
     await ctx.reply("By using BetSync, agree to our TOS. Type `!tos` to know more.", embed=embed)
@@ -60,12 +73,9 @@ async def on_command(ctx):
 async def on_command(ctx):
     # Continue with user registration check
     db = Users()
-    if db.fetch_user(ctx.author.id) != False:
+    if not await db.ensure_user(ctx.author.id):
         return
 
-    dump = {"discord_id": ctx.author.id, "tokens": 0, "credits": 0, "history": [], "total_deposit_amount": 0, "total_withdraw_amount": 0, "total_spent": 0, "total_earned": 0, 'total_played': 0, 'total_won': 0, 'total_lost':0}
-    db.register_new_user(dump)
-
     embed = discord.Embed(title=":wave: Welcome to BetSync Casino!", color=0x00FFAE, description="**Type** `!guide` **to get started**")
     embed.set_footer(text="BetSync Casino", icon_url=bot.user.avatar.url)
     await ctx.reply("By using BetSync, agree to our TOS. Type `!tos` to know more.", embed=embed)
@@ -74,6 +84,30 @@ async def on_command(ctx):
 async def on_ready():
     os.system("clear")
     print(f"{Fore.GREEN}[+] {Fore.WHITE}{bot.user}\n")
+    # Migrations and indexes, once per process
+    global database_ready
+    if not database_ready:
+        await bootstrap_database()
+        known = await get_known_users().warm(Users().collection)
+        print(f"{Fore.GREEN}[+] {Fore.WHITE}Loaded {Fore.GREEN}{known}{Fore.WHITE} registered users")
+        database_ready = True
+
+    # Warm the render workers before the first game needs them
+    get_render_service().start()
+
+    # Render the most common crash frames ahead of the first games
+    global frame_warmer
+    if CRASH_FRAME_PREWARM_MAX > 1 and frame_warmer is None:
+        frame_warmer = bot.loop.create_task(get_frame_cache().warm())
+
+    # Flush anything left in the settlement journal from the last run
+    if WRITE_BEHIND:
+        get_queue().start()
+
+    # Keep the user cache in sync with writes from other processes
+    global cache_watcher
+    if CACHE_INVALIDATION == "change_stream" and cache_watcher is None:
+        cache_watcher = bot.loop.create_task(watch_invalidations(Users().collection))
     for i in cogs:
         #try:
         bot.load_extension(i)
@@ -84,4 +118,6 @@ async def on_ready():
 #NIGGER 
 
 
-bot.run(os.environ['TOKEN'])
\ No newline at end of file
+# Render workers import this module, only the main process runs the bot
+if __name__ == "__main__":
+    bot.run(os.environ['TOKEN'])
\ No newline at end of file